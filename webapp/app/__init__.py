@@ -15,6 +15,10 @@ def create_app(config_class=None):
     
     # Perform environment diagnostics early
     _perform_app_startup_diagnostics()
+
+    # Hand log records to a background thread (LOG_ASYNC, LOG_* size and sampling limits)
+    from .mdeautomator_mcp.log_pipeline import install_log_pipeline
+    install_log_pipeline()
     
     app = Flask(__name__)
     
@@ -24,16 +28,112 @@ def create_app(config_class=None):
     
     # Load environment variables into Flask config
     app.config['FUNCTION_APP_BASE_URL'] = os.environ.get('FUNCTION_APP_BASE_URL')
+    # The routes authenticate with FUNCTION_KEY; function-key from KEY_VAULT_URL is only used when it is unset
     app.config['FUNCTION_KEY'] = os.environ.get('FUNCTION_KEY')
     
+    # Function App connection pool (shared keep-alive session per worker)
+    app.config['FUNCTION_APP_POOL_CONNECTIONS'] = int(os.environ.get('FUNCTION_APP_POOL_CONNECTIONS', '4'))
+    app.config['FUNCTION_APP_POOL_MAXSIZE'] = int(os.environ.get('FUNCTION_APP_POOL_MAXSIZE', '20'))
+    app.config['FUNCTION_APP_POOL_BLOCK'] = os.environ.get('FUNCTION_APP_POOL_BLOCK', 'false').lower() == 'true'
+    app.config['FUNCTION_APP_KEEPALIVE_EXPIRY'] = float(os.environ.get('FUNCTION_APP_KEEPALIVE_EXPIRY', '120'))
+
+    # Shared FunctionAppClient for JSON calls ('requests' keeps every call on the pooled session)
+    app.config['FUNCTION_CLIENT'] = os.environ.get('FUNCTION_CLIENT', 'async').lower()
+    app.config['FUNCTION_CLIENT_RATE_LIMIT'] = int(os.environ.get('FUNCTION_CLIENT_RATE_LIMIT', '600'))
+    app.config['FUNCTION_CLIENT_MAX_RETRIES'] = int(os.environ.get('FUNCTION_CLIENT_MAX_RETRIES', '3'))
+    app.config['FUNCTION_CLIENT_WAIT_MARGIN'] = float(os.environ.get('FUNCTION_CLIENT_WAIT_MARGIN', '60'))
+    app.config['FUNCTION_CLIENT_INIT_BACKOFF'] = float(os.environ.get('FUNCTION_CLIENT_INIT_BACKOFF', '30'))
+
+    # Long-lived MCP server behind /mcp/execute
+    app.config['MCP_EXECUTE_TIMEOUT'] = float(os.environ.get('MCP_EXECUTE_TIMEOUT', '120'))
+    
+    # Background jobs for long-running MDEDispatcher/MDEOrchestrator calls
+    app.config['JOB_MAX_WORKERS'] = int(os.environ.get('JOB_MAX_WORKERS', '8'))
+    app.config['JOB_MAX_PENDING'] = int(os.environ.get('JOB_MAX_PENDING', '64'))
+    app.config['JOB_RESULT_TTL'] = float(os.environ.get('JOB_RESULT_TTL', '3600'))
+    app.config['JOB_READ_TIMEOUT'] = float(os.environ.get('JOB_READ_TIMEOUT', '300'))
+    
+    # Read-through cache for read-only Function App operations
+    app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    app.config['RESPONSE_CACHE_STALE_TTL'] = float(os.environ.get('RESPONSE_CACHE_STALE_TTL', '60'))
+
+    # Per-endpoint circuit breaker and adaptive (AIMD) concurrency limit
+    app.config['BREAKER_FAILURE_THRESHOLD'] = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+    app.config['BREAKER_OPEN_SECONDS'] = float(os.environ.get('BREAKER_OPEN_SECONDS', '30'))
+    app.config['CONCURRENCY_INITIAL_LIMIT'] = int(os.environ.get('CONCURRENCY_INITIAL_LIMIT', '16'))
+    app.config['CONCURRENCY_MIN_LIMIT'] = int(os.environ.get('CONCURRENCY_MIN_LIMIT', '2'))
+    app.config['CONCURRENCY_MAX_LIMIT'] = int(os.environ.get('CONCURRENCY_MAX_LIMIT', '64'))
+    app.config['CONCURRENCY_LATENCY_THRESHOLD'] = float(os.environ.get('CONCURRENCY_LATENCY_THRESHOLD', '20'))
+    app.config['CONCURRENCY_QUEUE_TIMEOUT'] = float(os.environ.get('CONCURRENCY_QUEUE_TIMEOUT', '5'))
+
+    # Streaming JSON relay for large GetIncidents/GetMachines/GetActions responses
+    app.config['STREAMING_RELAY_ENABLED'] = os.environ.get('STREAMING_RELAY_ENABLED', 'true').lower() == 'true'
+    app.config['STREAMING_RELAY_BUFFER_BYTES'] = int(os.environ.get('STREAMING_RELAY_BUFFER_BYTES', str(1024 * 1024)))
+    app.config['STREAMING_RELAY_CHUNK_BYTES'] = int(os.environ.get('STREAMING_RELAY_CHUNK_BYTES', str(64 * 1024)))
+    app.config['STREAMING_RELAY_MAX_ITEM_BYTES'] = int(os.environ.get('STREAMING_RELAY_MAX_ITEM_BYTES', str(8 * 1024 * 1024)))
+
+    # Compression and ETag/304 handling for large JSON API responses
+    app.config['RESPONSE_COMPRESSION_MIN_BYTES'] = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+    app.config['RESPONSE_COMPRESSION_LEVEL'] = int(os.environ.get('RESPONSE_COMPRESSION_LEVEL', '6'))
+    app.config['RESPONSE_SPOOL_BYTES'] = int(os.environ.get('RESPONSE_SPOOL_BYTES', str(1024 * 1024)))
+    # Relayed lists are compressed as they stream and carry no ETag; 'true' spools and hashes
+    # them first so unchanged lists get a 304, at the cost of sending nothing until the upstream body is read
+    app.config['RESPONSE_STREAM_ETAG'] = os.environ.get('RESPONSE_STREAM_ETAG', 'false').lower() == 'true'
+
+    # Server-side incident snapshots for paged /api/incidents queries
+    app.config['INCIDENT_SNAPSHOT_TTL'] = float(os.environ.get('INCIDENT_SNAPSHOT_TTL', '60'))
+    app.config['INCIDENT_SNAPSHOT_MAX_TENANTS'] = int(os.environ.get('INCIDENT_SNAPSHOT_MAX_TENANTS', '64'))
+
+    # Columnar machine inventory behind /api/get_machines
+    app.config['MACHINE_INVENTORY_TTL'] = float(os.environ.get('MACHINE_INVENTORY_TTL', '120'))
+    app.config['MACHINE_INVENTORY_MAX_TENANTS'] = int(os.environ.get('MACHINE_INVENTORY_MAX_TENANTS', '16'))
+
+    # Staged, streamed Live Response library uploads (InvokeUploadLR)
+    app.config['LR_UPLOAD_MAX_BYTES'] = int(os.environ.get('LR_UPLOAD_MAX_BYTES', str(512 * 1024 * 1024)))
+    app.config['LR_UPLOAD_SPOOL_BYTES'] = int(os.environ.get('LR_UPLOAD_SPOOL_BYTES', str(1024 * 1024)))
+    app.config['LR_UPLOAD_CHUNK_BYTES'] = int(os.environ.get('LR_UPLOAD_CHUNK_BYTES', str(3 * 64 * 1024)))
+
+    # Multi-tenant fan-out (/api/fanout)
+    app.config['FANOUT_MAX_WORKERS'] = int(os.environ.get('FANOUT_MAX_WORKERS', '16'))
+    app.config['FANOUT_CONCURRENCY'] = int(os.environ.get('FANOUT_CONCURRENCY', '8'))
+    app.config['FANOUT_READ_TIMEOUT'] = float(os.environ.get('FANOUT_READ_TIMEOUT', '120'))
+    app.config['FANOUT_DEADLINE'] = float(os.environ.get('FANOUT_DEADLINE', '600'))
+
+    # DeviceIds batching for large MDEDispatcher/MDEOrchestrator commands
+    app.config['DEVICE_BATCH_SIZE'] = int(os.environ.get('DEVICE_BATCH_SIZE', '1000'))
+    app.config['DEVICE_BATCH_CONCURRENCY'] = int(os.environ.get('DEVICE_BATCH_CONCURRENCY', '4'))
+
+    # Sharded, parallel bulk incident updates and comments
+    app.config['INCIDENT_SHARD_SIZE'] = int(os.environ.get('INCIDENT_SHARD_SIZE', '25'))
+    app.config['INCIDENT_BULK_CONCURRENCY'] = int(os.environ.get('INCIDENT_BULK_CONCURRENCY', '8'))
+    app.config['INCIDENT_SHARD_RETRIES'] = int(os.environ.get('INCIDENT_SHARD_RETRIES', '2'))
+    app.config['INCIDENT_SHARD_RETRY_BACKOFF'] = float(os.environ.get('INCIDENT_SHARD_RETRY_BACKOFF', '1.0'))
+    app.config['INCIDENT_BULK_READ_TIMEOUT'] = float(os.environ.get('INCIDENT_BULK_READ_TIMEOUT', '60'))
+
+    # Per-incident alert cache and batched alert retrieval
+    app.config['INCIDENT_ALERT_CACHE_ENTRIES'] = int(os.environ.get('INCIDENT_ALERT_CACHE_ENTRIES', '2000'))
+    app.config['INCIDENT_ALERT_CACHE_TTL'] = float(os.environ.get('INCIDENT_ALERT_CACHE_TTL', '900'))
+    app.config['INCIDENT_ALERT_SHARD_SIZE'] = int(os.environ.get('INCIDENT_ALERT_SHARD_SIZE', '10'))
+
+    # Function App pre-warmer and startup prefetch of tenants/device groups
+    app.config['FUNCTION_WARMER_ENABLED'] = os.environ.get('FUNCTION_WARMER_ENABLED', 'true').lower() == 'true'
+    app.config['FUNCTION_WARM_INTERVAL'] = float(os.environ.get('FUNCTION_WARM_INTERVAL', '240'))
+    app.config['FUNCTION_WARM_COLD_THRESHOLD'] = float(os.environ.get('FUNCTION_WARM_COLD_THRESHOLD', '5'))
+    app.config['FUNCTION_WARM_PROBE_TIMEOUT'] = float(os.environ.get('FUNCTION_WARM_PROBE_TIMEOUT', '120'))
+    app.config['FUNCTION_WARM_PREFETCH'] = os.environ.get('FUNCTION_WARM_PREFETCH', 'true').lower() == 'true'
+    app.config['FUNCTION_WARM_ENDPOINTS'] = [name.strip() for name in os.environ.get('FUNCTION_WARM_ENDPOINTS', '').split(',') if name.strip()]
+    
     # Load Azure AI variables into Flask config
     app.config['AZURE_AI_ENDPOINT'] = os.environ.get('AZURE_AI_ENDPOINT')
     app.config['AZURE_AI_KEY'] = os.environ.get('AZURE_AI_KEY')
     app.config['AZURE_AI_DEPLOYMENT'] = os.environ.get('AZURE_AI_DEPLOYMENT', 'gpt-4')
     
     # Import and register blueprints
-    from .routes import main_bp
+    from .routes import main_bp, start_function_warmer
     app.register_blueprint(main_bp)
+    start_function_warmer(app)
     
     # Import and register WebUI proxy blueprint
     try:
@@ -54,6 +154,8 @@ def _perform_app_startup_diagnostics():
     """Perform early application startup diagnostics."""
     # Set up basic logging for startup diagnostics
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # httpx logs every Function App call at INFO; call_azure_function already does
+    logging.getLogger('httpx').setLevel(logging.WARNING)
     logger = logging.getLogger(__name__)
     
     logger.info("🚀 === FLASK APP STARTUP DIAGNOSTICS ===")
@@ -83,5 +185,10 @@ def _perform_app_startup_diagnostics():
             logger.info("✅ All critical environment variables present")
     else:
         logger.info("🔍 Running in local development environment")
+
+    # Jobs, snapshots and caches are per process; /api/jobs/<id> only works on the worker that ran the job
+    if int(os.getenv('WEB_CONCURRENCY', '1')) > 1:
+        logger.warning("⚠️ WEB_CONCURRENCY > 1: job status and events are only answered by the worker that ran "
+                       "the job, so pin clients to a worker (session affinity) or run a single worker")
     
     logger.info("🚀 === FLASK APP STARTUP DIAGNOSTICS COMPLETE ===")
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Per-incident alert cache for the incident manager.
+
+Expanding an incident costs a GetIncidentAlerts call that expands every
+alert and its evidence through Graph. The answer only changes when the
+incident does, so alerts are cached per (tenant, incident) together with
+the incident's lastUpdateDateTime:
+
+- when the caller knows the incident's current lastUpdateDateTime (sent by
+  the browser, or found in the tenant's incident snapshot) a cached entry is
+  used only if it was stored for that same value
+- when it does not, entries are used for at most INCIDENT_ALERT_CACHE_TTL
+- incident updates and comments drop the entries of the incidents they touch
+- the cache is an LRU bounded to INCIDENT_ALERT_CACHE_ENTRIES incidents
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = 900.0     # seconds an entry is trusted when the incident's version is unknown
+
+
+def extract_alerts(result: Any) -> List[Any]:
+    """The alert list inside one incident's GetIncidentAlerts result."""
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict):
+        alerts = result.get('Alerts', result.get('alerts', result.get('value', [])))
+        return alerts if isinstance(alerts, list) else []
+    return []
+
+
+def incident_version(result: Any) -> Optional[str]:
+    """lastUpdateDateTime of the incident a GetIncidentAlerts result describes."""
+    if isinstance(result, dict):
+        value = result.get('LastUpdateDateTime') or result.get('lastUpdateDateTime')
+        return str(value) if value else None
+    return None
+
+
+class IncidentAlertCache:
+    """LRU of alert lists keyed by (tenant, incident id), validated by lastUpdateDateTime."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Optional[str], List[Any], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+
+    def get(self, tenant_id: str, incident_id: Any, version: Optional[str] = None) -> Optional[List[Any]]:
+        """Cached alerts, or None when missing or no longer valid for version."""
+        key = (tenant_id, str(incident_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            cached_version, alerts, stored_at = entry
+            if version is not None:
+                valid = cached_version == version
+            else:
+                valid = time.time() - stored_at < self.ttl
+            if not valid:
+                del self._entries[key]
+                self._stale += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return alerts
+
+    def put(self, tenant_id: str, incident_id: Any, version: Optional[str], alerts: List[Any]) -> None:
+        key = (tenant_id, str(incident_id))
+        with self._lock:
+            self._entries[key] = (version, alerts, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: str, incident_ids: Optional[Iterable[Any]] = None) -> None:
+        """Drop the given incidents' entries, or every entry for the tenant."""
+        with self._lock:
+            if incident_ids is None:
+                for key in [key for key in self._entries if key[0] == tenant_id]:
+                    del self._entries[key]
+            else:
+                for incident_id in incident_ids:
+                    self._entries.pop((tenant_id, str(incident_id)), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale,
+            }
+
+
+_cache: Optional[IncidentAlertCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_alert_cache(config: Optional[Dict[str, Any]] = None) -> IncidentAlertCache:
+    """Get or create the alert cache shared by this worker's request threads."""
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            config = config or {}
+            _cache = IncidentAlertCache(
+                max_entries=int(config.get('INCIDENT_ALERT_CACHE_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                ttl=float(config.get('INCIDENT_ALERT_CACHE_TTL', DEFAULT_TTL)),
+            )
+        return _cache
@@ -0,0 +1,201 @@
+"""
+The MCP server's FunctionAppClient, shared by the Flask routes.
+
+The web app and the MCP server used to reach the Function App through two
+different clients: blocking requests calls here, and an httpx.AsyncClient
+with throttling and tenacity retries in mdeautomator_mcp. Each worker now
+keeps one long-lived FunctionAppClient on a background event loop:
+
+- every Function App call from any request, job or fan-out thread is a
+  coroutine on that one loop, sharing its httpx connection pool, its
+  per-minute rate limit (FUNCTION_CLIENT_RATE_LIMIT) and its retry policy
+- failures to connect are retried with backoff; read timeouts are not,
+  because the function may still be running (call_azure_function reports
+  them as "initiated", as before)
+- calling threads wait on a concurrent.futures.Future, so the loop, not a
+  thread per call, holds the sockets; callers that need many calls at once
+  can submit() them all and wait once. post() waits at most the read
+  timeout plus FUNCTION_CLIENT_WAIT_MARGIN (connect retries, rate limit
+  queue), then cancels the call and raises TimeoutError, so a stuck loop
+  cannot hold request threads indefinitely
+- a client that fails to initialize is closed (loop stopped, thread
+  joined) and the failure is cached for FUNCTION_CLIENT_INIT_BACKOFF
+  seconds, doubling per failure; meanwhile the routes fall back to the
+  requests session
+- FUNCTION_KEY stays authoritative for the routes: when it is set the
+  client sends it and does not read function-key from Key Vault, which is
+  only used when FUNCTION_KEY is unset
+
+Streamed responses (the JSON relay) and staged file uploads still go
+through the requests session in http_pool, which streams from and to
+iterators on the calling thread.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+import httpx
+
+from .mdeautomator_mcp.config import MCPConfig
+from .mdeautomator_mcp.function_client import FunctionAppClient
+
+# Defaults used when the Flask config does not override them
+DEFAULT_RATE_LIMIT = 600        # Function App calls per minute per worker
+DEFAULT_INIT_TIMEOUT = 60.0
+DEFAULT_WAIT_MARGIN = 60.0      # seconds beyond the read timeout for connect retries and the rate limit queue
+DEFAULT_INIT_BACKOFF = 30.0     # seconds before retrying a failed initialization; doubles per failure
+MAX_INIT_BACKOFF = 600.0
+
+
+class AsyncClientUnavailable(Exception):
+    """Raised while a failed client initialization is backing off."""
+
+
+class AsyncFunctionClient:
+    """One FunctionAppClient and the event loop thread that drives it."""
+
+    def __init__(self, config: Dict[str, Any]):
+        mcp_config = MCPConfig.from_flask_config(config)
+        mcp_config.rate_limit_requests = int(config.get('FUNCTION_CLIENT_RATE_LIMIT', DEFAULT_RATE_LIMIT))
+        mcp_config.max_retries = int(config.get('FUNCTION_CLIENT_MAX_RETRIES', mcp_config.max_retries))
+        if mcp_config.function_key:
+            # The routes have always authenticated with FUNCTION_KEY; Key Vault is only the fallback here
+            mcp_config.key_vault_url = None
+        self.rate_limit = mcp_config.rate_limit_requests
+        self.wait_margin = float(config.get('FUNCTION_CLIENT_WAIT_MARGIN', DEFAULT_WAIT_MARGIN))
+        self.client = FunctionAppClient(mcp_config)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='mde-async-client', daemon=True)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._failures = 0
+        self._wait_timeouts = 0
+        self._thread.start()
+        try:
+            initializing = self.submit(self.client.initialize())
+            try:
+                initializing.result(timeout=DEFAULT_INIT_TIMEOUT)
+            except FutureTimeoutError:
+                initializing.cancel()
+                raise TimeoutError(f"Function App client did not initialize within {DEFAULT_INIT_TIMEOUT}s")
+        except BaseException:
+            # Nothing else holds a reference to this client, so its loop and thread must not outlive it
+            self.close()
+            raise
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coroutine: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the client's loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def post(self, function_name: str, payload: Dict[str, Any], read_timeout: float) -> httpx.Response:
+        """POST from a worker thread; blocks until the response, or raises the httpx error or TimeoutError."""
+        with self._lock:
+            self._calls += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        future = self.submit(self.client.post(function_name, payload, read_timeout=read_timeout,
+                                              retry_timeouts=False))
+        wait = read_timeout + self.wait_margin
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._failures += 1
+                self._wait_timeouts += 1
+            raise TimeoutError(f"{function_name} call did not complete within {wait}s on the shared client")
+        except Exception:
+            with self._lock:
+                self._failures += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def serves(self, function_name: str) -> bool:
+        return function_name in self.client.config.function_endpoints
+
+    def close(self) -> None:
+        """Close the client, stop the loop and join its thread."""
+        try:
+            self.submit(self.client.close()).result(timeout=10)
+        except Exception:
+            pass  # a half-initialized client may have nothing to close
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'rate_limit_per_minute': self.rate_limit,
+                'calls': self._calls,
+                'in_flight': self._in_flight,
+                'peak_in_flight': self._peak_in_flight,
+                'failures': self._failures,
+                'wait_timeouts': self._wait_timeouts,
+                'dns': self.client.dns_cache.stats(),
+                'secrets': self.client.secret_cache.stats() if self.client.secret_cache else None,
+            }
+
+
+# One client per worker process (see http_pool for why this is keyed by pid)
+_clients: Dict[int, AsyncFunctionClient] = {}
+_clients_lock = threading.Lock()
+# Last failed initialization per worker: (retry_at, consecutive failures, error)
+_init_failures: Dict[int, Tuple[float, int, str]] = {}
+
+
+def get_async_client(config: Optional[Dict[str, Any]] = None) -> AsyncFunctionClient:
+    """
+    Get or create the shared Function App client for the current worker process.
+
+    A failed initialization is not retried until its backoff has elapsed
+    (FUNCTION_CLIENT_INIT_BACKOFF, doubling per failure); until then this
+    raises AsyncClientUnavailable straight away.
+    """
+    pid = os.getpid()
+    client = _clients.get(pid)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(pid)
+        if client is not None:
+            return client
+        failure = _init_failures.get(pid)
+        if failure is not None and time.monotonic() < failure[0]:
+            raise AsyncClientUnavailable(f"Function App client initialization failed: {failure[2]} "
+                                         f"(retrying in {failure[0] - time.monotonic():.0f}s)")
+        config = config or {}
+        try:
+            client = AsyncFunctionClient(config)
+        except Exception as e:
+            failures = failure[1] + 1 if failure is not None else 1
+            backoff = min(float(config.get('FUNCTION_CLIENT_INIT_BACKOFF', DEFAULT_INIT_BACKOFF)) * 2 ** (failures - 1),
+                          MAX_INIT_BACKOFF)
+            _init_failures.clear()
+            _init_failures[pid] = (time.monotonic() + backoff, failures, str(e) or type(e).__name__)
+            raise
+        _init_failures.pop(pid, None)
+        _clients.clear()
+        _clients[pid] = client
+        return client
+
+
+def get_async_client_stats() -> Optional[Dict[str, Any]]:
+    """Return client counters for this worker, or None if no call was made yet."""
+    client = _clients.get(os.getpid())
+    return client.stats() if client else None
@@ -0,0 +1,280 @@
+"""
+Per-endpoint circuit breaker and adaptive concurrency limit.
+
+A cold start or a 403 storm on one Function App endpoint used to tie up
+every Flask thread for the full 60-300 s read timeout. Each endpoint
+(MDEAutoDB, MDEIncidentManager, ...) now gets its own guard:
+
+- an AIMD concurrency limit that grows by one slot per window of healthy
+  calls and halves when errors or latency spike, at most once per window
+  (calls already in flight when it halved cannot halve it again); callers
+  beyond the limit wait in a short queue and are shed if no slot frees up
+  in time
+- 5xx responses, timeouts, transport errors, auth failures (401/403),
+  request timeouts (408) and throttling (429) count as failures; other 4xx
+  responses (400, 404, 409, ...) are the caller's input, not the
+  endpoint's health
+- a success is slow when it takes longer than the latency threshold and
+  LATENCY_BUDGET of its own read timeout, so jobs allowed 300 s are not
+  judged by the threshold meant for quick reads
+- a circuit breaker that opens after consecutive failures, fails fast while
+  open, and lets a single probe through once the cool-down has elapsed
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_FAILURE_THRESHOLD = 5       # consecutive failures that open the breaker
+DEFAULT_OPEN_SECONDS = 30.0         # cool-down before a half-open probe
+DEFAULT_INITIAL_LIMIT = 16
+DEFAULT_MIN_LIMIT = 2
+DEFAULT_MAX_LIMIT = 64
+DEFAULT_LATENCY_THRESHOLD = 20.0    # seconds; slower calls count as congestion
+DEFAULT_QUEUE_TIMEOUT = 5.0         # seconds a caller may wait for a slot
+LATENCY_BUDGET = 0.8                # fraction of a call's read timeout it may use before counting as slow
+
+# 4xx responses that say the endpoint (or its credentials) is unhealthy rather than the input being wrong
+UNHEALTHY_CLIENT_ERRORS = frozenset({401, 403, 408, 429})
+
+SUCCESS = 'success'
+FAILURE = 'failure'
+NEUTRAL = 'neutral'
+
+
+def classify_outcome(result: Any) -> str:
+    """Decide whether a call_azure_function result counts against the endpoint."""
+    if isinstance(result, dict):
+        if result.get('status') == 'initiated':
+            # Read timeout on a long-running task: says nothing about endpoint health
+            return NEUTRAL
+        if 'error' in result:
+            status_code = result.get('status_code')
+            if status_code is None or status_code >= 500 or status_code in UNHEALTHY_CLIENT_ERRORS:
+                # Timeouts, transport errors, 5xx, auth failures and throttling
+                return FAILURE
+            # Other 4xx (bad input, missing tenant, ...) or an unparseable 2xx body: not a health signal
+            return NEUTRAL
+    return SUCCESS
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probe -> closed."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 open_seconds: float = DEFAULT_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.state != self.OPEN or self.opened_at is None:
+                return 0.0
+            return max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+            if outcome == SUCCESS:
+                self.consecutive_failures = 0
+                self.state = self.CLOSED
+            elif outcome == FAILURE:
+                self.consecutive_failures += 1
+                if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                    if self.state != self.OPEN:
+                        self.times_opened += 1
+                    self.state = self.OPEN
+                    self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease limit on in-flight calls."""
+
+    def __init__(self, initial_limit: int = DEFAULT_INITIAL_LIMIT,
+                 min_limit: int = DEFAULT_MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT,
+                 latency_threshold: float = DEFAULT_LATENCY_THRESHOLD,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.latency_threshold = latency_threshold
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.shed = 0
+        self.decreases = 0
+        self._decreased_at = float('-inf')
+        self._condition = threading.Condition()
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting up to queue_timeout; False means the call is shed."""
+        deadline = time.monotonic() + self.queue_timeout
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                self.queued += 1
+                try:
+                    while self.in_flight >= int(self.limit):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.shed += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            return True
+
+    def is_slow(self, latency: float, timeout: Optional[float] = None) -> bool:
+        """Whether a successful call took long enough to count as congestion."""
+        threshold = self.latency_threshold
+        if timeout:
+            threshold = max(threshold, timeout * LATENCY_BUDGET)
+        return latency > threshold
+
+    def release(self, outcome: str, started: float, timeout: Optional[float] = None) -> None:
+        """Free the slot of a call that began at started (time.monotonic())."""
+        now = time.monotonic()
+        with self._condition:
+            self.in_flight -= 1
+            congested = outcome == FAILURE or (outcome == SUCCESS and self.is_slow(now - started, timeout))
+            if congested:
+                # Calls that were already in flight when the limit last halved report the same congestion
+                if started >= self._decreased_at:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.decreases += 1
+                    self._decreased_at = now
+            elif outcome == SUCCESS:
+                # Roughly +1 slot per limit's worth of healthy calls
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'shed': self.shed,
+                'decreases': self.decreases,
+            }
+
+
+class EndpointGuard:
+    """Breaker plus limiter in front of one Function App endpoint."""
+
+    def __init__(self, name: str, breaker: CircuitBreaker, limiter: AIMDLimiter):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+        self.calls = 0
+        self.last_latency = None
+
+    def call(self, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn (whose read timeout is timeout) under the guard, or return an error dict without calling it."""
+        if not self.breaker.allow():
+            return {
+                'error': f'{self.name} is unavailable (circuit open after repeated failures).',
+                'details': 'Failing fast instead of waiting on the Function App; it will be retried automatically.',
+                'status_code': 503,
+                'circuit_open': True,
+                'retry_after': round(self.breaker.retry_after(), 1),
+            }
+        if not self.limiter.acquire():
+            # The probe slot (if this was one) must not stay reserved
+            self.breaker.record(NEUTRAL)
+            return {
+                'error': f'{self.name} is overloaded, request shed.',
+                'details': f'Concurrency limit of {int(self.limiter.limit)} in-flight calls reached.',
+                'status_code': 503,
+                'shed': True,
+            }
+
+        started = time.monotonic()
+        outcome = FAILURE
+        try:
+            result = fn()
+            outcome = classify_outcome(result)
+            return result
+        finally:
+            latency = time.monotonic() - started
+            self.calls += 1
+            self.last_latency = latency
+            self.limiter.release(outcome, started, timeout)
+            self.breaker.record(outcome)
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {'calls': self.calls, 'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None}
+        data['breaker'] = self.breaker.snapshot()
+        data['concurrency'] = self.limiter.snapshot()
+        return data
+
+
+_guards: Dict[str, EndpointGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_endpoint_guard(function_name: str, config: Optional[Dict[str, Any]] = None) -> EndpointGuard:
+    """Get or create the guard for one Function App endpoint."""
+    guard = _guards.get(function_name)
+    if guard is not None:
+        return guard
+    with _guards_lock:
+        guard = _guards.get(function_name)
+        if guard is None:
+            config = config or {}
+            guard = EndpointGuard(
+                function_name,
+                CircuitBreaker(
+                    failure_threshold=int(config.get('BREAKER_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)),
+                    open_seconds=float(config.get('BREAKER_OPEN_SECONDS', DEFAULT_OPEN_SECONDS)),
+                ),
+                AIMDLimiter(
+                    initial_limit=int(config.get('CONCURRENCY_INITIAL_LIMIT', DEFAULT_INITIAL_LIMIT)),
+                    min_limit=int(config.get('CONCURRENCY_MIN_LIMIT', DEFAULT_MIN_LIMIT)),
+                    max_limit=int(config.get('CONCURRENCY_MAX_LIMIT', DEFAULT_MAX_LIMIT)),
+                    latency_threshold=float(config.get('CONCURRENCY_LATENCY_THRESHOLD', DEFAULT_LATENCY_THRESHOLD)),
+                    queue_timeout=float(config.get('CONCURRENCY_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)),
+                ),
+            )
+            _guards[function_name] = guard
+        return guard
+
+
+def get_endpoint_states() -> Dict[str, Dict[str, Any]]:
+    """Breaker and limiter state for every endpoint this worker has called."""
+    return {name: guard.snapshot() for name, guard in sorted(_guards.items())}
@@ -0,0 +1,208 @@
+"""
+Compression and conditional requests for large JSON API responses.
+
+The incident, indicator, detection, device and hunt query lists are fetched
+again on every page refresh and are usually unchanged. conditional_json
+gives those routes:
+
+- a strong ETag derived from a SHA-256 of the JSON body, with If-None-Match
+  answered by an empty 304
+- gzip/deflate compression negotiated through Accept-Encoding (each encoding
+  gets its own strong ETag, as RFC 9110 requires)
+
+Several of those routes are POST endpoints that also perform writes
+(AddQuery, TI submissions, device actions). Only reads get an ETag and a
+304: GET/HEAD requests and POSTs whose Function is missing (the route's
+default list call) or starts with "Get". Any other call is compressed but
+never answered with 304, since a write must not be reported as Not Modified.
+
+Streamed relay responses are compressed chunk by chunk as they are relayed
+and get no ETag, because a hash is only known once the last upstream byte
+has arrived. With RESPONSE_STREAM_ETAG they are instead hashed and
+compressed into a spooled temporary file first: unchanged lists are then
+answered with a 304, but the browser receives nothing until the whole
+upstream body has been read.
+"""
+
+import gzip
+import hashlib
+import tempfile
+import zlib
+from functools import wraps
+from typing import Iterator, Optional
+
+from flask import Response, current_app, make_response, request
+
+DEFAULT_MIN_BYTES = 1024              # smaller bodies are not worth compressing
+DEFAULT_LEVEL = 6
+DEFAULT_SPOOL_BYTES = 1024 * 1024     # streamed bodies spill to disk beyond this
+
+# Preference order when the client accepts several encodings equally
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+
+def negotiate_encoding(accept_encoding) -> Optional[str]:
+    """Pick the best supported encoding from a parsed Accept-Encoding header."""
+    best = None
+    best_quality = 0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accept_encoding[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compressor(encoding: str, level: int):
+    # wbits 31 writes a gzip header/trailer, 15 a zlib stream (HTTP "deflate")
+    return zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == 'gzip' else 15)
+
+
+def _representation_tag(digest: str, encoding: Optional[str]) -> str:
+    return f'{digest}-{encoding}' if encoding else digest
+
+
+def _not_modified(digest: str) -> bool:
+    """If-None-Match uses weak comparison, so any encoding of the same body matches."""
+    tags = request.if_none_match
+    if not tags:
+        return False
+    return any(tags.contains_weak(_representation_tag(digest, encoding))
+               for encoding in (None,) + SUPPORTED_ENCODINGS)
+
+
+def _finish(response: Response, digest: str, encoding: Optional[str]) -> Response:
+    response.set_etag(_representation_tag(digest, encoding))
+    response.vary.add('Accept-Encoding')
+    # Tenant data: the browser may keep it but must revalidate every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _not_modified_response(digest: str, encoding: Optional[str]) -> Response:
+    return _finish(Response(status=304), digest, encoding)
+
+
+def _iter_spool(spool, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        spool.seek(0)
+        while True:
+            block = spool.read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        spool.close()
+
+
+def _conditional_buffered(response: Response, encoding: Optional[str]) -> Response:
+    body = response.get_data()
+    # A view that already knows its content hash (the MCP tool catalog) sets it as the ETag
+    digest = response.get_etag()[0] or hashlib.sha256(body).hexdigest()[:32]
+    if len(body) < current_app.config.get('RESPONSE_COMPRESSION_MIN_BYTES', DEFAULT_MIN_BYTES):
+        encoding = None
+    if _not_modified(digest):
+        return _not_modified_response(digest, encoding)
+    if encoding:
+        level = current_app.config.get('RESPONSE_COMPRESSION_LEVEL', DEFAULT_LEVEL)
+        if encoding == 'gzip':
+            compressed = gzip.compress(body, compresslevel=level, mtime=0)
+        else:
+            compressed = zlib.compress(body, level)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+    return _finish(response, digest, encoding)
+
+
+def _compressed_stream(response: Response, encoding: str) -> Response:
+    compressor = _compressor(encoding, current_app.config.get('RESPONSE_COMPRESSION_LEVEL', DEFAULT_LEVEL))
+    body = response.response
+
+    def generate() -> Iterator[bytes]:
+        try:
+            for chunk in body:
+                data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                # Flush each relayed chunk so the browser can start parsing before the upstream body ends
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            response.close()
+
+    streamed = Response(generate(), status=response.status_code, mimetype=response.mimetype)
+    streamed.headers['Content-Encoding'] = encoding
+    streamed.vary.add('Accept-Encoding')
+    streamed.headers['Cache-Control'] = 'private, no-cache'
+    return streamed
+
+
+def _compressed_buffered(response: Response, encoding: Optional[str]) -> Response:
+    body = response.get_data()
+    if encoding and len(body) >= current_app.config.get('RESPONSE_COMPRESSION_MIN_BYTES', DEFAULT_MIN_BYTES):
+        level = current_app.config.get('RESPONSE_COMPRESSION_LEVEL', DEFAULT_LEVEL)
+        if encoding == 'gzip':
+            response.set_data(gzip.compress(body, compresslevel=level, mtime=0))
+        else:
+            response.set_data(zlib.compress(body, level))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def is_read_request() -> bool:
+    """Whether the request only reads, so answering it with a 304 cannot skip a write."""
+    if request.method in ('GET', 'HEAD'):
+        return True
+    data = request.get_json(silent=True)
+    function_name = data.get('Function') if isinstance(data, dict) else None
+    return not function_name or str(function_name).startswith('Get')
+
+
+def _conditional_streamed(response: Response, encoding: Optional[str]) -> Response:
+    config = current_app.config
+    spool = tempfile.SpooledTemporaryFile(max_size=config.get('RESPONSE_SPOOL_BYTES', DEFAULT_SPOOL_BYTES))
+    hasher = hashlib.sha256()
+    compressor = _compressor(encoding, config.get('RESPONSE_COMPRESSION_LEVEL', DEFAULT_LEVEL)) if encoding else None
+    try:
+        for chunk in response.response:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            hasher.update(data)
+            spool.write(compressor.compress(data) if compressor else data)
+        if compressor:
+            spool.write(compressor.flush())
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        response.close()
+
+    digest = hasher.hexdigest()[:32]
+    if _not_modified(digest):
+        spool.close()
+        return _not_modified_response(digest, encoding)
+
+    length = spool.tell()
+    spooled = Response(_iter_spool(spool), status=response.status_code, mimetype=response.mimetype)
+    spooled.headers['Content-Length'] = str(length)
+    if encoding:
+        spooled.headers['Content-Encoding'] = encoding
+    return _finish(spooled, digest, encoding)
+
+
+def conditional_json(view):
+    """Add Accept-Encoding handling to a JSON view, and ETag/If-None-Match handling to its reads."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers:
+            return response
+        encoding = negotiate_encoding(request.accept_encodings)
+        read = is_read_request()
+        if response.is_streamed:
+            if read and current_app.config.get('RESPONSE_STREAM_ETAG', False):
+                return _conditional_streamed(response, encoding)
+            return _compressed_stream(response, encoding) if encoding else response
+        if not read:
+            return _compressed_buffered(response, encoding)
+        return _conditional_buffered(response, encoding)
+    return wrapper
@@ -0,0 +1,78 @@
+"""
+DeviceIds batching for MDEDispatcher and MDEOrchestrator.
+
+Both functions act on each device in their DeviceIds list and answer with
+one result object per device. A 5,000-device scan sent as one request is
+one very long Function App call, and the MCP client refuses it outright.
+Large lists are instead split into batches that are dispatched
+concurrently:
+
+- DeviceIds are de-duplicated (order kept) and cut into DEVICE_BATCH_SIZE
+  chunks; at most DEVICE_BATCH_CONCURRENCY chunks are in flight per command
+- per-device results are merged in device order; splitting and merging
+  live in mdeautomator_mcp/device_batches.py, which the MCP client's
+  FunctionAppClient uses as well
+- progress (batches and devices done) is reported after every batch
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from .mdeautomator_mcp.device_batches import batch_error, merge_device_results, split_device_ids
+
+# Functions that take DeviceIds and return one result per device
+BATCHED_FUNCTIONS = ('MDEDispatcher', 'MDEOrchestrator')
+
+# Defaults used when the Flask config does not override them
+DEFAULT_BATCH_SIZE = 1000       # matches the MCP client's MAX_DEVICE_IDS_PER_REQUEST
+DEFAULT_CONCURRENCY = 4         # batches in flight per command
+
+
+def needs_batching(function_name: str, payload: Dict[str, Any], batch_size: int) -> bool:
+    """True when payload targets more devices than one call should carry."""
+    device_ids = payload.get('DeviceIds')
+    return (function_name in BATCHED_FUNCTIONS and not payload.get('allDevices')
+            and isinstance(device_ids, list) and len(device_ids) > batch_size)
+
+
+def dispatch_device_batches(call: Callable[[Dict[str, Any]], Any], payload: Dict[str, Any],
+                            batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY,
+                            progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Any:
+    """
+    Run call(batch_payload) for every DeviceIds batch of payload and merge the results.
+
+    Runs on the caller's thread plus up to `concurrency` batch threads; the
+    caller is normally a background job, so the batches share its lifetime.
+    """
+    batches = split_device_ids(payload['DeviceIds'], batch_size)
+    results: List[Any] = [None] * len(batches)
+    state = {
+        'batches_total': len(batches),
+        'batches_done': 0,
+        'batches_failed': 0,
+        'devices_total': sum(len(batch) for batch in batches),
+        'devices_done': 0,
+    }
+    if progress:
+        progress(dict(state))
+
+    def run_batch(index: int) -> Any:
+        try:
+            return call(dict(payload, DeviceIds=batches[index]))
+        except Exception as e:
+            return {'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches))),
+                            thread_name_prefix='mde-batch') as executor:
+        futures = {executor.submit(run_batch, index): index for index in range(len(batches))}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            state['batches_done'] += 1
+            state['devices_done'] += len(batches[index])
+            if batch_error(results[index]) is not None:
+                state['batches_failed'] += 1
+            if progress:
+                progress(dict(state))
+
+    return merge_device_results(batches, results)
@@ -0,0 +1,255 @@
+"""
+Multi-tenant fan-out for Function App commands.
+
+An MSSP deployment keeps dozens of tenants in MDEAutoDB; pushing one IOC or
+one scan to all of them used to take one click per tenant. A fan-out runs
+the same call for every selected tenant:
+
+- calls run on one executor per worker process, shared by all fan-outs, and
+  each fan-out keeps at most `concurrency` of its tenants in flight, starting
+  the next tenant as soon as one finishes
+- results are delivered in completion order, so a slow tenant only delays
+  its own result; a tenant still unfinished at the deadline is reported as
+  timed out and the rest of the run completes without it
+- closing the run (the client went away) stops tenants that have not
+  started yet from being dispatched
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .jobs import Job, classify_result
+
+# Defaults used when the Flask config does not override them
+DEFAULT_MAX_WORKERS = 16        # threads shared by every fan-out in this worker
+DEFAULT_CONCURRENCY = 8         # tenants in flight per fan-out
+DEFAULT_DEADLINE = 600.0        # seconds before unfinished tenants are reported as timed out
+
+
+class TenantSelectionError(ValueError):
+    """Raised when a tenant selector is malformed or names unknown tenants."""
+
+
+def _enabled(tenant: Dict[str, Any]) -> bool:
+    # MDEAutoDB stores Enabled as a table property; older rows do not have it
+    enabled = tenant.get('Enabled', True)
+    if isinstance(enabled, str):
+        return enabled.strip().lower() != 'false'
+    return enabled is not False
+
+
+def select_tenants(saved: Iterable[Dict[str, Any]], selector: Any,
+                   exclude: Optional[Iterable[str]] = None,
+                   include_disabled: bool = False) -> List[Dict[str, Any]]:
+    """
+    Pick the tenants a fan-out runs against from the MDEAutoDB tenant list.
+
+    selector is "all" (every enabled tenant) or a list of tenant ids, which
+    must all be saved tenants; exclude removes ids from either form.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for tenant in saved:
+        if isinstance(tenant, dict) and tenant.get('TenantId'):
+            by_id.setdefault(str(tenant['TenantId']), tenant)
+
+    if isinstance(selector, str) and selector.lower() == 'all':
+        chosen = [tenant for tenant in by_id.values() if include_disabled or _enabled(tenant)]
+    elif isinstance(selector, list) and selector and all(isinstance(tid, str) and tid for tid in selector):
+        unknown = [tid for tid in selector if tid not in by_id]
+        if unknown:
+            raise TenantSelectionError(f"Unknown tenant(s): {', '.join(unknown)}")
+        chosen = [by_id[tid] for tid in dict.fromkeys(selector)]
+    else:
+        raise TenantSelectionError("tenants must be \"all\" or a non-empty list of tenant ids")
+
+    excluded = set(exclude or ())
+    return [tenant for tenant in chosen if str(tenant['TenantId']) not in excluded]
+
+
+class FanOutRun:
+    """One command fanned out over a list of tenants; iterate events() for the results."""
+
+    def __init__(self, executor: 'FanOutExecutor', tenants: List[Dict[str, Any]],
+                 fn: Callable[[Dict[str, Any]], Any], concurrency: int, deadline: float):
+        self.id = uuid.uuid4().hex
+        self.tenants = tenants
+        self.concurrency = max(1, min(concurrency, len(tenants) or 1))
+        self.deadline = deadline
+        self.started_at = time.time()
+        self.counts: Dict[str, int] = {}
+        self._executor = executor
+        self._fn = fn
+        self._waiting = deque(tenants)
+        self._reported: set = set()
+        self._results: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> 'FanOutRun':
+        for _ in range(self.concurrency):
+            self._dispatch_next()
+        return self
+
+    def _dispatch_next(self) -> None:
+        with self._lock:
+            if self._closed or not self._waiting:
+                return
+            tenant = self._waiting.popleft()
+        self._executor.submit(self._call, tenant)
+
+    def _call(self, tenant: Dict[str, Any]) -> None:
+        started = time.time()
+        result, error = None, None
+        try:
+            result = self._fn(tenant)
+            status = classify_result(result)
+        except Exception as e:
+            status, error = Job.FAILED, str(e)
+        self._results.put(self._entry(tenant, status, started, result, error))
+        self._dispatch_next()
+
+    @staticmethod
+    def _entry(tenant: Dict[str, Any], status: str, started: Optional[float],
+               result: Any = None, error: Optional[str] = None) -> Dict[str, Any]:
+        entry = {
+            'tenant_id': tenant['TenantId'],
+            'client_name': tenant.get('ClientName'),
+            'status': status,
+            'duration': round(time.time() - started, 3) if started else None,
+            'result': result,
+        }
+        if error:
+            entry['error'] = error
+        return entry
+
+    def events(self, heartbeat: float) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield each tenant's result as it finishes, then stop.
+
+        None is yielded every `heartbeat` seconds without a result so the
+        caller can keep its stream alive; at the deadline every tenant still
+        queued or running is yielded as timed out.
+        """
+        ends_at = self.started_at + self.deadline
+        try:
+            while len(self._reported) < len(self.tenants):
+                remaining = ends_at - time.time()
+                if remaining <= 0:
+                    for entry in self._expire():
+                        yield entry
+                    return
+                try:
+                    entry = self._results.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield None
+                    continue
+                yield self._report(entry)
+        finally:
+            self.close()
+
+    def _report(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        self._reported.add(str(entry['tenant_id']))
+        self.counts[entry['status']] = self.counts.get(entry['status'], 0) + 1
+        self._executor._record(entry['status'])
+        return entry
+
+    def _expire(self) -> List[Dict[str, Any]]:
+        self.close()
+        # Results that landed as the deadline passed still count as finished
+        entries = []
+        while True:
+            try:
+                entries.append(self._report(self._results.get_nowait()))
+            except queue.Empty:
+                break
+        for tenant in self.tenants:
+            if str(tenant['TenantId']) not in self._reported:
+                entries.append(self._report(self._entry(
+                    tenant, Job.TIMED_OUT, None,
+                    error=f"No result within the {self.deadline:g}s fan-out deadline")))
+        return entries
+
+    def close(self) -> None:
+        """Stop dispatching tenants that have not started; running calls finish on their own."""
+        with self._lock:
+            self._closed = True
+            self._waiting.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'fanout_id': self.id,
+            'tenants': len(self.tenants),
+            'reported': len(self._reported),
+            'counts': dict(self.counts),
+            'duration': round(time.time() - self.started_at, 3),
+        }
+
+
+class FanOutExecutor:
+    """Thread pool shared by every fan-out in a worker process."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mde-fanout')
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._calls: Dict[str, int] = {}
+
+    def run(self, tenants: List[Dict[str, Any]], fn: Callable[[Dict[str, Any]], Any],
+            concurrency: int = DEFAULT_CONCURRENCY, deadline: float = DEFAULT_DEADLINE) -> FanOutRun:
+        """Start fn(tenant) for every tenant, at most `concurrency` at a time."""
+        with self._lock:
+            self._runs += 1
+        return FanOutRun(self, tenants, fn, concurrency, deadline).start()
+
+    def submit(self, fn: Callable[..., Any], *args) -> None:
+        self._executor.submit(fn, *args)
+
+    def _record(self, status: str) -> None:
+        with self._lock:
+            self._calls[status] = self._calls.get(status, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'max_workers': self.max_workers,
+                'runs': self._runs,
+                'tenant_results': dict(self._calls),
+            }
+
+
+# One executor per worker process (see http_pool for why this is keyed by pid)
+_executors: Dict[int, FanOutExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_fanout_executor(config: Optional[Dict[str, Any]] = None) -> FanOutExecutor:
+    """Get or create the fan-out executor for the current worker process."""
+    pid = os.getpid()
+    executor = _executors.get(pid)
+    if executor is not None:
+        return executor
+
+    with _executors_lock:
+        executor = _executors.get(pid)
+        if executor is None:
+            config = config or {}
+            executor = FanOutExecutor(
+                max_workers=int(config.get('FANOUT_MAX_WORKERS', DEFAULT_MAX_WORKERS)),
+            )
+            _executors.clear()
+            _executors[pid] = executor
+        return executor
+
+
+def get_fanout_stats() -> Optional[Dict[str, Any]]:
+    """Return fan-out counters for this worker, or None if no fan-out ran yet."""
+    executor = _executors.get(os.getpid())
+    return executor.stats() if executor else None
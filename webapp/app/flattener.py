@@ -0,0 +1,364 @@
+"""
+Schema-inferring flattener for nested MDE objects.
+
+Devices, actions, indicators and incident alerts come back as lists of
+nested objects that the UI shows as flat tables. Instead of copying every
+row and special-casing VmMetadata or IpAddresses, the flattener infers a
+column schema from the shape of a row and caches it:
+
+- rows are grouped by their key tuple; a row's shape within its group is
+  the kind of every member (object, array or anything else, so nullable
+  strings do not multiply schemas) plus the member names of the members
+  that have held objects or arrays. A member that turns into an object, or
+  whose object gains a nested member, therefore always yields a new shape
+  and goes through inference rather than reusing a schema that would put
+  the raw object in one cell
+- each schema is bound to a renderer that gathers the row's cells with
+  one itemgetter per object level (the row, VmMetadata, IpAddresses[0])
+  and puts them in table order with one more, so a row of a known shape
+  costs a key-tuple lookup, one probe and one render and is never copied
+
+Flattening rules:
+
+- nested objects become dotted columns (VmMetadata.vmId)
+- an array of objects contributes its first element (IpAddresses.0.ipAddress),
+  as the device table has always shown it
+- arrays of scalars (MachineTags), empty objects/arrays and nulls stay one cell;
+  a member that is flattened in some rows drops its single-cell column when
+  that column only ever held nulls or empty containers
+- pinned columns (MachineTags as the sixth device column) are placed when
+  they are first seen, so the common case needs no reordering pass
+"""
+
+import threading
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Device tables show MachineTags as their sixth column
+MACHINE_COLUMN_PINS = {'MachineTags': 5}
+
+MAX_CACHED_SHAPES = 512
+MAX_DEPTH = 8           # deeper objects are kept as a single cell
+
+_OBJECT = 'object'
+_ARRAY = 'array'
+_MISMATCH = object()    # probe result for a row whose shape the group's probe does not cover
+_CONTAINER_TYPES = frozenset((dict, list))
+_kind = {dict: _OBJECT, list: _ARRAY}.get     # member kind from its type; None for scalars and null
+_HOLE = (None,)
+_SCALAR = 'scalar'      # probe result for a one-cell value that is not null or empty
+
+
+def _nested(value: Any) -> bool:
+    """True for values that flatten into sub-columns: non-empty objects and arrays of objects."""
+    if type(value) is dict:
+        return bool(value)
+    return type(value) is list and bool(value) and type(value[0]) is dict and bool(value[0])
+
+
+def _shape(value: Any, depth: int = 1) -> Optional[tuple]:
+    """Hashable shape of a nested value; None for anything rendered as one cell."""
+    if depth > MAX_DEPTH or not _nested(value):
+        return None
+    if type(value) is list:
+        return (_ARRAY, _shape(value[0], depth))
+    # Member names plus the shapes of container members; scalars need no recursion
+    return (_OBJECT, tuple(value), tuple((key, _shape(child, depth + 1)) for key, child in value.items()
+                                         if type(child) is dict or type(child) is list))
+
+
+def _paths(shape: Optional[tuple], path: Tuple[Any, ...]) -> Iterable[Tuple[Any, ...]]:
+    """Leaf paths (key/index steps) under a shape, in member order."""
+    if shape is None:
+        yield path
+    elif shape[0] == _ARRAY:
+        yield from _paths(shape[1], path + (0,))
+    else:
+        children = dict(shape[2])
+        for key in shape[1]:
+            yield from _paths(children.get(key), path + (key,))
+
+
+def _getter(path: Tuple[Any, ...]) -> Callable[[Any], Any]:
+    """Function returning the value at path (key/index steps); the identity for ()."""
+    if not path:
+        return lambda r: r
+    if len(path) == 1:
+        return itemgetter(path[0])
+    if len(path) == 2:
+        first, second = path
+        return lambda r: r[first][second]
+
+    def get(r):
+        for step in path:
+            r = r[step]
+        return r
+    return get
+
+
+def _tuple_getter(steps: Sequence[Any]) -> Callable[[Any], tuple]:
+    """itemgetter that always returns a tuple, even for a single step or none."""
+    if not steps:
+        return lambda container: ()
+    if len(steps) == 1:
+        step = steps[0]
+        return lambda container: (container[step],)
+    return itemgetter(*steps)
+
+
+def _empty(value: Any) -> bool:
+    return value is None or value == [] or value == {}
+
+
+def _shape_probe(value: Any) -> Any:
+    if type(value) is dict or type(value) is list:
+        shape = _shape(value)
+        if shape is not None:
+            return shape
+    return None if _empty(value) else _SCALAR
+
+
+def _parents(columns: Iterable[str]) -> set:
+    """Every dotted prefix of the flattened column names."""
+    parents = set()
+    for name in columns:
+        while '.' in name:
+            name = name.rsplit('.', 1)[0]
+            parents.add(name)
+    return parents
+
+
+def pin_columns(columns: Sequence[str], pins: Optional[Dict[str, int]]) -> List[str]:
+    """Column names with each pinned column moved to its position."""
+    names = list(columns)
+    for name, position in sorted((pins or {}).items(), key=lambda item: item[1]):
+        if name in names:
+            names.insert(position, names.pop(names.index(name)))
+    return names
+
+
+class _Schema:
+    """
+    Columns and leaf paths for one row shape. empty holds the one-cell
+    columns of probed members that are null or empty in every row of the
+    shape, which need no column where their object is flattened elsewhere.
+    """
+
+    __slots__ = ('columns', 'paths', 'empty')
+
+    def __init__(self, keys: Tuple[str, ...], shapes: Dict[str, Optional[tuple]], empty: Iterable[str] = ()):
+        self.paths: List[Tuple[Any, ...]] = []
+        for key in keys:
+            self.paths.extend(_paths(shapes.get(key), (key,)))
+        self.columns = ['.'.join(str(step) for step in path) for path in self.paths]
+        self.empty = frozenset(empty)
+
+    def renderer(self, positions: Sequence[Optional[int]]) -> Callable[[Dict[str, Any]], List[Any]]:
+        """Function putting each leaf at its table position (None where this shape has no column)."""
+        placed = [(position, path) for position, path in zip(positions, self.paths) if position is not None]
+        width = max((position for position, _ in placed), default=-1) + 1
+        if not width:
+            return lambda r: []
+
+        # Leaves grouped by the object holding them, gathered level by level
+        levels: Dict[Tuple[Any, ...], List[Tuple[int, Any]]] = {}
+        for position, path in placed:
+            levels.setdefault(path[:-1], []).append((position, path[-1]))
+        top_leaves = levels.pop((), [])
+        top = _tuple_getter([step for _, step in top_leaves])
+        gathered = {position: index for index, (position, _) in enumerate(top_leaves)}
+        nested = []
+        for parent, leaves in levels.items():
+            nested.append((_getter(parent), _tuple_getter([step for _, step in leaves])))
+            for position, _ in leaves:
+                gathered[position] = len(gathered)
+        hole = len(gathered)    # positions this shape has no column for read the trailing None
+        order = [gathered.get(position, hole) for position in range(width)]
+
+        # A one-column shape still needs a tuple back from the reorder step
+        reorder = itemgetter(*order) if width > 1 else (lambda cells: (cells[order[0]],))
+
+        def render(r):
+            cells = top(r)
+            for get_parent, get_leaves in nested:
+                cells += get_leaves(get_parent(r))
+            return list(reorder(cells + _HOLE))
+        return render
+
+
+class _KeyGroup:
+    """
+    Schemas for rows sharing one key tuple, keyed by a probe of their
+    members: every member's kind (C-level map() calls), then the member
+    names of members that have held objects or arrays; only members whose
+    objects have held containers themselves pay for a full _shape() walk.
+    """
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.probed: Tuple[str, ...] = ()
+        self.deep: Tuple[str, ...] = ()
+        self.probe: Callable[[Dict[str, Any]], Any] = self._build_probe()
+        self.schemas: Dict[tuple, _Schema] = {}
+        self._lock = threading.Lock()
+
+    def schema(self, row: Dict[str, Any]) -> _Schema:
+        schema = self.schemas.get(self.probe(row))
+        if schema is None:
+            schema = self._infer(row)
+        return schema
+
+    def _build_probe(self) -> Callable[[Dict[str, Any]], Any]:
+        """Signature of a row: probes of the probed members, or _MISMATCH if it needs inference."""
+        named_values = _tuple_getter([key for key in self.probed if key not in self.deep])
+        deep_values = _tuple_getter(list(self.deep))
+
+        def probe(r):
+            # Rows in a group share their key order, so values() lines up with self.keys
+            signature = list(map(_kind, map(type, r.values())))
+            for value in named_values(r):
+                # Member names of an object (or an array's first object) that has held only scalars
+                if type(value) is dict:
+                    if not _CONTAINER_TYPES.isdisjoint(map(type, value.values())):
+                        return _MISMATCH
+                    signature.append(tuple(value))
+                elif type(value) is list and value and type(value[0]) is dict:
+                    if not _CONTAINER_TYPES.isdisjoint(map(type, value[0].values())):
+                        return _MISMATCH
+                    signature.append((0,) + tuple(value[0]))
+                else:
+                    signature.append(None if value is None or value == [] or value == {} else _SCALAR)
+            signature.extend(map(_shape_probe, deep_values(r)))
+            return tuple(signature)
+        return probe
+
+    def _infer(self, row: Dict[str, Any]) -> _Schema:
+        with self._lock:
+            shapes = {}
+            probed, deep = list(self.probed), list(self.deep)
+            for key, value in row.items():
+                shape = _shape(value)
+                shapes[key] = shape
+                if key not in probed and (type(value) is dict or type(value) is list):
+                    probed.append(key)
+                if key not in deep and shape is not None and (shape[1] if shape[0] == _ARRAY else shape)[2]:
+                    deep.append(key)
+            if len(probed) != len(self.probed) or len(deep) != len(self.deep):
+                # A new container member: earlier signatures no longer cover the shape
+                self.probed, self.deep = tuple(probed), tuple(deep)
+                self.probe = self._build_probe()
+                self.schemas = {}
+            signature = self.probe(row)
+            schema = self.schemas.get(signature)
+            if schema is None:
+                # The probe tells null/empty from values only for probed members
+                empty = [key for key in self.probed if shapes[key] is None and _empty(row[key])]
+                schema = self.schemas[signature] = _Schema(self.keys, shapes, empty)
+            return schema
+
+
+_groups: Dict[Tuple[str, ...], _KeyGroup] = {}
+_groups_lock = threading.Lock()
+
+
+def infer_schema(row: Dict[str, Any]) -> _Schema:
+    """Cached schema for the row's shape, inferring it on first sight."""
+    keys = tuple(row)
+    group = _groups.get(keys)
+    if group is None:
+        with _groups_lock:
+            if len(_groups) >= MAX_CACHED_SHAPES:
+                _groups.clear()
+            group = _groups.setdefault(keys, _KeyGroup(keys))
+    return group.schema(row)
+
+
+def schema_cache_stats() -> Dict[str, int]:
+    groups = list(_groups.values())
+    return {
+        'shapes': len(groups),
+        'schemas': sum(len(group.schemas) for group in groups),
+    }
+
+
+class TableFlattener:
+    """
+    Flattens rows into cell lists against a growing column list.
+
+    flatten() returns cells in the current column order; rows flattened
+    before a new column appeared are simply shorter (missing trailing cells
+    are None). table() pads them, drops the single-cell column of members
+    that were flattened elsewhere (VmMetadata when it was null in some rows
+    and VmMetadata.* in others, unless it holds a value) and applies any pin that could not be placed
+    when its column first appeared.
+    """
+
+    def __init__(self, pins: Optional[Dict[str, int]] = None):
+        self.pins = dict(pins or {})
+        self.columns: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._bound: Dict[_Schema, Callable[[Dict[str, Any]], List[Any]]] = {}
+
+    def _bind(self, schema: _Schema) -> Callable[[Dict[str, Any]], List[Any]]:
+        # A null/empty member whose object is already flattened into sub-columns adds nothing
+        parents = _parents(self.columns)
+        new = [name for name in schema.columns
+               if name not in self._index and not (name in parents and name in schema.empty)]
+        if new and self.pins:
+            # Pins can be honoured while the new columns only extend the table
+            ordered = pin_columns(self.columns + new, self.pins)
+            if ordered[:len(self.columns)] == self.columns:
+                new = ordered[len(self.columns):]
+        for name in new:
+            self._index[name] = len(self.columns)
+            self.columns.append(name)
+
+        render = schema.renderer([self._index.get(name) for name in schema.columns])
+        self._bound[schema] = render
+        return render
+
+    def flatten(self, row: Dict[str, Any]) -> List[Any]:
+        group = _groups.get(tuple(row))
+        schema = group.schemas.get(group.probe(row)) if group is not None else None
+        if schema is None:
+            schema = infer_schema(row)
+        render = self._bound.get(schema)
+        if render is None:
+            render = self._bind(schema)
+        return render(row)
+
+    def superseded_columns(self, cells: Callable[[int], Iterable[Any]]) -> List[str]:
+        """
+        Single-cell columns of members that were flattened into sub-columns in
+        other rows and never held anything but nulls or empty containers;
+        cells(index) yields the values of the column at index.
+        """
+        parents = _parents(self.columns)
+        return [name for name in self.columns
+                if name in parents and all(_empty(value) for value in cells(self._index[name]))]
+
+    def table(self, rows: Iterable[Any]) -> Tuple[List[str], List[List[Any]]]:
+        """Flatten every dict in rows into (columns, row lists of equal width)."""
+        flatten = self.flatten
+        cells = [flatten(row) for row in rows if isinstance(row, dict)]
+        width = len(self.columns)
+        for row in cells:
+            if len(row) < width:
+                row.extend([None] * (width - len(row)))
+
+        superseded = set(self.superseded_columns(lambda index: (row[index] for row in cells)))
+        columns = pin_columns([name for name in self.columns if name not in superseded], self.pins)
+        if columns != self.columns:
+            positions = [self._index[name] for name in columns]
+            if len(positions) > 1:
+                reorder = itemgetter(*positions)
+                cells = [list(reorder(row)) for row in cells]
+            else:
+                cells = [[row[position] for position in positions] for row in cells]
+        return columns, cells
+
+
+def flatten_table(rows: Iterable[Any], pins: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Flatten a list of objects into {'columns': [...], 'rows': [[...], ...]}."""
+    columns, cells = TableFlattener(pins).table(rows)
+    return {'columns': columns, 'rows': cells}
@@ -0,0 +1,205 @@
+"""
+Pooled keep-alive HTTP transport for Function App calls.
+
+Every proxy route in routes.py reaches the Function App through
+call_azure_function. This module gives each worker process one shared
+requests.Session with a bounded urllib3 connection pool, so repeat calls
+reuse an established TLS connection instead of paying DNS + TCP + TLS on
+every click. It also counts new handshakes vs. reused connections so the
+saving can be observed on /api/diagnostic.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Defaults used when the Flask config does not override them
+DEFAULT_POOL_CONNECTIONS = 4      # number of distinct hosts kept in the pool manager
+DEFAULT_POOL_MAXSIZE = 20         # connections kept alive per host
+DEFAULT_POOL_BLOCK = False        # block (True) or open an overflow connection (False) when a host pool is exhausted
+DEFAULT_KEEPALIVE_EXPIRY = 120.0  # seconds; Azure front ends drop idle connections after ~230 s
+
+
+class PoolStats:
+    """Thread-safe counters for connection reuse vs. new handshakes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.idle_resets = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def record_idle_reset(self) -> None:
+        with self._lock:
+            self.idle_resets += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': reused,
+                'reuse_ratio': round(reused / self.requests, 3) if self.requests else 0.0,
+                'idle_resets': self.idle_resets,
+            }
+
+
+def _counting_pool(base_cls, stats: PoolStats, keepalive_expiry: float):
+    """
+    Build a connection pool subclass that counts every new connection it opens
+    and closes pooled connections that sat idle longer than keepalive_expiry.
+
+    Each connection is stamped when it goes back to the pool and checked when
+    it is taken out, so under steady traffic the connections at the bottom of
+    the LIFO queue are still dropped before the load balancer's idle timeout.
+    A closed connection reconnects on its next request.
+    """
+
+    class CountingConnectionPool(base_cls):
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            idle_since = getattr(conn, '_idle_since', None)
+            if idle_since is not None:
+                conn._idle_since = None
+                if keepalive_expiry and time.monotonic() - idle_since > keepalive_expiry:
+                    conn.close()
+                    stats.record_idle_reset()
+                    stats.record_new_connection()
+            return conn
+
+        def _put_conn(self, conn):
+            if conn is not None:
+                conn._idle_since = time.monotonic()
+            super()._put_conn(conn)
+
+    CountingConnectionPool.__name__ = f"Counting{base_cls.__name__}"
+    return CountingConnectionPool
+
+
+class PooledFunctionAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that counts handshakes and drops idle connections.
+
+    urllib3 has no idle expiry of its own, so each connection that sat
+    unused longer than keepalive_expiry is closed when it is next checked
+    out, instead of failing half-way through a request (max_retries=0) with
+    a reset from the load balancer.
+    """
+
+    def __init__(self, stats: PoolStats, keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY, **kwargs):
+        self.stats = stats
+        self.keepalive_expiry = keepalive_expiry
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats, self.keepalive_expiry),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats, self.keepalive_expiry),
+        }
+
+    def send(self, request, **kwargs):
+        self.stats.record_request()
+        return super().send(request, **kwargs)
+
+
+class FunctionAppSession:
+    """Per-process pooled session shared by every Function App route."""
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = DEFAULT_POOL_BLOCK,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keepalive_expiry = keepalive_expiry
+        self.stats = PoolStats()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'MDEAutomator-WebApp/1.0.0',
+            'Connection': 'keep-alive',
+        })
+        self.adapter = PooledFunctionAdapter(
+            self.stats,
+            keepalive_expiry=keepalive_expiry,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0,
+        )
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session.post(url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session.get(url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.snapshot()
+        stats.update({
+            'pid': os.getpid(),
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'pool_block': self.pool_block,
+            'keepalive_expiry': self.keepalive_expiry,
+        })
+        return stats
+
+
+# One session per worker process. Keyed by pid so a session created before a
+# pre-fork server (gunicorn --preload) forks is never shared across workers.
+_sessions: Dict[int, FunctionAppSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_function_session(config: Optional[Dict[str, Any]] = None) -> FunctionAppSession:
+    """Get or create the pooled session for the current worker process."""
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(pid)
+        if session is None:
+            config = config or {}
+            session = FunctionAppSession(
+                pool_connections=int(config.get('FUNCTION_APP_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS)),
+                pool_maxsize=int(config.get('FUNCTION_APP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE)),
+                pool_block=bool(config.get('FUNCTION_APP_POOL_BLOCK', DEFAULT_POOL_BLOCK)),
+                keepalive_expiry=float(config.get('FUNCTION_APP_KEEPALIVE_EXPIRY', DEFAULT_KEEPALIVE_EXPIRY)),
+            )
+            _sessions.clear()  # drop any session inherited from a parent process
+            _sessions[pid] = session
+        return session
+
+
+def get_pool_stats() -> Optional[Dict[str, Any]]:
+    """Return pool counters for this worker, or None if no call has been made yet."""
+    session = _sessions.get(os.getpid())
+    return session.get_stats() if session else None
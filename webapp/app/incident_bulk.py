@@ -0,0 +1,119 @@
+"""
+Sharded, parallel bulk incident updates and comments.
+
+/api/incidents/update and /api/incidents/comment used to send every
+selected incident in one MDEIncidentManager call. Each call pays for its
+own MDE connection and the function works through at most ten incidents at
+a time, so triaging hundreds of incidents took minutes. Instead:
+
+- IncidentIds are de-duplicated and cut into INCIDENT_SHARD_SIZE shards;
+  up to INCIDENT_BULK_CONCURRENCY shards are sent as concurrent calls
+- a shard that fails outright (connection error, 5xx, circuit open) is
+  retried on its own with exponential backoff, up to INCIDENT_SHARD_RETRIES
+  times, while the other shards carry on; 4xx answers (bad key, IP
+  restrictions) are not retried
+- a shard that timed out is only retried for UpdateIncident, which sets
+  fields and can safely be repeated; a timed-out comment may already have
+  been posted, so it is reported as failed instead of risking a duplicate
+- results are one {"IncidentId", "Status", "Result"} entry per incident,
+  shard by shard, the shape MDEIncidentManager answers with
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .device_batches import batch_error
+
+# Defaults used when the Flask config does not override them
+DEFAULT_SHARD_SIZE = 25
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 1.0     # seconds before the first retry; doubles for each further one
+
+# Calls that are safe to repeat when an earlier attempt timed out
+IDEMPOTENT_FUNCTIONS = ('UpdateIncident', 'GetIncidentAlerts')
+
+
+def split_incident_ids(incident_ids: Sequence[Any], shard_size: int) -> List[List[Any]]:
+    unique = list(dict.fromkeys(incident_ids))
+    return [unique[start:start + shard_size] for start in range(0, len(unique), shard_size)]
+
+
+def _retryable(result: Any, function: str) -> bool:
+    if isinstance(result, dict):
+        if result.get('status') == 'initiated':
+            return function in IDEMPOTENT_FUNCTIONS
+        status_code = result.get('status_code')
+        if isinstance(status_code, int) and 400 <= status_code < 500 and status_code not in (408, 429):
+            return False
+        return 'error' in result
+    return False
+
+
+def _incident_entries(incident_ids: List[Any], result: Any) -> List[Dict[str, Any]]:
+    """Per-incident entries for one shard's answer."""
+    error = batch_error(result)
+    if error is not None:
+        return [{'IncidentId': incident_id, 'Status': 'Error', 'Result': error} for incident_id in incident_ids]
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict) and ('IncidentId' in result or (len(incident_ids) == 1 and 'Result' in result)):
+        # PowerShell unwraps a one-element array into the object itself
+        return [dict(result, IncidentId=result.get('IncidentId', incident_ids[0]))]
+    # Empty 200/204 answers are normalised to {'status': 'success'} by call_azure_function
+    return [{'IncidentId': incident_id, 'Status': 'Success', 'Result': None} for incident_id in incident_ids]
+
+
+def run_incident_shards(call: Callable[[Dict[str, Any]], Any], payload: Dict[str, Any],
+                        shard_size: int = DEFAULT_SHARD_SIZE, concurrency: int = DEFAULT_CONCURRENCY,
+                        retries: int = DEFAULT_RETRIES,
+                        retry_backoff: float = DEFAULT_RETRY_BACKOFF) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Send payload's IncidentIds as concurrent shards of call(shard_payload).
+
+    Returns (per-incident results, shard by shard, and summary counters).
+    """
+    shards = split_incident_ids(payload['IncidentIds'], shard_size)
+    function = payload.get('Function', '')
+    attempts = [0] * len(shards)
+
+    def run_shard(index: int) -> List[Dict[str, Any]]:
+        shard_payload = dict(payload, IncidentIds=shards[index])
+        while True:
+            attempts[index] += 1
+            try:
+                result = call(shard_payload)
+            except Exception as e:
+                result = {'error': str(e)}
+            if attempts[index] > retries or not _retryable(result, function):
+                return _incident_entries(shards[index], result)
+            time.sleep(retry_backoff * 2 ** (attempts[index] - 1))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(shards))),
+                            thread_name_prefix='mde-incident-shard') as executor:
+        shard_results = list(executor.map(run_shard, range(len(shards))))
+
+    results = [entry for entries in shard_results for entry in entries]
+    failed = sum(1 for entry in results if not isinstance(entry, dict) or entry.get('Status') != 'Success')
+    summary = {
+        'incidents': len(results),
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'shards': len(shards),
+        'retried_shards': sum(1 for count in attempts if count > 1),
+    }
+    return results, summary
+
+
+def failed_incident_ids(results: List[Dict[str, Any]]) -> List[Any]:
+    return [entry.get('IncidentId') for entry in results
+            if isinstance(entry, dict) and entry.get('Status') != 'Success']
+
+
+def bulk_message(verb: str, summary: Dict[str, Any], first_error: Optional[str] = None) -> str:
+    """User-facing summary line, e.g. 'Successfully updated 40 incident(s)'."""
+    if not summary['failed']:
+        return f"Successfully {verb} {summary['succeeded']} incident(s)"
+    message = f"{verb.capitalize()} {summary['succeeded']} of {summary['incidents']} incident(s); {summary['failed']} failed"
+    return f"{message}: {first_error}" if first_error else message
@@ -0,0 +1,260 @@
+"""
+Server-side incident snapshots for the incident queue.
+
+The incident manager used to download every incident in a tenant and filter,
+sort and page it in the browser, which freezes the page on large tenants.
+IncidentStore keeps one immutable snapshot per tenant (refreshed after a TTL
+or after an incident update) with indexes built once per load:
+
+- equality indexes on status, severity and assignedTo (value -> positions)
+- a sorted index on lastUpdateDateTime for range filters and the default sort
+- lazily built sort orders for the other sortable columns
+
+A query turns its filters into a position mask, walks the pre-sorted order
+for the requested column and slices out one page, so each request is O(n)
+with no per-request sort and the browser only receives the rows it renders.
+"""
+
+import base64
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .snapshot_store import DEFAULT_MAX_TENANTS, SnapshotStore
+
+DEFAULT_TTL = 60.0
+DEFAULT_PAGE_LIMIT = 25
+MAX_PAGE_LIMIT = 5000
+
+INDEXED_FIELDS = ('status', 'severity', 'assignedTo')
+SORTABLE_FIELDS = ('id', 'displayName', 'severity', 'status', 'classification',
+                   'assignedTo', 'createdDateTime', 'lastUpdateDateTime')
+DEFAULT_SORT = 'lastUpdateDateTime'
+
+# Severity sorts by rank rather than alphabetically
+SEVERITY_RANK = {'informational': 0, 'low': 1, 'medium': 2, 'high': 3}
+
+
+class IncidentQueryError(ValueError):
+    """Raised for an invalid sort field, filter or cursor."""
+
+
+class IncidentLoadError(Exception):
+    """Raised by a snapshot loader when the Function App did not return incidents."""
+
+
+def _field(incident: Dict[str, Any], name: str) -> Any:
+    """Graph returns camelCase, older function versions PascalCase."""
+    value = incident.get(name)
+    if value is None:
+        value = incident.get(name[0].upper() + name[1:])
+    return value
+
+
+def _text(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+def _last_update(incident: Dict[str, Any]) -> str:
+    return _text(_field(incident, 'lastUpdateDateTime') or _field(incident, 'lastUpdateTime'))
+
+
+def _sort_value(incident: Dict[str, Any], field: str) -> Any:
+    if field == 'severity':
+        return SEVERITY_RANK.get(_text(_field(incident, 'severity')).lower(), -1)
+    if field == 'lastUpdateDateTime':
+        return _last_update(incident)
+    if field in ('createdDateTime', 'id'):
+        return _text(_field(incident, field))
+    return _text(_field(incident, field)).lower()
+
+
+def encode_cursor(sort: str, order: str, key: Tuple[Any, str]) -> str:
+    raw = json.dumps([sort, order, key[0], key[1]], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, Tuple[Any, str]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort, order, value, incident_id = json.loads(raw)
+        return sort, order, (value, incident_id)
+    except (ValueError, TypeError) as e:
+        raise IncidentQueryError('Invalid cursor') from e
+
+
+class IncidentSnapshot:
+    """Immutable, indexed view of one tenant's incidents."""
+
+    def __init__(self, incidents: Iterable[Dict[str, Any]]):
+        # Incidents without an id cannot be selected, updated or paged by cursor
+        self.incidents: List[Dict[str, Any]] = [i for i in incidents
+                                                if isinstance(i, dict) and _field(i, 'id') is not None]
+        self.loaded_at = time.time()
+        self._ids = [_text(_field(i, 'id')) for i in self.incidents]
+
+        self._indexes: Dict[str, Dict[str, List[int]]] = {}
+        for field in INDEXED_FIELDS:
+            index: Dict[str, List[int]] = {}
+            for position, incident in enumerate(self.incidents):
+                index.setdefault(_text(_field(incident, field)).lower(), []).append(position)
+            self._indexes[field] = index
+
+        # Sorted lastUpdateDateTime index: ISO-8601 strings order chronologically
+        self._orders: Dict[str, List[int]] = {}
+        self._keys: Dict[str, List[Tuple[Any, str]]] = {}
+        self._build_order(DEFAULT_SORT)
+        self._updated_values = [self._keys[DEFAULT_SORT][p][0] for p in self._orders[DEFAULT_SORT]]
+        self._positions: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.incidents)
+
+    def last_update(self, incident_id: Any) -> Optional[str]:
+        """lastUpdateDateTime of one incident, or None if it is not in the snapshot."""
+        with self._lock:
+            if self._positions is None:
+                self._positions = {key: position for position, key in enumerate(self._ids)}
+        position = self._positions.get(_text(incident_id))
+        if position is None:
+            return None
+        return _last_update(self.incidents[position]) or None
+
+    def _build_order(self, field: str) -> None:
+        keys = [(_sort_value(incident, field), self._ids[position])
+                for position, incident in enumerate(self.incidents)]
+        self._keys[field] = keys
+        self._orders[field] = sorted(range(len(keys)), key=keys.__getitem__)
+
+    def _order(self, field: str) -> Tuple[List[int], List[Tuple[Any, str]]]:
+        if field not in self._orders:
+            with self._lock:
+                if field not in self._orders:
+                    self._build_order(field)
+        return self._orders[field], self._keys[field]
+
+    def _match(self, filters: Dict[str, Any]) -> Optional[bytearray]:
+        """Position mask for the filters, or None when nothing is filtered."""
+        mask = None
+
+        def narrow(positions: Iterable[int]) -> None:
+            nonlocal mask
+            selected = bytearray(len(self.incidents))
+            for position in positions:
+                selected[position] = 1
+            if mask is None:
+                mask = selected
+            else:
+                mask = bytearray(a & b for a, b in zip(mask, selected))
+
+        for field in INDEXED_FIELDS:
+            wanted = filters.get(field)
+            if wanted in (None, '', []):
+                continue
+            values = wanted if isinstance(wanted, (list, tuple)) else str(wanted).split(',')
+            index = self._indexes[field]
+            narrow(p for value in values
+                   for p in index.get('' if str(value).lower() == 'unassigned' else str(value).strip().lower(), ()))
+
+        updated_from = filters.get('updatedFrom')
+        updated_to = filters.get('updatedTo')
+        if updated_from or updated_to:
+            order = self._orders[DEFAULT_SORT]
+            start = bisect_left(self._updated_values, updated_from) if updated_from else 0
+            end = bisect_right(self._updated_values, updated_to) if updated_to else len(order)
+            narrow(order[start:end])
+
+        search = _text(filters.get('search')).strip().lower()
+        excluded = filters.get('excludeDisplayName') or ()
+        if not isinstance(excluded, (list, tuple)):
+            # A single name; display names may contain commas, so it is not split
+            excluded = [excluded]
+        exclude = [str(term).lower() for term in excluded if term]
+        if search or exclude:
+            def keep(incident: Dict[str, Any], incident_id: str) -> bool:
+                name = _text(_field(incident, 'displayName')).lower()
+                if exclude and (not name or any(term in name for term in exclude)):
+                    return False
+                return not search or search in name or search in incident_id.lower()
+            narrow(p for p, incident in enumerate(self.incidents) if keep(incident, self._ids[p]))
+
+        return mask
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, sort: str = DEFAULT_SORT,
+              order: str = 'desc', offset: int = 0, limit: int = DEFAULT_PAGE_LIMIT,
+              cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Filter, sort and page the snapshot; a cursor takes precedence over offset."""
+        if sort not in SORTABLE_FIELDS:
+            raise IncidentQueryError(f"Cannot sort by '{sort}'. Sortable fields: {', '.join(SORTABLE_FIELDS)}")
+        if order not in ('asc', 'desc'):
+            raise IncidentQueryError("order must be 'asc' or 'desc'")
+        limit = max(1, min(int(limit), MAX_PAGE_LIMIT))
+        offset = max(0, int(offset))
+
+        mask = self._match(filters or {})
+        positions, keys = self._order(sort)
+        matching = positions if mask is None else [p for p in positions if mask[p]]
+        if order == 'desc':
+            matching = matching[::-1]
+
+        if cursor:
+            cursor_sort, cursor_order, after = decode_cursor(cursor)
+            if (cursor_sort, cursor_order) != (sort, order):
+                raise IncidentQueryError('Cursor was issued for a different sort order')
+            ascending = [keys[p] for p in (matching if order == 'asc' else reversed(matching))]
+            if order == 'asc':
+                offset = bisect_right(ascending, after)
+            else:
+                offset = len(ascending) - bisect_left(ascending, after)
+
+        page = matching[offset:offset + limit]
+        next_cursor = None
+        if offset + limit < len(matching) and page:
+            next_cursor = encode_cursor(sort, order, keys[page[-1]])
+
+        severity_counts = {'high': 0, 'medium': 0, 'low': 0, 'informational': 0}
+        by_severity = self._indexes['severity']
+        for severity in severity_counts:
+            bucket = by_severity.get(severity, ())
+            severity_counts[severity] = len(bucket) if mask is None else sum(mask[p] for p in bucket)
+
+        return {
+            'incidents': [self.incidents[p] for p in page],
+            'total': len(matching),
+            'offset': offset,
+            'limit': limit,
+            'sort': sort,
+            'order': order,
+            'next_cursor': next_cursor,
+            'counts': severity_counts,
+        }
+
+
+class IncidentStore(SnapshotStore[IncidentSnapshot]):
+    """Per-tenant incident snapshots; see snapshot_store for the TTL, LRU and invalidation rules."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_tenants: int = DEFAULT_MAX_TENANTS):
+        super().__init__(IncidentSnapshot, ttl, max_tenants)
+
+    def describe(self, snapshot: IncidentSnapshot) -> Dict[str, Any]:
+        return {'incidents': len(snapshot), 'age': round(time.time() - snapshot.loaded_at, 1)}
+
+
+_store: Optional[IncidentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_incident_store(config: Optional[Dict[str, Any]] = None) -> IncidentStore:
+    """Get or create the incident store shared by this worker's request threads."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            config = config or {}
+            _store = IncidentStore(ttl=float(config.get('INCIDENT_SNAPSHOT_TTL', DEFAULT_TTL)),
+                                   max_tenants=int(config.get('INCIDENT_SNAPSHOT_MAX_TENANTS', DEFAULT_MAX_TENANTS)))
+        return _store
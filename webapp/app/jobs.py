@@ -0,0 +1,249 @@
+"""
+Background job registry for long-running Function App calls.
+
+MDEDispatcher and MDEOrchestrator calls can run for minutes. Instead of
+holding a Flask worker thread for that long, or cutting the call off after a
+few seconds and reporting it as "initiated", routes submit the call here and
+return a job id straight away. The final payload is kept in the registry and
+delivered through /api/jobs/<id> (poll) or /api/jobs/<id>/events (server-sent
+events). A job that runs in several steps can publish progress from inside
+its function through current_job().report_progress().
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Defaults used when the Flask config does not override them
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_PENDING = 64        # running + queued jobs before new submissions are refused
+DEFAULT_RESULT_TTL = 3600.0     # seconds a finished job is kept for polling
+
+
+class JobQueueFull(Exception):
+    """Raised when the registry already holds max_pending unfinished jobs."""
+
+
+class Job:
+    """A single background call and its eventual result."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    TIMED_OUT = 'timed_out'
+    FINISHED_STATES = (SUCCEEDED, FAILED, TIMED_OUT)
+
+    def __init__(self, name: str, metadata: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.metadata = metadata or {}
+        self.status = self.QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress: Optional[Dict[str, Any]] = None
+        self.progress_version = 0
+        self._done = threading.Event()
+        self._updated = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or timeout elapses; returns True if finished."""
+        return self._done.wait(timeout)
+
+    def report_progress(self, progress: Dict[str, Any]) -> None:
+        """Publish progress for pollers and event streams."""
+        with self._updated:
+            self.progress = progress
+            self.progress_version += 1
+            self._updated.notify_all()
+
+    def wait_for_update(self, version: int, timeout: Optional[float] = None) -> int:
+        """Block until progress moves past version or the job finishes; returns the latest version."""
+        with self._updated:
+            self._updated.wait_for(lambda: self.progress_version != version or self.done, timeout)
+            return self.progress_version
+
+    def _finish(self, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        with self._updated:
+            self._done.set()
+            self._updated.notify_all()
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            'job_id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'metadata': self.metadata,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.progress is not None:
+            data['progress'] = self.progress
+        if self.finished_at and self.started_at:
+            data['duration'] = round(self.finished_at - self.started_at, 3)
+        if include_result and self.done:
+            data['result'] = self.result
+            if self.error:
+                data['error'] = self.error
+        return data
+
+
+def classify_result(result: Any) -> str:
+    """Map a call_azure_function result onto a finished job state."""
+    if isinstance(result, dict):
+        if 'error' in result:
+            return Job.FAILED
+        if result.get('status') == 'initiated':
+            # The read timeout fired before the Function App answered
+            return Job.TIMED_OUT
+        if result.get('status') == 'failed' or result.get('Status') == 'Error':
+            return Job.FAILED
+    return Job.SUCCEEDED
+
+
+_running = threading.local()
+
+
+def current_job() -> Optional[Job]:
+    """The job whose function is running on this thread, if any."""
+    return getattr(_running, 'job', None)
+
+
+class JobRegistry:
+    """Bounded executor plus an in-memory table of job results."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 result_ttl: float = DEFAULT_RESULT_TTL):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mde-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._accepting = True
+
+    def submit(self, name: str, fn: Callable[..., Any], *args,
+               metadata: Optional[Dict[str, Any]] = None, **kwargs) -> Job:
+        """Queue fn(*args, **kwargs) and return its Job immediately."""
+        job = Job(name, metadata)
+        with self._lock:
+            if not self._accepting:
+                raise JobQueueFull('Job registry is shutting down')
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f'{self._pending} jobs already pending (limit {self.max_pending})')
+            self._pending += 1
+            self._jobs[job.id] = job
+        self._purge_expired()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs) -> None:
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        _running.job = job
+        try:
+            result = fn(*args, **kwargs)
+            job._finish(classify_result(result), result=result)
+        except Exception as e:
+            job._finish(Job.FAILED, error=str(e))
+        finally:
+            _running.job = None
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'pid': os.getpid(),
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'jobs': counts,
+            }
+
+    def drain(self, timeout: float) -> int:
+        """Stop accepting jobs and wait up to timeout for queued and running ones; returns how many are left."""
+        deadline = time.time() + timeout
+        with self._lock:
+            self._accepting = False
+        while True:
+            with self._lock:
+                pending = self._pending
+            if not pending or time.time() >= deadline:
+                return pending
+            time.sleep(0.1)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs; with wait=True, block until in-flight jobs finish."""
+        with self._lock:
+            self._accepting = False
+        self._executor.shutdown(wait=wait)
+
+
+# One registry per worker process (see http_pool for why this is keyed by pid)
+_registries: Dict[int, JobRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_job_registry(config: Optional[Dict[str, Any]] = None) -> JobRegistry:
+    """Get or create the job registry for the current worker process."""
+    pid = os.getpid()
+    registry = _registries.get(pid)
+    if registry is not None:
+        return registry
+
+    with _registries_lock:
+        registry = _registries.get(pid)
+        if registry is None:
+            config = config or {}
+            registry = JobRegistry(
+                max_workers=int(config.get('JOB_MAX_WORKERS', DEFAULT_MAX_WORKERS)),
+                max_pending=int(config.get('JOB_MAX_PENDING', DEFAULT_MAX_PENDING)),
+                result_ttl=float(config.get('JOB_RESULT_TTL', DEFAULT_RESULT_TTL)),
+            )
+            _registries.clear()
+            _registries[pid] = registry
+        return registry
+
+
+def get_job_stats() -> Optional[Dict[str, Any]]:
+    """Return registry counters for this worker, or None if no job was submitted yet."""
+    registry = _registries.get(os.getpid())
+    return registry.stats() if registry else None
+
+
+def drain_jobs(timeout: float) -> int:
+    """Drain this worker's registry before the process exits; returns the number of unfinished jobs."""
+    registry = _registries.get(os.getpid())
+    return registry.drain(timeout) if registry else 0
@@ -0,0 +1,311 @@
+"""
+Streaming JSON relay for large Function App responses.
+
+GetIncidents, GetMachines and GetActions can return tens of MB for a big
+tenant. Buffering resp.text, parsing it and re-serializing it with jsonify
+keeps three copies of the payload in a worker at once. The relay instead
+reads the upstream body chunk by chunk, parses the one large array in it
+(either the document itself or the "Result" array of the usual
+{"Status": "Success", "Result": [...]} envelope) one element at a time, and
+writes chunked JSON back out, so peak memory is bounded by the read-ahead
+buffer plus a single element.
+
+Small responses (anything that completes within buffer_bytes) are returned
+as a fully parsed value instead, so errors and short lists still go through
+the normal route logic and the response cache.
+"""
+
+import codecs
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Operations whose responses are relayed instead of buffered
+STREAMED_OPERATIONS = {'GetIncidents', 'GetMachines', 'GetActions'}
+
+# Envelope keys that may hold the large array
+ENVELOPE_ARRAY_KEYS = ('Result', 'incidents', 'Incidents')
+
+DEFAULT_BUFFER_BYTES = 1024 * 1024          # read-ahead before switching to streaming
+DEFAULT_CHUNK_BYTES = 64 * 1024             # size of each chunk written to the browser
+DEFAULT_MAX_ITEM_BYTES = 8 * 1024 * 1024    # largest single array element accepted
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+_decoder = json.JSONDecoder()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class JsonRelayError(ValueError):
+    """Raised when the upstream body is not valid JSON or an element is too large."""
+
+
+class _Reader:
+    """Text buffer over a byte-chunk iterator that decodes one JSON value at a time."""
+
+    def __init__(self, chunks: Iterable[bytes], max_item_bytes: int):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.max_item_bytes = max_item_bytes
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+        self._started = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk, dropping consumed text; False once the body is exhausted."""
+        if self.eof:
+            return False
+        text = ''
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            text = self._utf8.decode(chunk)
+            if not self._started and text:
+                self._started = True
+                text = text.lstrip('\ufeff')  # PowerShell hosts sometimes emit a BOM
+            if text:
+                break
+        else:
+            text = self._utf8.decode(b'', final=True)
+            self.eof = True
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        if len(self.buf) > self.max_item_bytes:
+            raise JsonRelayError(f'JSON element larger than {self.max_item_bytes} bytes')
+        return bool(text)
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at the end of the body."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def take(self, expected: str) -> str:
+        ch = self.peek()
+        if ch not in expected:
+            raise JsonRelayError(f'Expected one of {expected!r} at byte {self.bytes_read}, got {ch!r}')
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut at a chunk boundary ("1." + "5", "2e" + "3") decodes as its prefix,
+                # so it is only complete once something other than a number character follows it
+                if self.eof or not _is_number(value) or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise JsonRelayError(f'Invalid JSON from Function App: {e}') from e
+            self._fill()
+
+
+def _array_items(reader: _Reader) -> Iterator[Any]:
+    """Yield elements of an array whose '[' has already been consumed."""
+    if reader.peek() == ']':
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.take(',]') == ']':
+            return
+
+
+def _member_names(reader: _Reader) -> Iterator[str]:
+    """Yield member names of an object whose '{' has been consumed; the caller reads each value."""
+    if reader.peek() == '}':
+        reader.pos += 1
+        return
+    while True:
+        if reader.peek() != '"':
+            raise JsonRelayError('Expected an object key')
+        name = reader.value()
+        reader.take(':')
+        yield name
+        if reader.take(',}') == '}':
+            return
+
+
+class JsonRelay:
+    """
+    A partially read response whose large array is still being streamed.
+
+    envelope holds the object members that preceded the array (None when the
+    document is the array itself); members after the array land in trailer
+    once items() has been exhausted.
+    """
+
+    def __init__(self, reader: _Reader, envelope: Optional[Dict[str, Any]], key: Optional[str],
+                 buffered: List[Any], items: Iterator[Any], members: Optional[Iterator[str]]):
+        self.envelope = envelope
+        self.key = key
+        self.trailer: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.on_close: Optional[Callable[[], None]] = None
+        self._reader = reader
+        self._buffered = buffered
+        self._items = items
+        self._members = members
+
+    def items(self) -> Iterator[Any]:
+        buffered, self._buffered = self._buffered, []
+        yield from buffered
+        del buffered
+        yield from self._items
+        if self._members is not None:
+            for name in self._members:
+                self.trailer[name] = self._reader.value()
+
+    def close(self) -> None:
+        if self.on_close is not None:
+            self.on_close()
+            self.on_close = None
+
+
+class CompleteDocument:
+    """Marker for a body that was read in full; value is the parsed document."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def open_json_relay(chunks: Iterable[bytes],
+                    array_keys: Iterable[str] = ENVELOPE_ARRAY_KEYS,
+                    buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+                    max_item_bytes: int = DEFAULT_MAX_ITEM_BYTES):
+    """
+    Start reading a JSON body.
+
+    Returns None for an empty body, a CompleteDocument holding the parsed value when
+    the whole document fits in buffer_bytes, or a JsonRelay to stream from.
+    """
+    reader = _Reader(chunks, max_item_bytes)
+    first = reader.peek()
+    if not first:
+        return None
+
+    envelope = None
+    key = None
+    members = None
+    if first == '[':
+        reader.pos += 1
+    elif first == '{':
+        reader.pos += 1
+        envelope = {}
+        members = _member_names(reader)
+        for name in members:
+            if name in array_keys and reader.peek() == '[':
+                reader.pos += 1
+                key = name
+                break
+            envelope[name] = reader.value()
+        if key is None:
+            return CompleteDocument(_finish(reader, envelope))
+    else:
+        return CompleteDocument(_finish(reader, reader.value()))
+
+    items = _array_items(reader)
+    buffered = []
+    for item in items:
+        buffered.append(item)
+        if reader.bytes_read > buffer_bytes:
+            return JsonRelay(reader, envelope, key, buffered, items, members)
+
+    if key is None:
+        return CompleteDocument(_finish(reader, buffered))
+    envelope[key] = buffered
+    for name in members:
+        envelope[name] = reader.value()
+    return CompleteDocument(_finish(reader, envelope))
+
+
+def _finish(reader: _Reader, value: Any) -> Any:
+    if reader.peek():
+        raise JsonRelayError('Unexpected data after JSON document')
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _members(obj: Dict[str, Any]) -> str:
+    return ','.join(f'{_dumps(k)}:{_dumps(v)}' for k, v in obj.items())
+
+
+def iter_json_chunks(relay: JsonRelay,
+                     wrapper: Optional[Dict[str, Any]] = None,
+                     wrapper_key: Optional[str] = None,
+                     unwrap: bool = False,
+                     chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[str]:
+    """
+    Serialize a relay as chunked JSON.
+
+    With wrapper/wrapper_key the document is nested as wrapper[wrapper_key]
+    (mirroring the jsonify calls in routes.py); unwrap emits only the array,
+    dropping the Status envelope. If the upstream body breaks mid-stream the
+    open structures are closed and the error is reported as "stream_error".
+    A bare array has nowhere to report it, so the JsonRelayError is raised
+    instead of writing the closing ']' and the truncated document stays
+    invalid JSON.
+    """
+    bare = wrapper_key is None and (unwrap or relay.key is None)
+
+    def document() -> Iterator[str]:
+        if unwrap or relay.key is None:
+            yield '['
+        else:
+            head = _members(relay.envelope)
+            yield '{' + head + (',' if head else '') + _dumps(relay.key) + ':['
+
+        pending: List[str] = []
+        size = 0
+        separator = ''
+        try:
+            for item in relay.items():
+                text = separator + _dumps(item)
+                separator = ','
+                pending.append(text)
+                size += len(text)
+                if size >= chunk_bytes:
+                    yield ''.join(pending)
+                    pending, size = [], 0
+        except (JsonRelayError, OSError, ValueError) as e:
+            relay.error = str(e)
+        if pending:
+            yield ''.join(pending)
+        if relay.error and bare:
+            raise JsonRelayError(relay.error)
+
+        if unwrap or relay.key is None:
+            yield ']'
+        else:
+            tail = dict(relay.trailer)
+            if relay.error and wrapper_key is None:
+                tail['stream_error'] = relay.error
+            rest = _members(tail)
+            yield ']' + (',' if rest else '') + rest + '}'
+
+    try:
+        if wrapper_key is None:
+            yield from document()
+        else:
+            head = _members(wrapper or {})
+            yield '{' + head + (',' if head else '') + _dumps(wrapper_key) + ':'
+            yield from document()
+            yield (',"stream_error":' + _dumps(relay.error) if relay.error else '') + '}'
+    finally:
+        relay.close()
@@ -0,0 +1,367 @@
+"""
+Columnar machine inventory.
+
+GetMachines returns one dict per device; for 100k+ device tenants building
+per-row copies, flattening each one and then re-walking them for every
+filter or page is what makes the device views slow. MachineInventory
+flattens each row through the shared TableFlattener (VmMetadata.*,
+IpAddresses.0.*) into one list per column as the rows stream in, so the
+row dicts can be dropped straight away. Low-cardinality columns
+(OsPlatform, RiskScore, HealthStatus, RbacGroupName, ...) are dictionary
+encoded: each cell is a small integer code, filters are evaluated once per
+distinct value, and sorting compares codes by rank.
+
+Queries select rows by index, sort through a cached per-column order, and
+only materialise the projected columns for the requested page.
+"""
+
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .flattener import MACHINE_COLUMN_PINS, TableFlattener, pin_columns
+from .snapshot_store import DEFAULT_MAX_TENANTS, SnapshotStore
+
+DEFAULT_TTL = 120.0
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 10000
+MAX_DICTIONARY_SIZE = 65535   # distinct values before a column stays unencoded
+
+# Columns matched by the free-text "search" filter, when present
+SEARCH_COLUMNS = ('Id', 'ComputerDnsName', 'LastIpAddress', 'LastExternalIpAddress', 'RbacGroupName', 'MachineTags')
+
+
+class InventoryQueryError(ValueError):
+    """Raised for an unknown column or an invalid filter/sort."""
+
+
+class InventoryLoadError(Exception):
+    """Raised by an inventory loader when the Function App did not return machines."""
+
+
+class _Column:
+    """One column, either plain values or dictionary codes into distinct values."""
+
+    __slots__ = ('name', 'values', 'codes', 'dictionary')
+
+    def __init__(self, name: str, values: List[Any]):
+        self.name = name
+        self.values: Optional[List[Any]] = values
+        self.codes: Optional[array] = None
+        self.dictionary: Optional[List[Any]] = None
+
+    def encode(self) -> None:
+        """Dictionary-encode the column when its values are hashable and repeat enough."""
+        # Keyed by type as well, so 1, 1.0 and True (equal and same-hashed) keep their own codes
+        distinct: Dict[Any, int] = {}
+        dictionary: List[Any] = []
+        codes = array('I')
+        try:
+            for value in self.values:
+                key = (value.__class__, value)
+                code = distinct.get(key)
+                if code is None:
+                    if len(distinct) >= MAX_DICTIONARY_SIZE:
+                        return
+                    code = distinct[key] = len(dictionary)
+                    dictionary.append(value)
+                codes.append(code)
+        except TypeError:
+            return  # lists/dicts (e.g. MachineTags) stay as plain values
+        if len(distinct) > max(len(codes) // 2, 16):
+            return
+        self.dictionary = dictionary
+        self.codes = codes
+        self.values = None
+
+    def get(self, row: int) -> Any:
+        if self.codes is not None:
+            return self.dictionary[self.codes[row]]
+        return self.values[row]
+
+    def selector(self, predicate: Callable[[Any], bool]) -> Callable[[int], bool]:
+        """Row test for predicate; encoded columns evaluate it once per distinct value."""
+        if self.codes is not None:
+            allowed = bytearray(1 if predicate(value) else 0 for value in self.dictionary)
+            codes = self.codes
+            return lambda row: allowed[codes[row]]
+        values = self.values
+        return lambda row: predicate(values[row])
+
+
+def _sort_key(value: Any):
+    # None sorts last; numbers before strings; lists by their joined text
+    if value is None:
+        return (2, '')
+    if isinstance(value, bool):
+        return (1, str(value).lower())
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, (list, tuple)):
+        return (1, ', '.join(str(v) for v in value).lower())
+    return (1, str(value).lower())
+
+
+def _scalar_predicate(spec: Any) -> Callable[[Any], bool]:
+    """Build a value test from a filter spec: a value, a list of values, or an operator dict."""
+    if isinstance(spec, dict):
+        tests = []
+        for op, operand in spec.items():
+            if op == 'eq':
+                tests.append(_scalar_predicate(operand))
+            elif op == 'in':
+                tests.append(_scalar_predicate(list(operand)))
+            elif op == 'ne':
+                inner = _scalar_predicate(operand)
+                tests.append(lambda v, inner=inner: not inner(v))
+            elif op == 'contains':
+                needle = str(operand).lower()
+                tests.append(lambda v, needle=needle: v is not None and needle in str(v).lower())
+            elif op == 'startswith':
+                prefix = str(operand).lower()
+                tests.append(lambda v, prefix=prefix: v is not None and str(v).lower().startswith(prefix))
+            elif op in ('gt', 'gte', 'lt', 'lte'):
+                tests.append(_comparison(op, operand))
+            elif op == 'exists':
+                wanted = bool(operand)
+                tests.append(lambda v, wanted=wanted: (v not in (None, '', [])) == wanted)
+            else:
+                raise InventoryQueryError(f"Unknown filter operator '{op}'")
+        return lambda v: all(test(v) for test in tests)
+
+    if isinstance(spec, (list, tuple)):
+        wanted = {str(item).lower() for item in spec}
+        return lambda v: v is not None and str(v).lower() in wanted
+    if spec is None:
+        return lambda v: v in (None, '')
+    target = str(spec).lower()
+    return lambda v: v is not None and str(v).lower() == target
+
+
+def _comparison(op: str, operand: Any) -> Callable[[Any], bool]:
+    def test(value: Any) -> bool:
+        if value is None:
+            return False
+        try:
+            if op == 'gt':
+                return value > operand
+            if op == 'gte':
+                return value >= operand
+            if op == 'lt':
+                return value < operand
+            return value <= operand
+        except TypeError:
+            return False
+    return test
+
+
+def _predicate(spec: Any) -> Callable[[Any], bool]:
+    """Cell test; list-valued cells (tags, IP lists) match when any element does."""
+    scalar = _scalar_predicate(spec)
+
+    def test(value: Any) -> bool:
+        if isinstance(value, list):
+            return any(scalar(item) for item in value) if value else scalar(None)
+        return scalar(value)
+    return test
+
+
+class MachineInventory:
+    """Immutable columnar view of one tenant's GetMachines output."""
+
+    def __init__(self, machines: Iterable[Dict[str, Any]]):
+        flattener = TableFlattener()
+        columns: List[List[Any]] = []
+        count = 0
+        for machine in machines:
+            if not isinstance(machine, dict):
+                continue
+            cells = flattener.flatten(machine)
+            while len(columns) < len(flattener.columns):
+                columns.append([None] * count)
+            for column, value in zip(columns, cells):
+                column.append(value)
+            # Rows of an earlier shape do not cover columns added since
+            for column in columns[len(cells):]:
+                column.append(None)
+            count += 1
+
+        self.size = count
+        self.loaded_at = time.time()
+        self._columns: Dict[str, _Column] = {}
+        superseded = set(flattener.superseded_columns(columns.__getitem__))
+        for name, values in zip(flattener.columns, columns):
+            if name in superseded:
+                continue
+            column = _Column(name, values)
+            column.encode()
+            self._columns[name] = column
+        self._aliases = {name.lower(): name for name in self._columns}
+        self._orders: Dict[str, List[int]] = {}
+        self._search: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names in first-seen order, with MachineTags moved to the sixth position."""
+        return pin_columns(self._columns, MACHINE_COLUMN_PINS)
+
+    def column(self, name: str) -> _Column:
+        actual = self._aliases.get(str(name).lower())
+        if actual is None:
+            raise InventoryQueryError(f"Unknown column '{name}'")
+        return self._columns[actual]
+
+    def _order(self, name: str) -> List[int]:
+        if name not in self._orders:
+            with self._lock:
+                if name not in self._orders:
+                    column = self._columns[name]
+                    if column.codes is not None:
+                        ranks = sorted(range(len(column.dictionary)), key=lambda c: _sort_key(column.dictionary[c]))
+                        rank_of = array('I', [0]) * len(ranks)
+                        for rank, code in enumerate(ranks):
+                            rank_of[code] = rank
+                        codes = column.codes
+                        order = sorted(range(self.size), key=lambda row: rank_of[codes[row]])
+                    else:
+                        values = column.values
+                        order = sorted(range(self.size), key=lambda row: _sort_key(values[row]))
+                    self._orders[name] = order
+        return self._orders[name]
+
+    def select(self, filters: Optional[Dict[str, Any]] = None) -> Optional[List[int]]:
+        """Row indexes matching every filter (None means all rows)."""
+        rows: Optional[List[int]] = None
+        for name, spec in (filters or {}).items():
+            if name == 'search':
+                continue
+            test = self.column(name).selector(_predicate(spec))
+            rows = [row for row in (range(self.size) if rows is None else rows) if test(row)]
+
+        search = (filters or {}).get('search')
+        if search not in (None, ''):
+            needle = str(search).lower()
+            text = self._search_text()
+            rows = [row for row in (range(self.size) if rows is None else rows) if needle in text[row]]
+        return rows
+
+    def _search_text(self) -> List[str]:
+        """Lower-cased SEARCH_COLUMNS text per row, built on the first free-text search."""
+        if self._search is None:
+            with self._lock:
+                if self._search is None:
+                    columns = [self._columns[self._aliases[name.lower()]]
+                               for name in SEARCH_COLUMNS if name.lower() in self._aliases]
+
+                    def text(value: Any) -> str:
+                        if value is None:
+                            return ''
+                        if isinstance(value, list):
+                            return '\x1f'.join(str(item) for item in value)
+                        return str(value)
+
+                    self._search = ['\x1f'.join(text(column.get(row)) for column in columns).lower()
+                                    for row in range(self.size)]
+        return self._search
+
+    def facet(self, name: str, rows: Optional[List[int]]) -> Dict[str, int]:
+        """Value counts for a column over the selected rows (list cells count each element)."""
+        column = self.column(name)
+        counts: Dict[Any, int] = {}
+        if column.codes is not None:
+            code_counts = [0] * len(column.dictionary)
+            codes = column.codes
+            for row in (range(self.size) if rows is None else rows):
+                code_counts[codes[row]] += 1
+            for code, value in enumerate(column.dictionary):
+                if code_counts[code]:
+                    counts[(value.__class__, value)] = code_counts[code]
+        else:
+            for row in (range(self.size) if rows is None else rows):
+                value = column.values[row]
+                for item in (value if isinstance(value, list) else (value,)):
+                    try:
+                        key = (item.__class__, item)
+                        counts[key] = counts.get(key, 0) + 1
+                    except TypeError:
+                        break  # nested objects are not facetable
+        labels: Dict[str, int] = {}
+        for (_, value), count in counts.items():
+            label = '' if value is None else str(value)
+            labels[label] = labels.get(label, 0) + count
+        return labels
+
+    def query(self, columns: Optional[Sequence[str]] = None, filters: Optional[Dict[str, Any]] = None,
+              sort: Optional[str] = None, order: str = 'asc', offset: int = 0,
+              limit: int = DEFAULT_PAGE_LIMIT, facets: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Project, filter, sort and page the inventory into row-major lists."""
+        if order not in ('asc', 'desc'):
+            raise InventoryQueryError("order must be 'asc' or 'desc'")
+        projected = [self.column(name) for name in (columns or self.columns)]
+        limit = max(1, min(int(limit), MAX_PAGE_LIMIT))
+        offset = max(0, int(offset))
+
+        rows = self.select(filters)
+        if sort:
+            ordered = self._order(self.column(sort).name)
+            if rows is not None:
+                selected = bytearray(self.size)
+                for row in rows:
+                    selected[row] = 1
+                ordered = [row for row in ordered if selected[row]]
+            if order == 'desc':
+                ordered = ordered[::-1]
+        else:
+            ordered = range(self.size) if rows is None else rows
+            if order == 'desc':
+                ordered = ordered[::-1]
+
+        page = ordered[offset:offset + limit]
+        return {
+            'columns': [column.name for column in projected],
+            'machines': [[column.get(row) for column in projected] for row in page],
+            'total': len(ordered),
+            'offset': offset,
+            'limit': limit,
+            'facets': {self.column(name).name: self.facet(name, rows) for name in (facets or ())},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rows': self.size,
+            'columns': len(self._columns),
+            'encoded_columns': sum(1 for column in self._columns.values() if column.codes is not None),
+            'age': round(time.time() - self.loaded_at, 1),
+        }
+
+
+class InventoryStore(SnapshotStore[MachineInventory]):
+    """Per-tenant machine inventories; see snapshot_store for the TTL, LRU and invalidation rules."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_tenants: int = DEFAULT_MAX_TENANTS):
+        super().__init__(MachineInventory, ttl, max_tenants)
+
+    def describe(self, snapshot: MachineInventory) -> Dict[str, Any]:
+        return snapshot.stats()
+
+
+_store: Optional[InventoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_inventory_store(config: Optional[Dict[str, Any]] = None) -> InventoryStore:
+    """Get or create the machine inventory store shared by this worker's request threads."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            config = config or {}
+            _store = InventoryStore(ttl=float(config.get('MACHINE_INVENTORY_TTL', DEFAULT_TTL)),
+                                    max_tenants=int(config.get('MACHINE_INVENTORY_MAX_TENANTS', DEFAULT_MAX_TENANTS)))
+        return _store
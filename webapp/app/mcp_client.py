@@ -33,6 +33,7 @@ try:
     from mdeautomator_mcp.server import MDEAutomatorMCPServer
     from mdeautomator_mcp.config import MCPConfig
     from mdeautomator_mcp.tools import get_all_tools
+    from mdeautomator_mcp.catalog import get_tool_catalog
     MCP_AVAILABLE = True
     print("Full MCP server components loaded successfully")
 except ImportError as e:
@@ -67,6 +68,7 @@ except ImportError as e:
             mcp_tools_module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(mcp_tools_module)
             get_all_tools = mcp_tools_module.get_all_tools
+            get_tool_catalog = mcp_tools_module.get_tool_catalog
             
             MCP_AVAILABLE = True
             print("MCP server components loaded via importlib")
@@ -79,6 +81,7 @@ except ImportError as e:
         MDEAutomatorMCPServer = None
         MCPConfig = None
         get_all_tools = lambda: []
+        get_tool_catalog = None
 
 
 class IntegratedMCPClient:
@@ -190,22 +193,18 @@ class IntegratedMCPClient:
     def get_available_tools(self) -> List[Dict[str, Any]]:
         """Get all available MCP tools."""
         try:
-            if not MCP_AVAILABLE or not get_all_tools:
-                return []
-                
-            tools = get_all_tools()
-            return [
-                {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "inputSchema": tool.inputSchema
-                }
-                for tool in tools
-            ]
+            catalog = self.tool_catalog()
+            return list(catalog.descriptors) if catalog else []
         except Exception as e:
             logger.error(f"Failed to get tools: {e}")
             return []
     
+    def tool_catalog(self):
+        """The precomputed tool catalog (descriptors, serialized payloads, ETag), or None."""
+        if not MCP_AVAILABLE or not get_tool_catalog:
+            return None
+        return get_tool_catalog()
+    
     async def call_mcp_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call an MCP tool directly."""
         try:
@@ -0,0 +1,112 @@
+"""
+Long-lived MCP execution engine behind /mcp/execute.
+
+/mcp/execute used to start a thread and a new event loop per request and,
+inside it, build an MCPConfig, an MDEAutomatorMCPServer (startup
+diagnostics included) and a FunctionAppClient whose initialize() created a
+DefaultAzureCredential, possibly read the function key from Key Vault and
+opened a new httpx pool, all thrown away after one tool call.
+
+Each worker now builds the server once and keeps it:
+
+- tool calls run as coroutines on the worker's shared event loop (the one
+  async_client keeps for the Flask routes), submitted with
+  run_coroutine_threadsafe, so there is no thread or loop per request
+- the server's FunctionAppClient is the shared, already initialized one, so
+  MCP tools and the routes use one credential, key, rate limit and pool
+- a call that outlives MCP_EXECUTE_TIMEOUT is cancelled on the loop, rather
+  than left running in an abandoned thread, and reported as a timeout
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional
+
+from .async_client import get_async_client
+from .mdeautomator_mcp.config import MCPConfig
+from .mdeautomator_mcp.registry import TOOL_REGISTRY
+
+# Defaults used when the Flask config does not override them
+DEFAULT_EXECUTE_TIMEOUT = 120.0
+
+
+class MCPEngine:
+    """One initialized MDEAutomatorMCPServer driven by the worker's shared event loop."""
+
+    def __init__(self, config: Dict[str, Any]):
+        from .mdeautomator_mcp.server import MDEAutomatorMCPServer
+
+        started = time.time()
+        self.runner = get_async_client(config)
+        self.timeout = float(config.get('MCP_EXECUTE_TIMEOUT', DEFAULT_EXECUTE_TIMEOUT))
+        self.server = MDEAutomatorMCPServer(MCPConfig.from_flask_config(config))
+        self.server.function_client = self.runner.client
+        self.startup_seconds = round(time.time() - started, 3)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._in_flight = 0
+        self._failures = 0
+        self._timeouts = 0
+
+    def execute(self, tool_name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """Run one tool call on the loop and wait for it; raises TimeoutError after cancelling it."""
+        with self._lock:
+            self._calls += 1
+            self._in_flight += 1
+        future = self.runner.submit(self.server._route_tool_call(tool_name, arguments))
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except (FutureTimeoutError, CancelledError):
+            future.cancel()
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError(f"MCP tool {tool_name} did not finish within {timeout or self.timeout}s")
+        except Exception:
+            with self._lock:
+                self._failures += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'startup_seconds': self.startup_seconds,
+                'execute_timeout': self.timeout,
+                'calls': self._calls,
+                'in_flight': self._in_flight,
+                'failures': self._failures,
+                'timeouts': self._timeouts,
+                'tools': TOOL_REGISTRY.stats(),
+            }
+
+
+# One engine per worker process (see http_pool for why this is keyed by pid)
+_engines: Dict[int, MCPEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_mcp_engine(config: Optional[Dict[str, Any]] = None) -> MCPEngine:
+    """Get or create the MCP engine for the current worker process."""
+    pid = os.getpid()
+    engine = _engines.get(pid)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        engine = _engines.get(pid)
+        if engine is None:
+            engine = MCPEngine(config or {})
+            _engines.clear()
+            _engines[pid] = engine
+        return engine
+
+
+def get_mcp_engine_stats() -> Optional[Dict[str, Any]]:
+    """Return engine counters for this worker, or None if no tool was executed yet."""
+    engine = _engines.get(os.getpid())
+    return engine.stats() if engine else None
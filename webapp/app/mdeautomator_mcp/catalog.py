@@ -0,0 +1,95 @@
+"""
+Precomputed tool catalog.
+
+Every tools/list, /mcp/discover, capabilities request and AI chat turned
+the tool definitions into dicts and JSON again. ToolCatalog does that once
+per set of definitions:
+
+- tools and descriptors ({name, description, inputSchema}) are tuples built
+  once and shared by every caller, which must treat them as read-only
+- payload(key, build) serializes a transport's response body once and
+  returns the same bytes afterwards
+- derived(key, build) does the same for anything else built from the
+  tools, such as the AI chat's system prompt prefix (prompts.py)
+- hash is a digest of the descriptors; etag is it quoted for HTTP, so
+  discovery endpoints can answer If-None-Match with 304, and the MCP server
+  compares it to what a session last listed to send tools/list_changed
+
+get_tool_catalog() rebuilds only when the registry's version changes.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .registry import TOOL_REGISTRY
+except ImportError:
+    from registry import TOOL_REGISTRY
+
+
+class ToolCatalog:
+    """Tool definitions and their serialized forms for one registry version."""
+
+    def __init__(self, tools, version: int):
+        self.version = version
+        self.tools = tuple(tools)
+        self.descriptors = tuple(
+            {"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+            for tool in self.tools
+        )
+        self.summaries = tuple(
+            {"name": tool.name, "description": tool.description,
+             "parameters": list((tool.inputSchema or {}).get("properties", {}))}
+            for tool in self.tools
+        )
+        canonical = json.dumps(self.descriptors, sort_keys=True, separators=(",", ":"), default=str)
+        self.hash = hashlib.sha256(canonical.encode()).hexdigest()[:32]
+        self.etag = f'"{self.hash}"'
+        self._payloads: Dict[str, bytes] = {}
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def payload(self, key: str, build: Callable[["ToolCatalog"], Any]) -> bytes:
+        """JSON bytes of build(self), serialized once per catalog and key."""
+        data = self._payloads.get(key)
+        if data is None:
+            with self._lock:
+                data = self._payloads.get(key)
+                if data is None:
+                    data = self._payloads[key] = json.dumps(build(self), default=str).encode()
+        return data
+
+    def derived(self, key: str, build: Callable[["ToolCatalog"], Any]) -> Any:
+        """build(self), computed once per catalog and key."""
+        value = self._derived.get(key)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = build(self)
+        return value
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header already names this catalog."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+_catalog: Optional[ToolCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_tool_catalog() -> ToolCatalog:
+    """The catalog for the current tool definitions, rebuilt only after they change."""
+    global _catalog
+    catalog = _catalog
+    if catalog is not None and catalog.version == TOOL_REGISTRY.version:
+        return catalog
+    with _catalog_lock:
+        if _catalog is None or _catalog.version != TOOL_REGISTRY.version:
+            _catalog = ToolCatalog(TOOL_REGISTRY.tools(), TOOL_REGISTRY.version)
+        return _catalog
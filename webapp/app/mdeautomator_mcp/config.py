@@ -109,6 +109,42 @@ class MCPConfig(BaseModel):
         ge=1,
         le=10000
     )
+    device_batch_concurrency: int = Field(
+        4,
+        description="DeviceIds batches sent concurrently when a request exceeds max_device_ids_per_request",
+        ge=1,
+        le=32
+    )
+    
+    # DNS Configuration
+    dns_cache_ttl: float = Field(
+        300.0,
+        description="Seconds a resolved Function App address is reused before it is looked up again",
+        ge=0,
+        le=86400
+    )
+    dns_negative_ttl: float = Field(
+        30.0,
+        description="Seconds a failed lookup is remembered before the name is tried again",
+        ge=0,
+        le=3600
+    )
+    
+    # Secret Cache Configuration
+    secret_cache_ttl: float = Field(
+        3600.0,
+        description="Seconds a Key Vault secret is used before it is re-read in the background",
+        ge=60,
+        le=86400
+    )
+    secret_cache_path: Optional[str] = Field(
+        None,
+        description="File for the encrypted warm secret cache (needs secret_cache_key)"
+    )
+    secret_cache_key: Optional[str] = Field(
+        None,
+        description="Passphrase the warm secret cache file is encrypted with"
+    )
     
     # Function App Endpoints
     function_endpoints: Dict[str, str] = Field(
@@ -184,6 +220,16 @@ class MCPConfig(BaseModel):
             enable_request_validation=os.getenv("ENABLE_REQUEST_VALIDATION", "true").lower() == "true",
             max_device_ids_per_request=int(os.getenv("MAX_DEVICE_IDS_PER_REQUEST", "1000")),
             max_indicators_per_request=int(os.getenv("MAX_INDICATORS_PER_REQUEST", "1000")),
+            device_batch_concurrency=int(os.getenv("DEVICE_BATCH_CONCURRENCY", "4")),
+            
+            # DNS Configuration
+            dns_cache_ttl=float(os.getenv("DNS_CACHE_TTL", "300")),
+            dns_negative_ttl=float(os.getenv("DNS_NEGATIVE_TTL", "30")),
+            
+            # Secret Cache Configuration
+            secret_cache_ttl=float(os.getenv("SECRET_CACHE_TTL", "3600")),
+            secret_cache_path=os.getenv("SECRET_CACHE_PATH"),
+            secret_cache_key=os.getenv("SECRET_CACHE_KEY"),
         )
 
     @classmethod
@@ -241,6 +287,16 @@ class MCPConfig(BaseModel):
             enable_request_validation=os.getenv("ENABLE_REQUEST_VALIDATION", "true").lower() == "true",
             max_device_ids_per_request=int(os.getenv("MAX_DEVICE_IDS_PER_REQUEST", "1000")),
             max_indicators_per_request=int(os.getenv("MAX_INDICATORS_PER_REQUEST", "1000")),
+            device_batch_concurrency=int(os.getenv("DEVICE_BATCH_CONCURRENCY", "4")),
+            
+            # DNS Configuration
+            dns_cache_ttl=float(os.getenv("DNS_CACHE_TTL", "300")),
+            dns_negative_ttl=float(os.getenv("DNS_NEGATIVE_TTL", "30")),
+            
+            # Secret Cache Configuration
+            secret_cache_ttl=float(os.getenv("SECRET_CACHE_TTL", "3600")),
+            secret_cache_path=os.getenv("SECRET_CACHE_PATH"),
+            secret_cache_key=os.getenv("SECRET_CACHE_KEY"),
         )
     
     def get_function_url(self, function_name: str) -> str:
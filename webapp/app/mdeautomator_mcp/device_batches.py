@@ -0,0 +1,61 @@
+"""
+Splitting and merging of DeviceIds batches for MDEDispatcher and MDEOrchestrator.
+
+Both functions act on each device in their DeviceIds list and answer with
+one result object per device, so a large list can be sent as several
+smaller calls and the answers stitched back together. The Flask routes
+(webapp/app/device_batches.py) and FunctionAppClient both dispatch batches
+this way; this module holds the part they share:
+
+- DeviceIds are de-duplicated (order kept) and cut into batch_size chunks
+- per-device results are merged in device order into the same list the
+  unbatched call returns; a batch that fails outright contributes one
+  {"DeviceId", "Status": "Error", "Result"} entry per device, the shape the
+  functions use for per-device failures
+"""
+
+from typing import Any, List, Optional, Sequence
+
+
+def split_device_ids(device_ids: Sequence[str], batch_size: int) -> List[List[str]]:
+    unique = list(dict.fromkeys(device_ids))
+    return [unique[start:start + batch_size] for start in range(0, len(unique), batch_size)]
+
+
+def batch_error(result: Any) -> Optional[str]:
+    """Why a batch produced no per-device results, or None if it did."""
+    if isinstance(result, dict):
+        if 'error' in result:
+            return str(result['error'])
+        if result.get('status') == 'initiated':
+            return 'Timed out waiting for the Function App'
+        if result.get('Status') == 'Error':
+            return str(result.get('Message') or result.get('Result') or 'Function App returned an error')
+    elif isinstance(result, str):
+        # Unhandled exceptions come back as a plain "Error executing function: ..." body
+        return result
+    return None
+
+
+def merge_device_results(batches: Sequence[List[str]], results: Sequence[Any]) -> Any:
+    """
+    Merge batch results into one per-device list.
+
+    If every batch failed outright the first failure is returned as an
+    error dict instead, so the command is reported as failed.
+    """
+    merged: List[Any] = []
+    errors = []
+    for device_ids, result in zip(batches, results):
+        error = batch_error(result)
+        if error is not None:
+            errors.append(error)
+            merged.extend({'DeviceId': device_id, 'Status': 'Error', 'Result': error} for device_id in device_ids)
+        elif isinstance(result, list):
+            merged.extend(result)
+        else:
+            # PowerShell unwraps a one-element array into the object itself
+            merged.append(result)
+    if errors and len(errors) == len(batches):
+        return {'error': f"All {len(batches)} device batches failed: {errors[0]}"}
+    return merged
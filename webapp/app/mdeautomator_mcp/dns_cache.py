@@ -0,0 +1,180 @@
+"""
+Cached DNS resolution for Function App connections.
+
+call_function used to run loop.getaddrinfo for the Function App host on
+every call as a pre-check, and httpx then resolved the same name again
+for every new connection. DNSCache answers both from one cache:
+
+- a successful lookup is reused for ttl seconds; once an entry is past
+  REFRESH_AHEAD of its lifetime it is refreshed in the background while
+  callers keep getting the cached addresses
+- a failed lookup is remembered for negative_ttl seconds and re-raised
+  without another query, so retries against a missing name fail fast
+- concurrent lookups of the same name share one query
+- cached_transport() builds an httpx transport whose connections resolve
+  through the cache (TLS still verifies the host name, not the address)
+
+stats() reports hits, misses and lookup times.
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+REFRESH_AHEAD = 0.8     # fraction of the TTL after which an entry is refreshed in the background
+
+
+class _Entry:
+    __slots__ = ('addresses', 'error', 'expires', 'refresh_at')
+
+    def __init__(self, addresses: List[str], error: Optional[Exception], expires: float, refresh_at: float):
+        self.addresses = addresses
+        self.error = error
+        self.expires = expires
+        self.refresh_at = refresh_at
+
+
+class DNSCache:
+    """getaddrinfo results per (host, port) with TTL, negative caching and refresh-ahead."""
+
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[Tuple[str, int], _Entry] = {}
+        self._pending: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.refreshes = 0
+        self.lookups = 0
+        self.failures = 0
+        self._lookup_seconds = 0.0
+        self._max_lookup_seconds = 0.0
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Return the addresses for host, raising socket.gaierror if it does not resolve."""
+        if _is_ip_literal(host):
+            return [host]
+        key = (host, port)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires:
+            if entry.error is not None:
+                self.negative_hits += 1
+                raise entry.error
+            self.hits += 1
+            if now >= entry.refresh_at and key not in self._pending:
+                self.refreshes += 1
+                self._start_lookup(key)
+            return entry.addresses
+
+        self.misses += 1
+        task = self._pending.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._start_lookup(key)
+        entry = await asyncio.shield(task)
+        if entry.error is not None:
+            raise entry.error
+        return entry.addresses
+
+    def _start_lookup(self, key: Tuple[str, int]) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(self._lookup(key))
+        # Background refreshes have no awaiter; retrieve their errors so they are not reported as lost
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._pending[key] = task
+        return task
+
+    async def _lookup(self, key: Tuple[str, int]) -> _Entry:
+        host, port = key
+        started = time.monotonic()
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, family=socket.AF_UNSPEC, type=socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            finished = time.monotonic()
+            entry = _Entry(addresses, None, finished + self.ttl, finished + self.ttl * REFRESH_AHEAD)
+        except socket.gaierror as e:
+            self.failures += 1
+            finished = time.monotonic()
+            previous = self._entries.get(key)
+            if previous is not None and previous.error is None and finished < previous.expires:
+                # A failed background refresh keeps serving the addresses until they expire
+                entry = previous
+            else:
+                entry = _Entry([], e, finished + self.negative_ttl, finished + self.negative_ttl)
+        finally:
+            elapsed = time.monotonic() - started
+            self.lookups += 1
+            self._lookup_seconds += elapsed
+            self._max_lookup_seconds = max(self._max_lookup_seconds, elapsed)
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+        self._entries[key] = entry
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'ttl': self.ttl,
+            'negative_ttl': self.negative_ttl,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'background_refreshes': self.refreshes,
+            'lookups': self.lookups,
+            'failures': self.failures,
+            'avg_lookup_ms': round(self._lookup_seconds / self.lookups * 1000, 2) if self.lookups else 0.0,
+            'max_lookup_ms': round(self._max_lookup_seconds * 1000, 2),
+        }
+
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+class CachedDNSBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that resolves through a DNSCache and connects to the first address that answers."""
+
+    def __init__(self, cache: DNSCache, backend: httpcore.AsyncNetworkBackend):
+        self.cache = cache
+        self.backend = backend
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await self.cache.resolve(host, port)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(f"DNS resolution failed for {host}: {e}") from e
+        for index, address in enumerate(addresses):
+            try:
+                return await self.backend.connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                                      socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout):
+                if index == len(addresses) - 1:
+                    raise
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None,
+                                  socket_options=None) -> httpcore.AsyncNetworkStream:
+        return await self.backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self.backend.sleep(seconds)
+
+
+def cached_transport(cache: DNSCache, **kwargs: Any) -> httpx.AsyncHTTPTransport:
+    """An httpx.AsyncHTTPTransport (same arguments) whose connections resolve through cache."""
+    transport = httpx.AsyncHTTPTransport(**kwargs)
+    pool = getattr(transport, '_pool', None)
+    backend = getattr(pool, '_network_backend', None)
+    if backend is not None:
+        pool._network_backend = CachedDNSBackend(cache, backend)
+    return transport
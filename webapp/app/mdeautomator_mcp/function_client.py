@@ -7,12 +7,12 @@ error handling.
 """
 
 import asyncio
-from typing import Any, Dict, Optional
+import socket
+from typing import Any, Callable, Dict, List, Optional
 
 import httpx
 import structlog
 from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
 from asyncio_throttle import Throttler
 from tenacity import (
     AsyncRetrying,
@@ -23,11 +23,19 @@ from tenacity import (
 
 try:
     from .config import MCPConfig
+    from .device_batches import batch_error, merge_device_results, split_device_ids
+    from .dns_cache import DNSCache, cached_transport
+    from .secret_cache import get_secret_cache
 except ImportError:
     from config import MCPConfig
+    from device_batches import batch_error, merge_device_results, split_device_ids
+    from dns_cache import DNSCache, cached_transport
+    from secret_cache import get_secret_cache
 
 logger = structlog.get_logger(__name__)
 
+FUNCTION_KEY_SECRET = "function-key"
+
 
 class FunctionAppClient:
     """
@@ -46,10 +54,11 @@ class FunctionAppClient:
         """Initialize the Function App client."""
         self.config = config
         self.credential = None
-        self.secret_client = None
+        self.secret_cache = None
         self.http_client = None
         self.throttler = None
         self._function_key = None
+        self.dns_cache = DNSCache(config.dns_cache_ttl, config.dns_negative_ttl)
 
     async def initialize(self) -> None:
         """Initialize the client with authentication and HTTP client."""
@@ -65,22 +74,13 @@ class FunctionAppClient:
                 logger.info("Initializing with default Azure credentials")
                 self.credential = DefaultAzureCredential()
 
-            # Initialize Key Vault client if configured
+            # Function key from Key Vault, through the process-wide secret cache
             if self.config.key_vault_url:
-                logger.info("Initializing Key Vault client", 
-                          vault_url=self.config.key_vault_url)
-                self.secret_client = SecretClient(
-                    vault_url=self.config.key_vault_url,
-                    credential=self.credential
-                )
-                
-                # Retrieve function key from Key Vault
+                self.secret_cache = get_secret_cache(self.config)
                 try:
-                    secret = await asyncio.to_thread(
-                        self.secret_client.get_secret, "function-key"
-                    )
-                    self._function_key = secret.value
-                    logger.info("Successfully retrieved function key from Key Vault")
+                    self._function_key = (self.secret_cache.cached(FUNCTION_KEY_SECRET) or
+                                          await asyncio.to_thread(self.secret_cache.get, FUNCTION_KEY_SECRET))
+                    logger.info("Function key available from Key Vault")
                 except Exception as e:
                     logger.warning("Failed to retrieve function key from Key Vault", 
                                  error=str(e))
@@ -114,19 +114,33 @@ class FunctionAppClient:
             logger.error("Failed to initialize Function App client", error=str(e))
             raise
 
+    def _current_function_key(self) -> Optional[str]:
+        """The function key to send; a key rotated in Key Vault is picked up from the cache."""
+        if self.secret_cache is not None:
+            key = self.secret_cache.cached(FUNCTION_KEY_SECRET)
+            if key:
+                self._function_key = key
+        return self._function_key
+
     async def close(self) -> None:
         """Close the HTTP client and clean up resources."""
         if self.http_client:
             await self.http_client.aclose()
             logger.info("Function App client closed")
 
-    async def call_function(self, function_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def call_function(self, function_name: str, payload: Dict[str, Any],
+                            progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Call a specific Azure Function with the given payload.
         
+        MDEDispatcher/MDEOrchestrator payloads with more DeviceIds than
+        max_device_ids_per_request are sent as concurrent batches and their
+        per-device results merged into one list.
+        
         Args:
             function_name: Name of the function to call (e.g., "MDEAutomator")
             payload: JSON payload to send to the function
+            progress: Optional callback receiving batch progress counters
             
         Returns:
             Response data from the function
@@ -139,6 +153,11 @@ class FunctionAppClient:
         # Ensure HTTP client is valid for current event loop
         await self.ensure_http_client()
 
+        device_ids = payload.get("DeviceIds") if isinstance(payload, dict) else None
+        if (function_name in ("MDEDispatcher", "MDEOrchestrator") and isinstance(device_ids, list)
+                and len(device_ids) > self.config.max_device_ids_per_request):
+            return await self._call_in_batches(function_name, payload, progress)
+
         # Validate payload if enabled
         if self.config.enable_request_validation:
             self._validate_payload(function_name, payload)
@@ -150,27 +169,13 @@ class FunctionAppClient:
             logger.error("Invalid function name", function_name=function_name)
             raise
 
-        # Pre-check DNS resolution to avoid httpx DNS issues
+        # Fail fast on a name that does not resolve; the answer is cached and reused
+        # by the HTTP transport, so this costs at most one lookup per TTL
+        parsed_url = httpx.URL(url)
+        hostname = parsed_url.host
+        port = parsed_url.port or (443 if parsed_url.scheme == 'https' else 80)
         try:
-            from urllib.parse import urlparse
-            import socket
-            import asyncio
-            
-            parsed_url = urlparse(url)
-            hostname = parsed_url.hostname
-            port = parsed_url.port or (443 if parsed_url.scheme == 'https' else 80)
-            
-            # Test DNS resolution asynchronously
-            loop = asyncio.get_event_loop()
-            addresses = await loop.getaddrinfo(
-                hostname, port, 
-                family=socket.AF_UNSPEC,
-                type=socket.SOCK_STREAM
-            )
-            logger.debug(f"DNS resolution successful for {hostname}: {len(addresses)} addresses")
-            
-        except asyncio.TimeoutError:
-            logger.warning(f"DNS resolution timeout for {hostname}")
+            await self.dns_cache.resolve(hostname, port)
         except socket.gaierror as dns_e:
             logger.error(f"DNS resolution failed for {hostname}: GAI error {dns_e.errno}")
             raise Exception(f"DNS resolution failed for {hostname}: {str(dns_e)}")
@@ -178,11 +183,6 @@ class FunctionAppClient:
             logger.warning(f"DNS pre-check failed for {hostname}: {str(dns_e)}")
             # Continue anyway and let httpx handle it
 
-        # Prepare headers
-        headers = {}
-        if self._function_key:
-            headers["x-functions-key"] = self._function_key
-
         logger.info(
             "Calling Azure Function",
             function_name=function_name,
@@ -191,49 +191,31 @@ class FunctionAppClient:
         )
 
         try:
-            # Apply rate limiting
-            async with self.throttler:
-                # Execute request with retry logic
-                async for attempt in AsyncRetrying(
-                    stop=stop_after_attempt(self.config.max_retries),
-                    wait=wait_exponential(
-                        multiplier=self.config.retry_delay,
-                        min=self.config.retry_delay,
-                        max=60,
-                    ),
-                    retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
-                    reraise=True,
-                ):
-                    with attempt:
-                        response = await self.http_client.post(
-                            url=url,
-                            json=payload,
-                            headers=headers,
-                        )
-
-                        # Check for HTTP errors
-                        response.raise_for_status()
-
-                        # Parse response
-                        try:
-                            result = response.json()
-                        except Exception as e:
-                            logger.error(
-                                "Failed to parse response JSON",
-                                function_name=function_name,
-                                response_text=response.text[:1000],
-                                error=str(e),
-                            )
-                            raise ValueError(f"Invalid JSON response: {str(e)}")
-
-                        logger.info(
-                            "Function call completed successfully",
-                            function_name=function_name,
-                            status_code=response.status_code,
-                            response_size=len(response.text),
-                        )
-
-                        return result
+            response = await self.post(function_name, payload)
+
+            # Check for HTTP errors
+            response.raise_for_status()
+
+            # Parse response
+            try:
+                result = response.json()
+            except Exception as e:
+                logger.error(
+                    "Failed to parse response JSON",
+                    function_name=function_name,
+                    response_text=response.text[:1000],
+                    error=str(e),
+                )
+                raise ValueError(f"Invalid JSON response: {str(e)}")
+
+            logger.info(
+                "Function call completed successfully",
+                function_name=function_name,
+                status_code=response.status_code,
+                response_size=len(response.content),
+            )
+
+            return result
 
         except httpx.HTTPStatusError as e:
             logger.error(
@@ -262,6 +244,112 @@ class FunctionAppClient:
             )
             raise
 
+    async def post(self, function_name: str, payload: Dict[str, Any], read_timeout: Optional[float] = None,
+                   retry_timeouts: bool = True) -> httpx.Response:
+        """
+        POST a payload to a function under the client's rate limit and retry policy.
+        
+        Returns the raw response whatever its status; call_function builds on
+        this, and the web app uses it directly to keep its own error handling.
+        
+        Args:
+            function_name: Name of the function to call
+            payload: JSON payload to send to the function
+            read_timeout: Seconds to wait for the response instead of request_timeout
+            retry_timeouts: Retry read timeouts too; with False only failures to
+                connect are retried, since a timed-out call may still be running
+            
+        Raises:
+            ValueError: If the function name is unknown
+            httpx.HTTPError: If the request fails after the last retry
+        """
+        await self.ensure_http_client()
+        url = self.config.get_function_url(function_name)
+
+        headers = {}
+        function_key = self._current_function_key()
+        if function_key:
+            headers["x-functions-key"] = function_key
+
+        timeout = httpx.USE_CLIENT_DEFAULT
+        if read_timeout is not None:
+            timeout = httpx.Timeout(connect=10.0, read=read_timeout, write=30.0, pool=30.0)
+        retryable = ((httpx.TimeoutException, httpx.ConnectError) if retry_timeouts
+                     else (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+        # Apply rate limiting
+        async with self.throttler:
+            # Execute request with retry logic
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.config.max_retries),
+                wait=wait_exponential(
+                    multiplier=self.config.retry_delay,
+                    min=self.config.retry_delay,
+                    max=60,
+                ),
+                retry=retry_if_exception_type(retryable),
+                reraise=True,
+            ):
+                with attempt:
+                    return await self.http_client.post(
+                        url=url,
+                        json=payload,
+                        headers=headers,
+                        timeout=timeout,
+                    )
+
+    async def _call_in_batches(self, function_name: str, payload: Dict[str, Any],
+                               progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Any]:
+        """
+        Send a large DeviceIds list as concurrent batches of max_device_ids_per_request.
+        
+        Results are merged in device order; a batch that fails contributes an
+        Error entry per device, the shape the functions use for per-device
+        failures. Splitting and merging are shared with the Flask routes
+        (see device_batches.py).
+        
+        Raises:
+            Exception: If every batch failed
+        """
+        batches = split_device_ids(payload["DeviceIds"], self.config.max_device_ids_per_request)
+        semaphore = asyncio.Semaphore(self.config.device_batch_concurrency)
+        state = {
+            "batches_total": len(batches),
+            "batches_done": 0,
+            "batches_failed": 0,
+            "devices_total": sum(len(batch) for batch in batches),
+            "devices_done": 0,
+        }
+
+        logger.info(
+            "Dispatching device batches",
+            function_name=function_name,
+            devices=state["devices_total"],
+            batches=len(batches),
+            concurrency=self.config.device_batch_concurrency,
+        )
+
+        async def run_batch(batch: List[str]) -> Any:
+            async with semaphore:
+                try:
+                    result = await self.call_function(function_name, {**payload, "DeviceIds": batch})
+                except Exception as e:
+                    result = {"error": str(e)}
+            state["batches_done"] += 1
+            state["devices_done"] += len(batch)
+            if batch_error(result) is not None:
+                state["batches_failed"] += 1
+            logger.info("Device batch completed", function_name=function_name, **state)
+            if progress:
+                progress(dict(state))
+            return result
+
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        merged = merge_device_results(batches, results)
+        if isinstance(merged, dict):
+            raise Exception(merged["error"])
+        return merged
+
     def _validate_payload(self, function_name: str, payload: Dict[str, Any]) -> None:
         """
         Validate the payload for a specific function call.
@@ -354,9 +442,12 @@ class FunctionAppClient:
         # Create new HTTP client
         self.http_client = httpx.AsyncClient(
             timeout=httpx.Timeout(self.config.request_timeout),
-            limits=httpx.Limits(
-                max_connections=100,
-                max_keepalive_connections=20,
+            transport=cached_transport(
+                self.dns_cache,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                ),
             ),
             headers={
                 "User-Agent": "MDEAutomator-MCP-Server/1.0.0",
@@ -387,10 +478,16 @@ class FunctionAppClient:
                 write=30.0,
                 pool=30.0,
             ),
-            limits=httpx.Limits(
-                max_connections=50,
-                max_keepalive_connections=10,
-                keepalive_expiry=30.0,
+            transport=cached_transport(
+                self.dns_cache,
+                limits=httpx.Limits(
+                    max_connections=50,
+                    max_keepalive_connections=10,
+                    keepalive_expiry=30.0,
+                ),
+                verify=ssl_context,
+                # Disable HTTP/2 to avoid potential issues
+                http2=False,
             ),
             headers={
                 "User-Agent": "MDEAutomator-MCP-Server/1.0.0",
@@ -399,9 +496,6 @@ class FunctionAppClient:
                 "Accept-Encoding": "gzip, deflate",
                 "Connection": "keep-alive",
             },
-            verify=ssl_context,
-            # Disable HTTP/2 to avoid potential issues
-            http2=False,
         )
 
     async def cleanup(self) -> None:
@@ -0,0 +1,319 @@
+"""
+Queue-based logging pipeline shared by the Flask app and the MCP server.
+
+Request handlers used to log whole payloads and Function App responses
+through f-strings, so every request paid for formatting a multi-megabyte
+repr and writing it to stdout even when nobody read the logs. The pipeline
+moves that cost off the request path:
+
+- install_log_pipeline() replaces the root logger's handlers with one
+  QueueHandler; the original handlers run on a listener thread, so stream
+  and file I/O never blocks a request. When the queue is full records are
+  dropped and counted instead of blocking.
+- clip(value) defers formatting of large values until a record is actually
+  emitted, and then renders at most LOG_FIELD_MAX_CHARS characters with a
+  repr that stops walking big dicts and lists once that much is written. Use it with
+  %-style arguments: logger.info("Result: %s", clip(result)).
+- whole messages are capped at LOG_MESSAGE_MAX_CHARS
+- INFO and DEBUG records are rate-sampled per call site (a token bucket of
+  LOG_SAMPLE_RATE records per second with bursts of LOG_SAMPLE_BURST); the
+  next record let through says how many were suppressed. Warnings and
+  errors are never sampled.
+- clip_event_fields and sample_events are the same truncation and sampling
+  as structlog processors, for the MCP server's structured logs
+
+Only the standard library is needed; sample_events imports structlog when
+it first drops an event.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Hashable, Optional
+
+# Defaults used when the environment does not override them
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_FIELD_MAX_CHARS = 2000
+DEFAULT_MESSAGE_MAX_CHARS = 8000
+DEFAULT_SAMPLE_RATE = 50.0      # INFO/DEBUG records per second per call site
+DEFAULT_SAMPLE_BURST = 200
+
+_field_max_chars = DEFAULT_FIELD_MAX_CHARS
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def _bounded_repr(value: Any, limit: int) -> str:
+    """repr() of a nested structure that stops walking once limit characters are written."""
+    parts = []
+    remaining = limit
+
+    def emit(text: str) -> None:
+        nonlocal remaining
+        parts.append(text)
+        remaining -= len(text)
+
+    def walk(item: Any) -> None:
+        if isinstance(item, dict):
+            emit('{')
+            for index, (key, child) in enumerate(item.items()):
+                if remaining <= 0:
+                    break
+                emit(f"{', ' if index else ''}{key!r}: ")
+                walk(child)
+            emit('}')
+        elif isinstance(item, (list, tuple, set)):
+            opening, closing = {list: '[]', tuple: '()'}.get(type(item), '{}')
+            emit(opening)
+            for index, child in enumerate(item):
+                if remaining <= 0:
+                    break
+                if index:
+                    emit(', ')
+                walk(child)
+            emit(closing)
+        elif isinstance(item, str):
+            emit(repr(item[:max(remaining, 0) + 1]))
+        else:
+            emit(repr(item))
+
+    walk(value)
+    text = ''.join(parts)
+    return text if remaining >= 0 else f"{text[:limit]}... [truncated]"
+
+
+class clip:
+    """Lazily rendered, size-capped log argument."""
+
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        limit = self.limit or _field_max_chars
+        value = self.value
+        if isinstance(value, str):
+            return _truncate(value, limit)
+        if isinstance(value, (bytes, bytearray)):
+            return f"<{len(value)} bytes>"
+        if isinstance(value, (dict, list, tuple, set)):
+            return _bounded_repr(value, limit)
+        return _truncate(str(value), limit)
+
+    __repr__ = __str__
+
+
+class _TokenBuckets:
+    """Per-key token buckets; allow() answers (let through, suppressed since the last one let through)."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 4096):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[Hashable, list] = {}
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def allow(self, key: Hashable):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                self.suppressed_total += 1
+                return False, 0
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+            return True, suppressed
+
+
+class SamplingFilter(logging.Filter):
+    """Rate-limit INFO and DEBUG records per call site; warnings and errors always pass."""
+
+    def __init__(self, rate: float = DEFAULT_SAMPLE_RATE, burst: float = DEFAULT_SAMPLE_BURST):
+        super().__init__()
+        self.buckets = _TokenBuckets(rate, burst)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        allowed, suppressed = self.buckets.allow((record.name, record.pathname, record.lineno))
+        if suppressed:
+            record.suppressed = suppressed
+        return allowed
+
+
+class AsyncQueueHandler(QueueHandler):
+    """QueueHandler that caps message size and drops, rather than blocks, when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue, max_chars: int = DEFAULT_MESSAGE_MAX_CHARS):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+        self.enqueued = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args into the message here (clip() keeps that bounded) so nothing
+        # mutable crosses to the listener thread; timestamps, levels and the rest of
+        # the layout are still formatted there by the real handlers.
+        message = _truncate(record.getMessage(), self.max_chars)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            message = f"{message} [{suppressed} similar message(s) suppressed]"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = message
+        prepared.args = None
+        prepared.exc_info = None
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """The installed queue handler and the listener thread that drains it."""
+
+    def __init__(self, handlers, queue_size: int, max_chars: int, rate: float, burst: float):
+        self.handlers = list(handlers)
+        self.queue_size = queue_size
+        self.handler = AsyncQueueHandler(queue.Queue(queue_size), max_chars=max_chars)
+        self.sampler = SamplingFilter(rate, burst) if rate > 0 else None
+        if self.sampler:
+            self.handler.addFilter(self.sampler)
+        self.listener: Optional[QueueListener] = None
+
+    def start(self) -> None:
+        self.listener = QueueListener(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener thread."""
+        if self.listener is not None:
+            try:
+                self.listener.stop()
+            except queue.Full:
+                pass  # no room for the stop sentinel; the daemon thread dies with the process
+            self.listener = None
+
+    def _after_fork(self) -> None:
+        # The listener thread does not survive a fork and the queue's lock may have
+        # been held when it happened, so the child starts over with its own of both.
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.listener = None
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'queued': self.handler.queue.qsize(),
+            'queue_size': self.queue_size,
+            'enqueued': self.handler.enqueued,
+            'dropped': self.handler.dropped,
+            'suppressed': self.sampler.buckets.suppressed_total if self.sampler else 0,
+            'handlers': [type(handler).__name__ for handler in self.handlers],
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def install_log_pipeline(queue_size: Optional[int] = None, field_max_chars: Optional[int] = None,
+                         message_max_chars: Optional[int] = None, sample_rate: Optional[float] = None,
+                         sample_burst: Optional[float] = None) -> Optional[LogPipeline]:
+    """
+    Move the root logger's handlers behind a queue, once per process.
+
+    Call after logging.basicConfig(). Arguments default to the LOG_* environment
+    variables; LOG_ASYNC=false leaves logging untouched and returns None.
+    """
+    global _pipeline, _field_max_chars
+    if os.environ.get('LOG_ASYNC', 'true').lower() != 'true':
+        return None
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline
+        root = logging.getLogger()
+        handlers = [handler for handler in root.handlers if not isinstance(handler, QueueHandler)]
+        if not handlers:
+            return None
+
+        _field_max_chars = field_max_chars or int(os.environ.get('LOG_FIELD_MAX_CHARS', DEFAULT_FIELD_MAX_CHARS))
+        pipeline = LogPipeline(
+            handlers,
+            queue_size=queue_size or int(os.environ.get('LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+            max_chars=message_max_chars or int(os.environ.get('LOG_MESSAGE_MAX_CHARS', DEFAULT_MESSAGE_MAX_CHARS)),
+            rate=sample_rate if sample_rate is not None else float(os.environ.get('LOG_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)),
+            burst=sample_burst or float(os.environ.get('LOG_SAMPLE_BURST', DEFAULT_SAMPLE_BURST)),
+        )
+        for handler in handlers:
+            root.removeHandler(handler)
+        root.addHandler(pipeline.handler)
+        pipeline.start()
+        atexit.register(pipeline.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=pipeline._after_fork)
+        _pipeline = pipeline
+        return pipeline
+
+
+def get_log_pipeline_stats() -> Optional[Dict[str, Any]]:
+    """Return queue and sampling counters, or None if the pipeline is not installed."""
+    return _pipeline.stats() if _pipeline else None
+
+
+def clip_event_fields(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """structlog processor: cap every field except the event name at LOG_FIELD_MAX_CHARS."""
+    for key, value in event_dict.items():
+        if key == 'event':
+            continue
+        if isinstance(value, str):
+            if len(value) > _field_max_chars:
+                event_dict[key] = _truncate(value, _field_max_chars)
+        elif isinstance(value, (dict, list, tuple, set, bytes, bytearray)):
+            event_dict[key] = str(clip(value))
+    return event_dict
+
+
+class sample_events:
+    """structlog processor: rate-sample info/debug events per (logger, event) like SamplingFilter."""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.buckets = _TokenBuckets(
+            rate if rate is not None else float(os.environ.get('LOG_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)),
+            burst or float(os.environ.get('LOG_SAMPLE_BURST', DEFAULT_SAMPLE_BURST)),
+        )
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name not in ('debug', 'info') or self.buckets.rate <= 0:
+            return event_dict
+        allowed, suppressed = self.buckets.allow((getattr(logger, 'name', None), event_dict.get('event')))
+        if not allowed:
+            from structlog import DropEvent
+            raise DropEvent
+        if suppressed:
+            event_dict['suppressed'] = suppressed
+        return event_dict
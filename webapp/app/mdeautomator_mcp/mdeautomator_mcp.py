@@ -25,6 +25,10 @@ logger = logging.getLogger(__name__)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
+# Write log records from a background thread instead of the request path
+from log_pipeline import install_log_pipeline
+install_log_pipeline()
+
 # Global server state
 server_state = {
     "mcp_server": None,
@@ -78,10 +82,15 @@ class MCPHttpBridge(BaseHTTPRequestHandler):
             return
             
         try:
-            from tools import get_all_tools
-            tools = get_all_tools()
-            
-            discovery_response = {
+            from catalog import get_tool_catalog
+            catalog = get_tool_catalog()
+            if catalog.matches(self.headers.get('If-None-Match')):
+                self.send_response(304)
+                self.send_header('ETag', catalog.etag)
+                self.end_headers()
+                return
+
+            body = catalog.payload('bridge_discover', lambda c: {
                 "protocol": "mcp",
                 "version": "2025-03-26",
                 "capabilities": {
@@ -93,23 +102,18 @@ class MCPHttpBridge(BaseHTTPRequestHandler):
                     "version": "1.0.0",
                     "description": "Microsoft Defender for Endpoint operations via MCP"
                 },
-                "tools": [
-                    {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "inputSchema": tool.inputSchema
-                    }
-                    for tool in tools
-                ]
-            }
+                "tools": c.descriptors
+            })
             
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', catalog.etag)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(discovery_response, indent=2).encode())
+            self.wfile.write(body)
             
-            logger.info(f"Discovery served - {len(tools)} tools available")
+            logger.info(f"Discovery served - {len(catalog.tools)} tools available")
             
         except Exception as e:
             logger.error(f"Discovery failed: {e}", exc_info=True)
@@ -200,18 +204,20 @@ class MCPHttpBridge(BaseHTTPRequestHandler):
                 }
                 
             elif method == "tools/list":
-                from tools import get_all_tools
-                tools = get_all_tools()
-                result = {
-                    "tools": [
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "inputSchema": tool.inputSchema
-                        }
-                        for tool in tools
-                    ]
-                }
+                # The result is serialized once; only the envelope is built per request
+                from catalog import get_tool_catalog
+                catalog = get_tool_catalog()
+                result_body = catalog.payload('tools/list', lambda c: {"tools": c.descriptors})
+                body = b''.join((b'{"jsonrpc": "2.0", "id": ', json.dumps(request_id).encode(),
+                                 b', "result": ', result_body, b'}'))
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', catalog.etag)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(body)
+                return
                 
             elif method == "tools/call":
                 tool_name = params.get("name")
@@ -0,0 +1,132 @@
+"""
+System prompt assembly for the AI chat tool.
+
+_handle_ai_chat used to categorize every tool by keyword and rebuild the
+whole system prompt around the user's message on every chat. The prompt is
+now two fragments:
+
+- a static prefix (role, the categorized tool list, behaviour rules) built
+  once per tool catalog and memoized on it, so it only changes when the
+  tools do. It comes first and is byte-identical across chats, which lets
+  the provider's prompt-prefix cache reuse it.
+- a short dynamic tail (context, execution mode, the request) filled into
+  a template per chat
+
+Token counts are estimated once per fragment (about four UTF-8 bytes per
+token); only the tail is measured per chat.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+# Category name and the tool-name keywords that place a tool in it; first match wins
+TOOL_CATEGORIES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("Device Management", ("get_machines", "isolate", "unisolate", "contain", "restrict", "collect_investigation", "run_antivirus", "offboard")),
+    ("Live Response", ("run_live_response", "upload_to_library", "put_file", "get_file", "get_live_response_output")),
+    ("Action Management", ("get_actions", "cancel_actions", "get_action_status")),
+    ("Threat Intelligence", ("get_indicators", "add_", "remove_indicators")),
+    ("Incident Management", ("get_incidents", "get_incident", "update_incident", "add_incident_comment")),
+    ("Advanced Hunting", ("run_hunting_query", "schedule_hunt", "get_hunt_results")),
+    ("Custom Detections", ("get_detection_rules", "create_detection_rule", "update_detection_rule", "delete_detection_rule")),
+    ("Information Gathering", ("get_file_info", "get_ip_info", "get_url_info", "get_logged_in_users")),
+    ("AI Integration", ("ai_chat",)),
+)
+
+SYSTEM_PROMPT_PREFIX = """You are an expert Microsoft Defender for Endpoint (MDE) security operations AI that EXECUTES real security actions.
+
+🔧 AVAILABLE MDE TOOLS: I have access to these real MDE operations:
+{tools_description}
+
+🤖 BEHAVIOR:
+When execute_actions=true and tenant_id is provided, I will:
+1. Analyze your request and determine which MDE tools to use
+2. Execute the appropriate operations using real MDE APIs
+3. Return actual results from Microsoft Defender for Endpoint
+4. Provide expert security analysis based on live data
+
+When execute_actions=false, I will:
+1. Explain what I would do with step-by-step action plans
+2. Recommend specific tools and parameters
+3. Provide security expertise without executing actions"""
+
+SYSTEM_PROMPT_TAIL = """
+
+Context: {context}
+
+🎯 EXECUTION MODE: execute_actions={execute_actions}, tenant_id={tenant_state}
+
+For your request: "{message}"
+I will now {intent}."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting and logs (about four UTF-8 bytes per token)."""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+class PromptFragment:
+    """A piece of the system prompt and its estimated token count."""
+
+    __slots__ = ("text", "tokens")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+
+def format_tools_for_ai(tools: List[Dict[str, Any]]) -> str:
+    """Format tool summaries ({name, description, parameters}) by category for the system prompt."""
+    categorized_tools = {category: [] for category, _ in TOOL_CATEGORIES}
+    uncategorized_tools = []
+
+    for tool in tools:
+        tool_name = tool.get("name", "")
+        params = ", ".join(tool.get("parameters", []))
+        tool_entry = f"  • {tool_name}: {tool.get('description', 'No description')}"
+        if params:
+            tool_entry += f" (params: {params})"
+
+        for category, keywords in TOOL_CATEGORIES:
+            if any(keyword in tool_name for keyword in keywords):
+                categorized_tools[category].append(tool_entry)
+                break
+        else:
+            uncategorized_tools.append(tool_entry)
+
+    formatted_tools = []
+    for category, tool_list in categorized_tools.items():
+        if tool_list:
+            formatted_tools.append(f"\n{category}:")
+            formatted_tools.extend(tool_list)
+    if uncategorized_tools:
+        formatted_tools.append("\nOther Tools:")
+        formatted_tools.extend(uncategorized_tools)
+
+    summary = f"\n\nTOTAL AVAILABLE TOOLS: {len(tools)} Microsoft Defender for Endpoint operations"
+    return "\n".join(formatted_tools) + summary if formatted_tools else f"No tools available (expected {len(tools)} tools)"
+
+
+def build_system_prefix(catalog) -> PromptFragment:
+    """The static part of the system prompt for one tool catalog."""
+    return PromptFragment(SYSTEM_PROMPT_PREFIX.format(tools_description=format_tools_for_ai(list(catalog.summaries))))
+
+
+_TAIL_TEMPLATE_TOKENS = estimate_tokens(SYSTEM_PROMPT_TAIL)
+
+
+def build_system_prompt(catalog, message: str, context: str, execute_actions: bool,
+                        tenant_id: str) -> Tuple[str, Dict[str, int]]:
+    """The full system prompt for one chat, and its estimated token counts per fragment."""
+    prefix = catalog.derived("ai_system_prefix", build_system_prefix)
+    tail = SYSTEM_PROMPT_TAIL.format(
+        context=context,
+        execute_actions=execute_actions,
+        tenant_state="configured" if tenant_id else "missing",
+        message=message,
+        intent=("execute real MDE operations and analyze live data" if execute_actions and tenant_id
+                else "provide detailed action recommendations"),
+    )
+    tokens = {
+        "static": prefix.tokens,
+        "dynamic": _TAIL_TEMPLATE_TOKENS + estimate_tokens(context) + estimate_tokens(message),
+    }
+    return prefix.text + tail, tokens
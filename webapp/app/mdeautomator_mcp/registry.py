@@ -0,0 +1,155 @@
+"""
+Tool registry for the MDEAutomator MCP server.
+
+Tool calls used to be routed by a chain of tool_name.startswith(...)
+branches: a linear scan per call, and order-sensitive, so mde_get_file
+captured mde_get_file_info. The registry maps exact tool names to:
+
+- the Tool definition from tools.py (define(), called once at import),
+  which also serves get_all_tools()
+- an argument validator compiled once from the definition's inputSchema
+  (jsonschema when it is installed, otherwise a check of required fields)
+- the server method that handles the call (@tool_handler("name"))
+
+dispatch() is one dict lookup, and records calls, errors and latency per
+tool for stats().
+"""
+
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from mcp.types import Tool
+
+Handler = Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+Validator = Callable[[Dict[str, Any]], None]
+
+
+def compile_validator(schema: Optional[Dict[str, Any]]) -> Optional[Validator]:
+    """Build the argument check for one inputSchema, or None if there is nothing to check."""
+    if not schema:
+        return None
+    try:
+        from jsonschema import validators
+    except ImportError:
+        required = tuple(schema.get("required") or ())
+        if not required:
+            return None
+
+        def check_required(arguments: Dict[str, Any]) -> None:
+            missing = [name for name in required if name not in arguments]
+            if missing:
+                raise ValueError(f"Missing required argument(s): {', '.join(missing)}")
+        return check_required
+
+    validator_class = validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    validator = validator_class(schema)
+
+    def check(arguments: Dict[str, Any]) -> None:
+        error = next(validator.iter_errors(arguments), None)
+        if error is not None:
+            where = ".".join(str(part) for part in error.absolute_path)
+            raise ValueError(f"Invalid argument{f' {where}' if where else 's'}: {error.message}")
+    return check
+
+
+class RegisteredTool:
+    """Everything the registry knows about one tool name."""
+
+    __slots__ = ('name', 'definition', 'validator', 'handler', 'calls', 'errors', 'total_seconds', 'max_seconds')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.definition: Optional[Tool] = None
+        self.validator: Optional[Validator] = None
+        self.handler: Optional[Handler] = None
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+
+class ToolRegistry:
+    """Exact-name map of tool definitions, validators and handlers."""
+
+    def __init__(self):
+        self._tools: Dict[str, RegisteredTool] = {}
+        self._lock = threading.Lock()
+        self.version = 0    # bumped whenever definitions or handlers change (see catalog.py)
+
+    def _entry(self, name: str) -> RegisteredTool:
+        entry = self._tools.get(name)
+        if entry is None:
+            entry = self._tools[name] = RegisteredTool(name)
+        return entry
+
+    # tools.py and server.py can be executed more than once against the same registry
+    # (mcp_client.py loads them again through importlib when the package import fails),
+    # so registering a name again replaces the earlier definition or handler.
+
+    def define(self, tools: List[Tool]) -> List[Tool]:
+        """Register tool definitions and compile their validators; returns tools unchanged."""
+        for tool in tools:
+            entry = self._entry(tool.name)
+            entry.definition = tool
+            entry.validator = compile_validator(tool.inputSchema)
+        self.version += 1
+        return tools
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        """Decorator registering a server method as the handler for tool name."""
+        def register(function: Handler) -> Handler:
+            self._entry(name).handler = function
+            self.version += 1
+            return function
+        return register
+
+    def tools(self) -> List[Tool]:
+        """Tool definitions in the order they were defined."""
+        return [entry.definition for entry in self._tools.values() if entry.definition is not None]
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def missing_handlers(self) -> List[str]:
+        return [name for name, entry in self._tools.items() if entry.definition is not None and entry.handler is None]
+
+    async def dispatch(self, owner: Any, name: str, arguments: Optional[Dict[str, Any]]) -> Any:
+        """Validate arguments and await owner's handler for tool name."""
+        entry = self._tools.get(name)
+        if entry is None or entry.handler is None:
+            raise ValueError(f"Unknown tool: {name}")
+        arguments = arguments or {}
+        started = time.perf_counter()
+        failed = True
+        try:
+            if entry.validator is not None:
+                entry.validator(arguments)
+            result = await entry.handler(owner, arguments)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                entry.calls += 1
+                entry.errors += failed
+                entry.total_seconds += elapsed
+                entry.max_seconds = max(entry.max_seconds, elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Calls, errors and latency for every tool that has been called."""
+        with self._lock:
+            return {
+                entry.name: {
+                    'calls': entry.calls,
+                    'errors': entry.errors,
+                    'avg_ms': round(entry.total_seconds / entry.calls * 1000, 1),
+                    'max_ms': round(entry.max_seconds * 1000, 1),
+                }
+                for entry in self._tools.values() if entry.calls
+            }
+
+
+TOOL_REGISTRY = ToolRegistry()
+tool_handler = TOOL_REGISTRY.handler
@@ -31,6 +31,10 @@ logger = logging.getLogger(__name__)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
+# Write log records from a background thread instead of the request path
+from log_pipeline import install_log_pipeline
+install_log_pipeline()
+
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
     logger.info(f"Received signal {signum}, shutting down gracefully...")
@@ -0,0 +1,247 @@
+"""
+Process-wide cache for Key Vault secrets.
+
+FunctionAppClient.initialize() used to read function-key from Key Vault
+every time a client was initialized, with a fresh DefaultAzureCredential
+behind it. SecretCache keeps one SecretClient and the secrets it has read
+for the whole process:
+
+- get() fetches a secret on a miss; concurrent callers wait for the one
+  fetch instead of each calling Key Vault
+- cached() never blocks. Once a secret is older than REFRESH_AHEAD of the
+  TTL it is re-read on a background thread while callers keep the current
+  value, so a rotated key is picked up without a Key Vault round-trip on
+  the request path. A failed refresh keeps the last value and is retried
+  after FAILURE_BACKOFF seconds.
+- with secret_cache_path and secret_cache_key set, secrets are also kept in
+  a Fernet-encrypted file (0600). A new process starts from that file,
+  ignoring it once it is older than the TTL, and confirms the values in the
+  background, so a restart does not wait on Key Vault either. The Fernet
+  key is derived from secret_cache_key with PBKDF2-HMAC-SHA256 and a random
+  salt; the salt and iteration count are stored in the file's first line.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+REFRESH_AHEAD = 0.8     # fraction of the TTL after which a secret is re-read in the background
+FAILURE_BACKOFF = 30.0  # seconds before a failed refresh is tried again
+
+# Disk cache key derivation; the header line is b"pbkdf2-sha256$<iterations>$<base64 salt>\n"
+KDF_SCHEME = b'pbkdf2-sha256'
+KDF_ITERATIONS = 600_000
+KDF_SALT_BYTES = 16
+
+
+class _Secret:
+    __slots__ = ('value', 'fetched_at', 'refresh_at')
+
+    def __init__(self, value: str, fetched_at: float, refresh_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.refresh_at = refresh_at
+
+
+class SecretCache:
+    """Secrets from one Key Vault, shared by every client in the process."""
+
+    def __init__(self, vault_url: str, client_id: Optional[str] = None, ttl: float = 3600.0,
+                 disk_path: Optional[str] = None, disk_key: Optional[str] = None):
+        self.vault_url = vault_url
+        self.client_id = client_id
+        self.ttl = ttl
+        self.disk_path = disk_path if disk_path and disk_key else None
+        self._disk_key = disk_key
+        self._kdf: Optional[Tuple[bytes, int, Any]] = None   # (salt, iterations, Fernet) derived once
+        self._client = None
+        self._entries: Dict[str, _Secret] = {}
+        self._errors: Dict[str, Exception] = {}
+        self._retry_after: Dict[str, float] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.rotations = 0
+        self.fetches = 0
+        self.failures = 0
+        self.loaded_from_disk = 0
+        self._fetch_seconds = 0.0
+        self._load_disk()
+
+    def _secret_client(self):
+        if self._client is None:
+            from azure.identity import DefaultAzureCredential
+            from azure.keyvault.secrets import SecretClient
+
+            credential = (DefaultAzureCredential(managed_identity_client_id=self.client_id)
+                          if self.client_id else DefaultAzureCredential())
+            self._client = SecretClient(vault_url=self.vault_url, credential=credential)
+        return self._client
+
+    def cached(self, name: str) -> Optional[str]:
+        """The current value without blocking, or None if the secret was never read."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            self.hits += 1
+            due = (now >= entry.refresh_at and name not in self._inflight
+                   and now >= self._retry_after.get(name, 0.0))
+            if due:
+                self._inflight[name] = threading.Event()
+                self.refreshes += 1
+        if due:
+            threading.Thread(target=self._fetch, args=(name,), name='mde-secret-refresh', daemon=True).start()
+        return entry.value
+
+    def get(self, name: str, timeout: float = 60.0) -> str:
+        """The secret's value, reading it from Key Vault if it is not cached yet."""
+        value = self.cached(name)
+        if value is not None:
+            return value
+        with self._lock:
+            event = self._inflight.get(name)
+            owner = event is None
+            if owner:
+                event = self._inflight[name] = threading.Event()
+                self.misses += 1
+        if owner:
+            self._fetch(name)
+        else:
+            event.wait(timeout)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise self._errors.get(name) or TimeoutError(f"Secret {name} was not read within {timeout}s")
+            return entry.value
+
+    def _fetch(self, name: str) -> None:
+        started = time.monotonic()
+        try:
+            value = self._secret_client().get_secret(name).value
+            now = time.time()
+            with self._lock:
+                previous = self._entries.get(name)
+                self._entries[name] = _Secret(value, now, now + self.ttl * REFRESH_AHEAD)
+                self._errors.pop(name, None)
+                rotated = previous is not None and previous.value != value
+                if rotated:
+                    self.rotations += 1
+            if rotated:
+                logger.info("Key Vault secret rotated", secret=name)
+            self._save_disk()
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self._errors[name] = e
+                self._retry_after[name] = time.time() + FAILURE_BACKOFF
+            logger.warning("Failed to read secret from Key Vault", secret=name, error=str(e))
+        finally:
+            with self._lock:
+                self.fetches += 1
+                self._fetch_seconds += time.monotonic() - started
+                event = self._inflight.pop(name, None)
+            if event is not None:
+                event.set()
+
+    def _cipher(self, salt: Optional[bytes] = None, iterations: int = KDF_ITERATIONS):
+        """Fernet for salt (a new random salt when None and none was derived yet); returns (header, cipher)."""
+        from cryptography.fernet import Fernet
+
+        if self._kdf is not None and (salt is None or (salt, iterations) == self._kdf[:2]):
+            salt, iterations, cipher = self._kdf
+        else:
+            salt = salt or os.urandom(KDF_SALT_BYTES)
+            key = hashlib.pbkdf2_hmac('sha256', self._disk_key.encode(), salt, iterations)
+            cipher = Fernet(base64.urlsafe_b64encode(key))
+            self._kdf = (salt, iterations, cipher)
+        header = b'$'.join((KDF_SCHEME, str(iterations).encode(), base64.b64encode(salt))) + b'\n'
+        return header, cipher
+
+    def _load_disk(self) -> None:
+        if not self.disk_path or not os.path.exists(self.disk_path):
+            return
+        try:
+            with open(self.disk_path, 'rb') as f:
+                header, _, token = f.read().partition(b'\n')
+            scheme, iterations, salt = header.split(b'$')
+            if scheme != KDF_SCHEME:
+                raise ValueError(f"unsupported key derivation {scheme.decode(errors='replace')!r}")
+            _, cipher = self._cipher(base64.b64decode(salt), int(iterations))
+            # Fernet tokens carry their creation time; older than the TTL is rejected
+            data = json.loads(cipher.decrypt(token, ttl=int(self.ttl)))
+        except Exception as e:
+            logger.warning("Ignoring secret cache file", path=self.disk_path, error=str(e) or type(e).__name__)
+            return
+        if data.get('vault_url') != self.vault_url:
+            return
+        now = time.time()
+        for name, value in data.get('secrets', {}).items():
+            # Served right away and confirmed against Key Vault on first use
+            self._entries[name] = _Secret(value, now, now)
+        self.loaded_from_disk = len(self._entries)
+
+    def _save_disk(self) -> None:
+        if not self.disk_path:
+            return
+        with self._lock:
+            secrets = {name: entry.value for name, entry in self._entries.items()}
+        try:
+            header, cipher = self._cipher()
+            token = cipher.encrypt(json.dumps({'vault_url': self.vault_url, 'secrets': secrets}).encode())
+            temp_path = f"{self.disk_path}.{os.getpid()}.tmp"
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header + token)
+            os.replace(temp_path, self.disk_path)
+        except Exception as e:
+            logger.warning("Failed to write secret cache file", path=self.disk_path, error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'vault_url': self.vault_url,
+                'secrets': sorted(self._entries),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'background_refreshes': self.refreshes,
+                'rotations': self.rotations,
+                'fetches': self.fetches,
+                'failures': self.failures,
+                'avg_fetch_ms': round(self._fetch_seconds / self.fetches * 1000, 1) if self.fetches else 0.0,
+                'loaded_from_disk': self.loaded_from_disk,
+                'disk_cache': bool(self.disk_path),
+            }
+
+
+# One cache per vault and identity per process (keyed by pid like the web app's pools)
+_caches: Dict[Tuple[int, str, Optional[str]], SecretCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_secret_cache(config) -> SecretCache:
+    """Get or create the process-wide cache for config.key_vault_url."""
+    key = (os.getpid(), config.key_vault_url, config.azure_client_id)
+    cache = _caches.get(key)
+    if cache is not None:
+        return cache
+
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = SecretCache(config.key_vault_url, config.azure_client_id, ttl=config.secret_cache_ttl,
+                                disk_path=config.secret_cache_path, disk_key=config.secret_cache_key)
+            _caches[key] = cache
+        return cache
@@ -30,6 +30,7 @@ import os
 import re
 import sys
 import time
+import weakref
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Sequence
@@ -63,6 +64,10 @@ try:
         CustomDetectionRequest,
     )
     from .tools import get_all_tools
+    from .catalog import get_tool_catalog
+    from .prompts import build_system_prompt
+    from .registry import TOOL_REGISTRY, tool_handler
+    from .log_pipeline import clip_event_fields, sample_events
 except ImportError:
     from config import MCPConfig
     from function_client import FunctionAppClient
@@ -75,11 +80,17 @@ except ImportError:
         CustomDetectionRequest,
     )
     from tools import get_all_tools
+    from catalog import get_tool_catalog
+    from prompts import build_system_prompt
+    from registry import TOOL_REGISTRY, tool_handler
+    from log_pipeline import clip_event_fields, sample_events
 
 # Configure structured logging
 structlog.configure(
     processors=[
         structlog.stdlib.filter_by_level,
+        sample_events(),
+        clip_event_fields,
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
@@ -114,6 +125,8 @@ class MDEAutomatorMCPServer:
         self.config = config
         self.function_client = FunctionAppClient(config)
         self.server = MCPServer("mdeautomator-mcp")
+        self._listed_tools_hash = None
+        self._tool_list_sessions = weakref.WeakSet()
         self._setup_handlers()
     
     def _perform_startup_diagnostics(self):
@@ -211,9 +224,11 @@ class MDEAutomatorMCPServer:
         async def handle_list_tools() -> ListToolsResult:
             """List all available MDEAutomator tools."""
             try:
-                tools = get_all_tools()
-                logger.info("Listed tools", tool_count=len(tools))
-                return ListToolsResult(tools=tools)
+                catalog = get_tool_catalog()
+                self._listed_tools_hash = catalog.hash
+                self._tool_list_sessions.add(self.server.request_context.session)
+                logger.info("Listed tools", tool_count=len(catalog.tools))
+                return ListToolsResult(tools=list(catalog.tools))
             except Exception as e:
                 logger.error("Failed to list tools", error=str(e))
                 raise
@@ -236,6 +251,7 @@ class MDEAutomatorMCPServer:
                     tool_name=request.name,
                     success=True,
                 )
+                await self._notify_if_tools_changed()
 
                 return CallToolResult(
                     content=[
@@ -263,142 +279,24 @@ class MDEAutomatorMCPServer:
                     isError=True,
                 )
 
+    async def _notify_if_tools_changed(self) -> None:
+        """Send tools/list_changed to sessions that listed tools before the catalog changed."""
+        catalog = get_tool_catalog()
+        if self._listed_tools_hash is None or catalog.hash == self._listed_tools_hash:
+            return
+        self._listed_tools_hash = catalog.hash
+        for session in list(self._tool_list_sessions):
+            try:
+                await session.send_tool_list_changed()
+            except Exception as e:
+                logger.warning("Failed to send tools/list_changed", error=str(e))
+
     async def _route_tool_call(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """Route tool calls to appropriate Function App endpoints."""
-          # Device Management Tools
-        if tool_name.startswith("mde_get_machines"):
-            return await self._handle_get_machines(arguments)
-        elif tool_name.startswith("mde_isolate_device"):
-            return await self._handle_isolate_device(arguments)
-        elif tool_name.startswith("mde_unisolate_device"):
-            return await self._handle_unisolate_device(arguments)
-        elif tool_name.startswith("mde_contain_device"):
-            return await self._handle_contain_device(arguments)
-        elif tool_name.startswith("mde_uncontain_device"):
-            return await self._handle_uncontain_device(arguments)
-        elif tool_name.startswith("mde_restrict_app_execution"):
-            return await self._handle_restrict_app_execution(arguments)
-        elif tool_name.startswith("mde_unrestrict_app_execution"):
-            return await self._handle_unrestrict_app_execution(arguments)
-        elif tool_name.startswith("mde_collect_investigation_package"):
-            return await self._handle_collect_investigation_package(arguments)
-        elif tool_name.startswith("mde_run_antivirus_scan"):
-            return await self._handle_run_antivirus_scan(arguments)
-        elif tool_name.startswith("mde_stop_and_quarantine_file"):
-            return await self._handle_stop_and_quarantine_file(arguments)
-        elif tool_name.startswith("mde_offboard_device"):
-            return await self._handle_offboard_device(arguments)
-            
-        # Live Response Tools
-        elif tool_name.startswith("mde_run_live_response_script"):
-            return await self._handle_run_live_response_script(arguments)
-        elif tool_name.startswith("mde_upload_to_library"):
-            return await self._handle_upload_to_library(arguments)
-        elif tool_name.startswith("mde_put_file"):
-            return await self._handle_put_file(arguments)
-        elif tool_name.startswith("mde_get_file"):
-            return await self._handle_get_file(arguments)
-        elif tool_name.startswith("mde_run_live_response_putfile"):
-            return await self._handle_run_live_response_putfile(arguments)
-        elif tool_name.startswith("mde_run_live_response_getfile"):
-            return await self._handle_run_live_response_getfile(arguments)
-        elif tool_name.startswith("mde_upload_live_response_file"):
-            return await self._handle_upload_live_response_file(arguments)
-              # Action Management Tools        elif tool_name.startswith("mde_get_actions"):
-            return await self._handle_get_actions(arguments)
-        elif tool_name.startswith("mde_cancel_actions"):
-            return await self._handle_cancel_actions(arguments)
-        elif tool_name.startswith("mde_undo_actions"):
-            return await self._handle_undo_actions(arguments)
-        elif tool_name.startswith("mde_get_action_status"):
-            return await self._handle_get_action_status(arguments)
-        elif tool_name.startswith("mde_get_live_response_output"):
-            return await self._handle_get_live_response_output(arguments)
-            
-        # Threat Intelligence Tools
-        elif tool_name.startswith("mde_add_file_indicators"):
-            return await self._handle_add_file_indicators(arguments)
-        elif tool_name.startswith("mde_add_ip_indicators"):
-            return await self._handle_add_ip_indicators(arguments)
-        elif tool_name.startswith("mde_add_url_indicators"):
-            return await self._handle_add_url_indicators(arguments)
-        elif tool_name.startswith("mde_add_cert_indicators"):
-            return await self._handle_add_cert_indicators(arguments)
-        elif tool_name.startswith("mde_remove_indicators"):
-            return await self._handle_remove_indicators(arguments)
-        elif tool_name.startswith("mde_get_indicators"):
-            return await self._handle_get_indicators(arguments)
-            
-        # Hunting Tools
-        elif tool_name.startswith("mde_run_hunting_query"):
-            return await self._handle_run_hunting_query(arguments)
-        elif tool_name.startswith("mde_create_scheduled_hunt"):
-            return await self._handle_create_scheduled_hunt(arguments)
-        elif tool_name.startswith("mde_enable_scheduled_hunt"):
-            return await self._handle_enable_scheduled_hunt(arguments)
-        elif tool_name.startswith("mde_disable_scheduled_hunt"):
-            return await self._handle_disable_scheduled_hunt(arguments)
-        elif tool_name.startswith("mde_delete_scheduled_hunt"):
-            return await self._handle_delete_scheduled_hunt(arguments)
-        elif tool_name.startswith("mde_get_hunt_results"):
-            return await self._handle_get_hunt_results(arguments)
-        elif tool_name.startswith("mde_get_queries"):
-            return await self._handle_get_queries(arguments)
-        elif tool_name.startswith("mde_get_query"):
-            return await self._handle_get_query(arguments)
-        elif tool_name.startswith("mde_add_query"):
-            return await self._handle_add_query(arguments)
-        elif tool_name.startswith("mde_update_query"):
-            return await self._handle_update_query(arguments)
-        elif tool_name.startswith("mde_undo_query"):
-            return await self._handle_undo_query(arguments)
-            
-        # Incident Management Tools
-        elif tool_name.startswith("mde_get_incidents"):
-            return await self._handle_get_incidents(arguments)
-        elif tool_name.startswith("mde_get_incident"):
-            return await self._handle_get_incident(arguments)
-        elif tool_name.startswith("mde_update_incident"):
-            return await self._handle_update_incident(arguments)
-        elif tool_name.startswith("mde_add_incident_comment"):
-            return await self._handle_add_incident_comment(arguments)
-            
-        # Custom Detection Tools
-        elif tool_name.startswith("mde_get_custom_detections"):
-            return await self._handle_get_custom_detections(arguments)
-        elif tool_name.startswith("mde_get_custom_detection_by_id"):
-            return await self._handle_get_custom_detection_by_id(arguments)
-        elif tool_name.startswith("mde_create_custom_detection"):
-            return await self._handle_create_custom_detection(arguments)
-        elif tool_name.startswith("mde_update_custom_detection"):
-            return await self._handle_update_custom_detection(arguments)
-        elif tool_name.startswith("mde_delete_custom_detection"):
-            return await self._handle_delete_custom_detection(arguments)
-        elif tool_name.startswith("mde_sync_custom_detections"):
-            return await self._handle_sync_custom_detections(arguments)
-            
-        # Information Gathering Tools
-        elif tool_name.startswith("mde_get_file_info"):
-            return await self._handle_get_file_info(arguments)
-        elif tool_name.startswith("mde_get_ip_info"):
-            return await self._handle_get_ip_info(arguments)
-        elif tool_name.startswith("mde_get_url_info"):
-            return await self._handle_get_url_info(arguments)
-        elif tool_name.startswith("mde_get_logged_in_users"):
-            return await self._handle_get_logged_in_users(arguments)
-            
-        # AI Chat Integration Tool
-        elif tool_name.startswith("mde_ai_chat"):
-            return await self._handle_ai_chat(arguments)
-            
-        # Tenant Management Tools
-        elif tool_name.startswith("mde_get_tenant_ids"):
-            return await self._handle_get_tenant_ids(arguments)
-            
-        else:
-            raise ValueError(f"Unknown tool: {tool_name}")
+        """Route a tool call to its registered handler (see registry.py)."""
+        return await TOOL_REGISTRY.dispatch(self, tool_name, arguments)
 
     # Device Management Handlers
+    @tool_handler("mde_get_machines")
     async def _handle_get_machines(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get machines requests."""
         payload = {
@@ -408,6 +306,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_isolate_device")
     async def _handle_isolate_device(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle device isolation requests."""
         device_ids = arguments.get("device_ids", [])
@@ -424,6 +323,7 @@ class MDEAutomatorMCPServer:
             
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_unisolate_device")
     async def _handle_unisolate_device(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle device unisolation requests."""
         payload = {
@@ -433,6 +333,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_contain_device")
     async def _handle_contain_device(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle device containment requests."""
         payload = {
@@ -442,6 +343,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_uncontain_device")
     async def _handle_uncontain_device(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle device uncontainment requests."""
         payload = {
@@ -451,6 +353,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_restrict_app_execution")
     async def _handle_restrict_app_execution(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle app execution restriction requests."""
         payload = {
@@ -460,6 +363,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_unrestrict_app_execution")
     async def _handle_unrestrict_app_execution(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle app execution unrestriction requests."""
         payload = {
@@ -469,6 +373,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_collect_investigation_package")
     async def _handle_collect_investigation_package(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle investigation package collection requests."""
         payload = {
@@ -478,6 +383,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_run_antivirus_scan")
     async def _handle_run_antivirus_scan(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle antivirus scan requests."""
         payload = {
@@ -487,6 +393,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_stop_and_quarantine_file")
     async def _handle_stop_and_quarantine_file(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle stop and quarantine file requests."""
         payload = {
@@ -497,6 +404,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEDispatcher", payload)
 
+    @tool_handler("mde_offboard_device")
     async def _handle_offboard_device(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle device offboarding requests."""
         payload = {
@@ -507,6 +415,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEDispatcher", payload)
 
     # Live Response Handlers
+    @tool_handler("mde_run_live_response_script")
     async def _handle_run_live_response_script(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle live response script execution."""
         payload = {
@@ -517,6 +426,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
+    @tool_handler("mde_upload_to_library")
     async def _handle_upload_to_library(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle file upload to Live Response library."""
         payload = {
@@ -528,6 +438,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
+    @tool_handler("mde_put_file")
     async def _handle_put_file(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle putting file to devices."""
         payload = {
@@ -538,6 +449,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
+    @tool_handler("mde_get_file")
     async def _handle_get_file(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle getting file from devices."""
         payload = {
@@ -548,6 +460,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
+    @tool_handler("mde_run_live_response_putfile")
     async def _handle_run_live_response_putfile(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle Live Response PutFile command."""
         payload = {
@@ -558,6 +471,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
+    @tool_handler("mde_run_live_response_getfile")
     async def _handle_run_live_response_getfile(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle Live Response GetFile command."""
         payload = {
@@ -568,6 +482,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
+    @tool_handler("mde_upload_live_response_file")
     async def _handle_upload_live_response_file(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle uploading file to Live Response library."""
         payload = {
@@ -585,6 +500,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEOrchestrator", payload)
 
     # Action Management Handlers
+    @tool_handler("mde_get_actions")
     async def _handle_get_actions(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get actions requests."""
         payload = {
@@ -593,6 +509,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_cancel_actions")
     async def _handle_cancel_actions(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle cancel actions requests."""
         payload = {
@@ -601,6 +518,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_undo_actions")
     async def _handle_undo_actions(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle undo completed actions requests."""
         payload = {
@@ -609,6 +527,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_get_action_status")
     async def _handle_get_action_status(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get action status requests."""
         payload = {
@@ -618,6 +537,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_get_live_response_output")
     async def _handle_get_live_response_output(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get live response output requests."""
         payload = {
@@ -628,6 +548,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEAutomator", payload)
 
     # Threat Intelligence Handlers
+    @tool_handler("mde_add_file_indicators")
     async def _handle_add_file_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle adding file threat indicators."""
         payload = {
@@ -638,6 +559,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDETIManager", payload)
 
+    @tool_handler("mde_add_ip_indicators")
     async def _handle_add_ip_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle adding IP threat indicators."""
         payload = {
@@ -647,6 +569,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDETIManager", payload)
 
+    @tool_handler("mde_add_url_indicators")
     async def _handle_add_url_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle adding URL threat indicators."""
         payload = {
@@ -656,6 +579,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDETIManager", payload)
 
+    @tool_handler("mde_add_cert_indicators")
     async def _handle_add_cert_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle adding certificate threat indicators."""
         payload = {
@@ -665,6 +589,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDETIManager", payload)
 
+    @tool_handler("mde_remove_indicators")
     async def _handle_remove_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle removing threat indicators."""
         indicator_type = arguments.get("indicator_type", "")
@@ -702,6 +627,7 @@ class MDEAutomatorMCPServer:
             
         return await self.function_client.call_function("MDETIManager", payload)
 
+    @tool_handler("mde_get_indicators")
     async def _handle_get_indicators(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get indicators requests."""
         payload = {
@@ -711,6 +637,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEAutomator", payload)
 
     # Hunting Handlers
+    @tool_handler("mde_run_hunting_query")
     async def _handle_run_hunting_query(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle running hunting queries."""
         payload = {
@@ -731,6 +658,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEHuntScheduler", payload)
 
+    @tool_handler("mde_get_hunt_results")
     async def _handle_get_hunt_results(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle getting hunt results."""
         payload = {
@@ -740,6 +668,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEHuntManager", payload)
 
+    @tool_handler("mde_create_scheduled_hunt")
     async def _handle_create_scheduled_hunt(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle creating scheduled hunt operations."""
         payload = {
@@ -752,6 +681,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEHuntScheduler", payload)
 
+    @tool_handler("mde_enable_scheduled_hunt")
     async def _handle_enable_scheduled_hunt(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle enabling scheduled hunt operations."""
         payload = {
@@ -761,6 +691,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEHuntScheduler", payload)
 
+    @tool_handler("mde_disable_scheduled_hunt")
     async def _handle_disable_scheduled_hunt(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle disabling scheduled hunt operations."""
         payload = {
@@ -770,6 +701,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEHuntScheduler", payload)
 
+    @tool_handler("mde_delete_scheduled_hunt")
     async def _handle_delete_scheduled_hunt(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle deleting scheduled hunt operations."""
         payload = {
@@ -779,6 +711,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEHuntScheduler", payload)
 
+    @tool_handler("mde_get_queries")
     async def _handle_get_queries(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle getting all saved queries."""
         payload = {
@@ -787,6 +720,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_get_query")
     async def _handle_get_query(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle getting a specific saved query."""
         payload = {
@@ -796,6 +730,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_add_query")
     async def _handle_add_query(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle adding a new saved query."""
         payload = {
@@ -807,6 +742,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_update_query")
     async def _handle_update_query(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle updating an existing saved query."""
         payload = {
@@ -819,6 +755,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_undo_query")
     async def _handle_undo_query(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle undoing changes to a saved query."""
         payload = {
@@ -829,6 +766,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEAutomator", payload)
 
     # Incident Management Handlers
+    @tool_handler("mde_get_incidents")
     async def _handle_get_incidents(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get incidents requests."""
         payload = {
@@ -837,6 +775,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEIncidentManager", payload)
 
+    @tool_handler("mde_get_incident")
     async def _handle_get_incident(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get specific incident requests."""
         payload = {
@@ -846,6 +785,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEIncidentManager", payload)
 
+    @tool_handler("mde_update_incident")
     async def _handle_update_incident(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle update incident requests."""
         payload = {
@@ -865,6 +805,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEIncidentManager", payload)
 
+    @tool_handler("mde_add_incident_comment")
     async def _handle_add_incident_comment(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle adding incident comments."""
         payload = {
@@ -876,6 +817,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEIncidentManager", payload)
 
     # Custom Detection Handlers
+    @tool_handler("mde_get_custom_detections")
     async def _handle_get_custom_detections(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get custom detections requests."""
         payload = {
@@ -884,6 +826,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDECDManager", payload)
 
+    @tool_handler("mde_get_custom_detection_by_id")
     async def _handle_get_custom_detection_by_id(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get specific custom detection by ID requests."""
         payload = {
@@ -893,6 +836,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDECDManager", payload)
 
+    @tool_handler("mde_create_custom_detection")
     async def _handle_create_custom_detection(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle create custom detection requests."""
         payload = {
@@ -902,6 +846,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDECDManager", payload)
 
+    @tool_handler("mde_update_custom_detection")
     async def _handle_update_custom_detection(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle update custom detection requests."""
         payload = {
@@ -912,6 +857,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDECDManager", payload)
 
+    @tool_handler("mde_delete_custom_detection")
     async def _handle_delete_custom_detection(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle delete custom detection requests."""
         payload = {
@@ -921,6 +867,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDECDManager", payload)
 
+    @tool_handler("mde_sync_custom_detections")
     async def _handle_sync_custom_detections(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle sync custom detections requests."""
         payload = {
@@ -931,6 +878,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDECDManager", payload)
 
     # Information Gathering Handlers
+    @tool_handler("mde_get_file_info")
     async def _handle_get_file_info(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get file info requests."""
         payload = {
@@ -940,6 +888,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_get_ip_info")
     async def _handle_get_ip_info(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get IP info requests."""
         payload = {
@@ -949,6 +898,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_get_url_info")
     async def _handle_get_url_info(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get URL info requests."""
         payload = {
@@ -958,6 +908,7 @@ class MDEAutomatorMCPServer:
         }
         return await self.function_client.call_function("MDEAutomator", payload)
 
+    @tool_handler("mde_get_logged_in_users")
     async def _handle_get_logged_in_users(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get logged in users requests."""
         payload = {
@@ -968,6 +919,7 @@ class MDEAutomatorMCPServer:
         return await self.function_client.call_function("MDEAutomator", payload)
 
     # Tenant Management Handlers
+    @tool_handler("mde_get_tenant_ids")
     async def _handle_get_tenant_ids(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle get tenant IDs requests."""
         payload = {
@@ -1149,6 +1101,7 @@ class MDEAutomatorMCPServer:
         return None
 
     # AI Chat Integration Handler
+    @tool_handler("mde_ai_chat")
     async def _handle_ai_chat(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle AI-powered chat requests using local Azure OpenAI client."""
         execute_actions = arguments.get("execute_actions", False)
@@ -1172,34 +1125,11 @@ class MDEAutomatorMCPServer:
                     "suggestion": "Configure AZURE_AI_ENDPOINT and AZURE_AI_KEY environment variables"
                 }
             
-            # Get all available tools for system prompt
-            available_tools = self._get_all_available_tools()
-            tools_description = self._format_tools_for_ai(available_tools)
-            
-            # Build conversation with system prompt
-            system_prompt = f"""You are an expert Microsoft Defender for Endpoint (MDE) security operations AI that EXECUTES real security actions.
-
-Context: {context}
-
-🔧 AVAILABLE MDE TOOLS: I have access to these real MDE operations:
-{tools_description}
-
-🎯 EXECUTION MODE: execute_actions={execute_actions}, tenant_id={'configured' if tenant_id else 'missing'}
-
-🤖 BEHAVIOR:
-When execute_actions=true and tenant_id is provided, I will:
-1. Analyze your request and determine which MDE tools to use
-2. Execute the appropriate operations using real MDE APIs
-3. Return actual results from Microsoft Defender for Endpoint
-4. Provide expert security analysis based on live data
-
-When execute_actions=false, I will:
-1. Explain what I would do with step-by-step action plans
-2. Recommend specific tools and parameters
-3. Provide security expertise without executing actions
-
-For your request: "{message}"
-I will now {'execute real MDE operations and analyze live data' if execute_actions and tenant_id else 'provide detailed action recommendations'}."""
+            # Static tool/behaviour prefix is cached per tool catalog; only the tail is built here
+            system_prompt, prompt_tokens = build_system_prompt(
+                get_tool_catalog(), message, context, execute_actions, tenant_id)
+            logger.debug("AI chat system prompt", static_tokens=prompt_tokens["static"],
+                         dynamic_tokens=prompt_tokens["dynamic"])
             
             messages = [
                 {"role": "system", "content": system_prompt},
@@ -1799,28 +1729,8 @@ I will now {'execute real MDE operations and analyze live data' if execute_actio
     def _get_all_available_tools(self) -> List[Dict[str, Any]]:
         """Get all available MDE tools with descriptions."""
         try:
-            from .tools import get_all_tools
-            mcp_tools = get_all_tools()
-            
-            # Convert MCP Tool objects to dictionaries
-            tools = []
-            for tool in mcp_tools:
-                tool_dict = {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": []
-                }
-                
-                # Extract parameters from inputSchema if available
-                if hasattr(tool, 'inputSchema') and tool.inputSchema:
-                    if hasattr(tool.inputSchema, 'properties') and tool.inputSchema.properties:
-                        tool_dict["parameters"] = list(tool.inputSchema.properties.keys())
-                    elif isinstance(tool.inputSchema, dict) and "properties" in tool.inputSchema:
-                        tool_dict["parameters"] = list(tool.inputSchema["properties"].keys())
-                
-                tools.append(tool_dict)
-            
-            return tools
+            # Built once per set of tool definitions (see catalog.py)
+            return list(get_tool_catalog().summaries)
             
         except ImportError:
             # Fallback tool list if tools module not available
@@ -1896,65 +1806,7 @@ I will now {'execute real MDE operations and analyze live data' if execute_actio
                     "parameters": ["tenant_id", "rule_name", "kql_query", "severity", "description"]
                 }
             ]
-    
-    def _format_tools_for_ai(self, tools: List[Dict[str, Any]]) -> str:
-        """Format tools list for AI system prompt."""
-        formatted_tools = []
-        
-        # Group tools by category with broader keyword matching
-        categories = {
-            "Device Management": ["get_machines", "isolate", "unisolate", "contain", "restrict", "collect_investigation", "run_antivirus", "offboard"],
-            "Live Response": ["run_live_response", "upload_to_library", "put_file", "get_file", "get_live_response_output"],
-            "Action Management": ["get_actions", "cancel_actions", "get_action_status"],
-            "Threat Intelligence": ["get_indicators", "add_", "remove_indicators"],
-            "Incident Management": ["get_incidents", "get_incident", "update_incident", "add_incident_comment"],
-            "Advanced Hunting": ["run_hunting_query", "schedule_hunt", "get_hunt_results"],
-            "Custom Detections": ["get_detection_rules", "create_detection_rule", "update_detection_rule", "delete_detection_rule"],
-            "Information Gathering": ["get_file_info", "get_ip_info", "get_url_info", "get_logged_in_users"],
-            "AI Integration": ["ai_chat"]
-        }
-        
-        # First, organize tools by category
-        categorized_tools = {category: [] for category in categories.keys()}
-        uncategorized_tools = []
-        
-        for tool in tools:
-            tool_name = tool.get("name", "")
-            description = tool.get("description", "No description")
-            params = ", ".join(tool.get("parameters", []))
-            tool_entry = f"  • {tool_name}: {description}"
-            if params:
-                tool_entry += f" (params: {params})"
-            
-            # Find matching category
-            categorized = False
-            for category, keywords in categories.items():
-                if any(keyword in tool_name for keyword in keywords):
-                    categorized_tools[category].append(tool_entry)
-                    categorized = True
-                    break
-            
-            if not categorized:
-                uncategorized_tools.append(tool_entry)
-        
-        # Format output
-        for category, tool_list in categorized_tools.items():
-            if tool_list:
-                formatted_tools.append(f"\n{category}:")
-                formatted_tools.extend(tool_list)
-        
-        # Add uncategorized tools if any
-        if uncategorized_tools:
-            formatted_tools.append(f"\nOther Tools:")
-            formatted_tools.extend(uncategorized_tools)
-        
-        # Add summary count
-        total_tools = len(tools)
-        summary = f"\n\nTOTAL AVAILABLE TOOLS: {total_tools} Microsoft Defender for Endpoint operations"
-        
-        result = "\n".join(formatted_tools) + summary
-        return result if formatted_tools else f"No tools available (expected {total_tools} tools)"
-        
+
 async def main():
     """Main entry point for the MCP server."""
     try:
@@ -8,6 +8,13 @@ a comprehensive interface to Microsoft Defender for Endpoint operations.
 from typing import List
 from mcp.types import Tool
 
+try:
+    from .registry import TOOL_REGISTRY
+    from .catalog import get_tool_catalog
+except ImportError:
+    from registry import TOOL_REGISTRY
+    from catalog import get_tool_catalog
+
 
 def get_tenant_management_tools() -> List[Tool]:
     """Get tenant management tools."""
@@ -26,39 +33,7 @@ def get_tenant_management_tools() -> List[Tool]:
 
 def get_all_tools() -> List[Tool]:
     """Get all available MCP tools for MDEAutomator operations."""
-    tools = []
-    
-    # Device Management Tools
-    tools.extend(get_device_management_tools())
-    
-    # Live Response Tools
-    tools.extend(get_live_response_tools())
-    
-    # Action Management Tools
-    tools.extend(get_action_management_tools())
-    
-    # Threat Intelligence Tools
-    tools.extend(get_threat_intelligence_tools())
-    
-    # Hunting Tools
-    tools.extend(get_hunting_tools())
-    
-    # Incident Management Tools
-    tools.extend(get_incident_management_tools())
-    
-    # Custom Detection Tools
-    tools.extend(get_custom_detection_tools())
-    
-    # Information Gathering Tools
-    tools.extend(get_information_tools())
-    
-    # AI Integration Tools
-    tools.extend(get_ai_integration_tools())
-    
-    # Tenant Management Tools
-    tools.extend(get_tenant_management_tools())
-    
-    return tools
+    return list(get_tool_catalog().tools)
 
 
 def get_device_management_tools() -> List[Tool]:
@@ -144,6 +119,25 @@ def get_device_management_tools() -> List[Tool]:
                 "required": ["tenant_id", "device_ids"]
             }
         ),
+        Tool(
+            name="mde_uncontain_device",
+            description="Release contained unmanaged devices, restoring their network connectivity.",
+            inputSchema={
+                "type": "object", 
+                "properties": {
+                    "tenant_id": {
+                        "type": "string",
+                        "description": "Tenant ID for the operation"
+                    },
+                    "device_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Array of device IDs to release from containment"
+                    }
+                },
+                "required": ["tenant_id", "device_ids"]
+            }
+        ),
         Tool(
             name="mde_restrict_app_execution",
             description="Restrict application execution on devices, allowing only Microsoft-signed binaries to run.",
@@ -1284,3 +1278,19 @@ def get_ai_integration_tools() -> List[Tool]:
             }
         )
     ]
+
+
+# Tool definitions are registered, and their argument validators compiled, once at import
+for _group in (
+    get_device_management_tools,
+    get_live_response_tools,
+    get_action_management_tools,
+    get_threat_intelligence_tools,
+    get_hunting_tools,
+    get_incident_management_tools,
+    get_custom_detection_tools,
+    get_information_tools,
+    get_ai_integration_tools,
+    get_tenant_management_tools,
+):
+    TOOL_REGISTRY.define(_group())
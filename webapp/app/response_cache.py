@@ -0,0 +1,292 @@
+"""
+TTL read-through cache for read-only Function App operations.
+
+Reads such as GetTenantIds, GetMachines or GetIndicators cost a Graph token
+and an API round-trip in the PowerShell backend every time. This cache sits
+in front of call_azure_function with a TTL per operation, an LRU bound on
+entry count and total size, and stale-while-revalidate: for a short window
+after expiry the stale value is served while one background refresh fetches
+a new one. Writes for a tenant invalidate that tenant's matching reads.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Fresh lifetime in seconds for each cacheable read operation
+OPERATION_TTLS = {
+    'GetTenantIds': 300,
+    'GetMachines': 120,
+    'GetIndicators': 120,
+    'GetDetectionRules': 300,
+    'GetDetectionRulesfromStorage': 300,
+    'GetDetectionRulesFromStorage': 300,
+    'GetQueries': 300,
+    'GetDeviceGroups': 600,
+}
+
+# Reads that are not scoped to a tenant; writes invalidate them everywhere
+TENANT_AGNOSTIC_OPERATIONS = {'GetTenantIds', 'GetDetectionRulesfromStorage', 'GetDetectionRulesFromStorage'}
+
+# Write operation -> read operations it makes stale for the same tenant
+INVALIDATIONS = {
+    'SaveTenantId': ('GetTenantIds',),
+    'RemoveTenantId': ('GetTenantIds',),
+    'UpdateIncident': ('GetIncidents', 'GetIncidentAlerts'),
+    'UpdateIncidentComment': ('GetIncidents', 'GetIncidentAlerts'),
+    'SaveHuntSchedule': ('GetHuntSchedules',),
+    'EnableHuntSchedule': ('GetHuntSchedules',),
+    'DisableHuntSchedule': ('GetHuntSchedules',),
+    'RemoveHuntSchedule': ('GetHuntSchedules',),
+    'AddQuery': ('GetQueries',),
+    'UpdateQuery': ('GetQueries',),
+    'UndoQuery': ('GetQueries',),
+    'InstallDetectionRule': ('GetDetectionRules', 'GetDetectionRulesfromStorage', 'GetDetectionRulesFromStorage'),
+    'UpdateDetectionRule': ('GetDetectionRules', 'GetDetectionRulesfromStorage', 'GetDetectionRulesFromStorage'),
+    'UndoDetectionRule': ('GetDetectionRules', 'GetDetectionRulesfromStorage', 'GetDetectionRulesFromStorage'),
+    'SyncTIData': ('GetIndicators', 'GetDetectionRules', 'GetDetectionRulesfromStorage', 'GetDetectionRulesFromStorage'),
+}
+
+# Checked in order when a write has no exact entry above
+PREFIX_INVALIDATIONS = (
+    ('InvokeTi', ('GetIndicators',)),
+    ('UndoTi', ('GetIndicators',)),
+    ('Undo', ('GetMachines', 'GetActions')),
+    ('Invoke', ('GetMachines', 'GetActions')),
+)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_STALE_TTL = 60.0  # seconds a value may be served stale while it is refreshed
+
+
+def cache_ttl(payload: Any) -> Optional[int]:
+    """TTL for a read payload, or None when the operation is not cacheable."""
+    if not isinstance(payload, dict):
+        return None
+    return OPERATION_TTLS.get(payload.get('Function'))
+
+
+def invalidated_operations(operation: str) -> Tuple[str, ...]:
+    """Read operations that a write operation makes stale."""
+    if operation in INVALIDATIONS:
+        return INVALIDATIONS[operation]
+    for prefix, reads in PREFIX_INVALIDATIONS:
+        if operation.startswith(prefix):
+            return reads
+    return ()
+
+
+def is_cacheable_result(result: Any) -> bool:
+    """Never cache errors, timeouts or backend failures."""
+    if isinstance(result, dict):
+        if 'error' in result or result.get('status') in ('initiated', 'failed'):
+            return False
+        if result.get('Status') == 'Error':
+            return False
+    return result is not None
+
+
+class _Entry:
+    __slots__ = ('body', 'size', 'operation', 'tenant_id', 'fresh_until', 'stale_until')
+
+    def __init__(self, body: str, operation: str, tenant_id: str, ttl: float, stale_ttl: float):
+        now = time.monotonic()
+        self.body = body
+        self.size = len(body)
+        self.operation = operation
+        self.tenant_id = tenant_id
+        self.fresh_until = now + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+
+
+class ResponseCache:
+    """
+    LRU cache of Function App responses.
+
+    Values are stored as serialized JSON, so each hit hands the caller a
+    private copy (routes post-process responses in place) and the byte bound
+    reflects real memory use.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 stale_ttl: float = DEFAULT_STALE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._entries: 'OrderedDict[Any, _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: Any, operation: str, tenant_id: str, ttl: float,
+            loader: Callable[[], Any],
+            background_loader: Optional[Callable[[], Any]] = None,
+            force_refresh: bool = False) -> Any:
+        """
+        Return the cached value for key, loading it on a miss.
+
+        background_loader is used for stale-while-revalidate refreshes, which
+        run off the request thread; it defaults to loader. force_refresh skips
+        the lookup but still stores the freshly loaded value.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = None if force_refresh else self._entries.get(key)
+            if entry is not None:
+                if now < entry.fresh_until:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry.body)
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    body = entry.body
+                    refresh = key not in self._refreshing
+                    if refresh:
+                        self._refreshing.add(key)
+                else:
+                    body = None
+                    self._remove(key)
+            else:
+                body = None
+            if body is None:
+                self.misses += 1
+            generation = self._generation
+
+        if body is not None:
+            if refresh:
+                threading.Thread(
+                    target=self._refresh,
+                    args=(key, operation, tenant_id, ttl, background_loader or loader),
+                    name='mde-cache-refresh',
+                    daemon=True,
+                ).start()
+            return json.loads(body)
+
+        value = loader()
+        self._store(key, operation, tenant_id, ttl, value, generation)
+        return value
+
+    def peek(self, key: Any) -> Optional[Any]:
+        """Return a fresh cached value without loading anything on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry.fresh_until:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            body = entry.body
+        return json.loads(body)
+
+    def put(self, key: Any, operation: str, tenant_id: str, ttl: float, value: Any) -> None:
+        """Store a value loaded outside get() (e.g. a relayed response that turned out small)."""
+        with self._lock:
+            generation = self._generation
+        self._store(key, operation, tenant_id, ttl, value, generation)
+
+    def _refresh(self, key, operation, tenant_id, ttl, loader) -> None:
+        with self._lock:
+            generation = self._generation
+        try:
+            self._store(key, operation, tenant_id, ttl, loader(), generation)
+        except Exception:
+            pass  # keep serving the stale value until it ages out
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, operation, tenant_id, ttl, value, generation) -> None:
+        if not is_cacheable_result(value):
+            return
+        try:
+            body = json.dumps(value, separators=(',', ':'))
+        except (TypeError, ValueError):
+            return
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # A write landed while this value was loading; it may predate the write
+                return
+            self._remove(key)
+            entry = _Entry(body, operation, tenant_id, ttl, self.stale_ttl)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def invalidate(self, operations: Iterable[str], tenant_id: str = '') -> int:
+        """Drop cached reads of the given operations for a tenant; returns entries removed."""
+        operations = set(operations)
+        if not operations:
+            return 0
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items()
+                     if entry.operation in operations
+                     and (entry.operation in TENANT_AGNOSTIC_OPERATIONS or not tenant_id or entry.tenant_id == tenant_id)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'refreshing': len(self._refreshing),
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(config: Optional[Dict[str, Any]] = None) -> ResponseCache:
+    """Get or create the response cache shared by this worker's request threads."""
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            config = config or {}
+            _cache = ResponseCache(
+                max_entries=int(config.get('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(config.get('RESPONSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                stale_ttl=float(config.get('RESPONSE_CACHE_STALE_TTL', DEFAULT_STALE_TTL)),
+            )
+        return _cache
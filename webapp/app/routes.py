@@ -4,17 +4,44 @@ import json
 import base64
 import time
 import requests
+import httpx
 import asyncio
 import concurrent.futures
 import threading
-from flask import Blueprint, render_template, request, current_app, flash, redirect, url_for, jsonify, render_template_string
+from flask import Blueprint, Response, render_template, request, current_app, flash, redirect, url_for, jsonify, render_template_string, stream_with_context, has_request_context
 from .mcp_client import get_mcp_client
+from .http_pool import get_function_session, get_pool_stats
+from .async_client import AsyncClientUnavailable, get_async_client, get_async_client_stats
+from .mcp_engine import get_mcp_engine, get_mcp_engine_stats
+from .jobs import JobQueueFull, current_job, get_job_registry, get_job_stats
+from .device_batches import dispatch_device_batches, needs_batching
+from .fanout import TenantSelectionError, get_fanout_executor, get_fanout_stats, select_tenants
+from .singleflight import call_key, function_calls, is_coalescible
+from .response_cache import cache_ttl, get_response_cache, invalidated_operations
+from .circuit_breaker import get_endpoint_guard, get_endpoint_states
+from .conditional import conditional_json
+from .alert_cache import extract_alerts, get_alert_cache, incident_version
+from .incident_bulk import bulk_message, failed_incident_ids, run_incident_shards
+from .incident_store import INDEXED_FIELDS, IncidentLoadError, IncidentQueryError, get_incident_store
+from .machine_inventory import InventoryLoadError, InventoryQueryError, get_inventory_store
+from .flattener import flatten_table, schema_cache_stats
+from .warmer import get_warmer_stats, note_function_call, start_warmer
+from .uploads import UploadTooLarge, stage_upload, streamed_json_body
+from .mdeautomator_mcp.log_pipeline import clip, get_log_pipeline_stats
+from .json_relay import STREAMED_OPERATIONS, JsonRelay, JsonRelayError, iter_json_chunks, open_json_relay
 
 main_bp = Blueprint('main', __name__)
 
 # Utility to call Azure Function
 
-def call_azure_function(function_name, payload, read_timeout=3):
+def call_azure_function(function_name, payload, read_timeout=3, stream=False):
+    """
+    Call a Function App endpoint and return its parsed JSON (or an error dict).
+
+    With stream=True, large GetIncidents/GetMachines/GetActions responses are
+    returned as a JsonRelay to be streamed with _relay_response instead of
+    being buffered; small ones still come back as parsed values.
+    """
     func_url_base = current_app.config.get('FUNCTION_APP_BASE_URL')
     func_key = current_app.config.get('FUNCTION_KEY')
 
@@ -46,23 +73,163 @@ def call_azure_function(function_name, payload, read_timeout=3):
     url = f"{base_url}/api/{function_name}?code={func_key}"
     log_url = url.split('?code=')[0] + '?code=REDACTED_KEY'
     current_app.logger.info(f"Calling Azure Function at URL: {log_url}")
-    current_app.logger.debug(f"Payload for {function_name}: {payload}")
+    current_app.logger.debug("Payload for %s: %s", function_name, clip(payload))
+
+    if stream and _relay_enabled(payload):
+        return _relay_from_function(function_name, url, log_url, payload, read_timeout)
+
+    # Read-only operations are served from the TTL cache when possible
+    ttl = cache_ttl(payload) if current_app.config.get('RESPONSE_CACHE_ENABLED', True) else None
+    if ttl:
+        app = current_app._get_current_object()
+
+        def background_load():
+            with app.app_context():
+                return _fetch_from_function(function_name, url, log_url, payload, read_timeout)
+
+        return get_response_cache(app.config).get(
+            call_key(function_name, payload),
+            payload.get('Function'),
+            str(payload.get('TenantId') or ''),
+            ttl,
+            loader=lambda: _fetch_from_function(function_name, url, log_url, payload, read_timeout),
+            background_loader=background_load,
+            force_refresh=_cache_bypass_requested()
+        )
+
+    result = _fetch_from_function(function_name, url, log_url, payload, read_timeout)
+
+    # Writes make the tenant's cached reads stale
+    if isinstance(payload, dict) and not is_coalescible(payload):
+        operation = payload.get('Function') or ''
+        stale_reads = invalidated_operations(operation)
+        removed = get_response_cache(current_app.config).invalidate(
+            stale_reads, str(payload.get('TenantId') or '')
+        )
+        if 'GetMachines' in stale_reads:
+            get_inventory_store(current_app.config).invalidate(str(payload.get('TenantId') or ''))
+        if removed:
+            current_app.logger.info(f"Invalidated {removed} cached response(s) after {operation}")
+
+    return result
+
+def _cache_bypass_requested():
+    """Honour an explicit browser refresh (Cache-Control: no-cache) for cached reads"""
+    return has_request_context() and 'no-cache' in request.headers.get('Cache-Control', '')
+
+def _relay_enabled(payload):
+    return (current_app.config.get('STREAMING_RELAY_ENABLED', True)
+            and isinstance(payload, dict) and payload.get('Function') in STREAMED_OPERATIONS)
+
+def _relay_from_function(function_name, url, log_url, payload, read_timeout):
+    """Open a streaming relay, serving from and filling the response cache when the body is small"""
+    ttl = cache_ttl(payload) if current_app.config.get('RESPONSE_CACHE_ENABLED', True) else None
+    cache = get_response_cache(current_app.config)
+    key = call_key(function_name, payload)
+    if ttl and not _cache_bypass_requested():
+        cached = cache.peek(key)
+        if cached is not None:
+            return cached
+
+    # Streams are never coalesced: each caller needs its own upstream body
+    result = _guarded_post(function_name, url, log_url, payload, read_timeout, relay=True)
+    if ttl and not isinstance(result, JsonRelay):
+        cache.put(key, payload.get('Function'), str(payload.get('TenantId') or ''), ttl, result)
+    return result
+
+def _relay_response(relay, wrapper=None, wrapper_key=None, unwrap=False):
+    """Stream a JsonRelay to the browser as chunked JSON"""
+    chunks = iter_json_chunks(relay, wrapper, wrapper_key, unwrap,
+                              chunk_bytes=current_app.config.get('STREAMING_RELAY_CHUNK_BYTES', 64 * 1024))
+
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            # A bare array aborts the response (no closing ']') so the truncation is visible
+            if relay.error:
+                current_app.logger.error(f"Streaming relay ended early: {relay.error}")
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
+def _table_requested():
+    """?format=table asks a list route for flattened columns/rows instead of nested objects"""
+    return request.args.get('format', '').lower() == 'table'
+
+def _flatten_result(result, pins=None):
+    """Flatten a Function App list result (bare list, Result/value envelope or relay) into columns/rows"""
+    if isinstance(result, JsonRelay):
+        try:
+            return flatten_table(result.items(), pins)
+        finally:
+            result.close()
+    if isinstance(result, dict):
+        result = next((result[key] for key in ('Result', 'value', 'result') if isinstance(result.get(key), list)), [])
+    return flatten_table(result if isinstance(result, list) else [], pins)
+
+def _fetch_from_function(function_name, url, log_url, payload, read_timeout):
+    """Call the Function App, sharing one upstream request between identical concurrent reads"""
+    if is_coalescible(payload):
+        result, shared = function_calls.do(
+            call_key(function_name, payload),
+            lambda: _guarded_post(function_name, url, log_url, payload, read_timeout)
+        )
+        if shared:
+            current_app.logger.info(f"Coalesced {function_name} call with an identical in-flight request")
+        return result
+
+    return _guarded_post(function_name, url, log_url, payload, read_timeout)
+
+def _guarded_post(function_name, url, log_url, payload, read_timeout, relay=False):
+    """Send through the endpoint's circuit breaker and concurrency limit, failing fast when it is unhealthy"""
+    guard = get_endpoint_guard(function_name, current_app.config)
+    note_function_call(function_name)
+    result = guard.call(lambda: _post_to_function(function_name, url, log_url, payload, read_timeout, relay),
+                        timeout=read_timeout)
+    if isinstance(result, dict) and (result.get('circuit_open') or result.get('shed')):
+        current_app.logger.warning(f"Rejected {function_name} call without contacting the Function App: {result['error']}")
+    return result
+
+def _post_to_function(function_name, url, log_url, payload, read_timeout, relay=False):
+    """POST a payload to the Function App and normalise the response into a dict (or a JsonRelay)"""
     connect_timeout = 10  # seconds to establish connection
     # Use custom read_timeout (default 3 seconds for long-running tasks, higher for quick operations)
 
     try:
-        resp = requests.post(url, json=payload, timeout=(connect_timeout, read_timeout))
-        resp.raise_for_status()
-          # Handle 204 No Content responses as success
+        body = streamed_json_body(payload)
+        client = None if relay or body is not None else _async_client_for(function_name)
+        if client is not None:
+            # Plain JSON calls share the worker's FunctionAppClient (pooling, rate limit, connect retries)
+            resp = client.post(function_name, payload, read_timeout)
+        elif body is not None:
+            # Staged file uploads are base64-encoded into the request as it is sent
+            resp = get_function_session(current_app.config).post(
+                url, data=body, headers={'Content-Type': 'application/json'}, timeout=(connect_timeout, read_timeout))
+        else:
+            resp = get_function_session(current_app.config).post(
+                url, json=payload, timeout=(connect_timeout, read_timeout), stream=relay)
+
+        if resp.status_code >= 400:
+            details = _error_body(resp, relay)
+            reason = getattr(resp, 'reason', None) or getattr(resp, 'reason_phrase', None) or ''
+            current_app.logger.error(f"Azure Function {function_name} returned HTTP {resp.status_code}: {details}")
+            return {'error': f"HTTP error: {resp.status_code} {reason}".rstrip(), 'details': details,
+                    'status_code': resp.status_code}
+
+        # Handle 204 No Content responses as success
         if resp.status_code == 204:
             current_app.logger.info(f"Azure Function {function_name} returned 204 No Content - operation successful")
+            if relay:
+                resp.close()
             return {
                 'status': 'success',
                 'message': f'{function_name} operation completed successfully',
                 'status_code': 204
             }
         
+        if relay:
+            return _open_relay(function_name, resp)
+
         # Handle 200 OK with empty content as success (common for write operations)
         if resp.status_code == 200 and not resp.text.strip():
             current_app.logger.info(f"Azure Function {function_name} returned 200 OK with empty content - operation successful")
@@ -74,9 +241,9 @@ def call_azure_function(function_name, payload, read_timeout=3):
         
         try:
             response_json = resp.json()
-            current_app.logger.debug(f"Response from {function_name} (status {resp.status_code}): {response_json}")
+            current_app.logger.debug("Response from %s (status %s): %s", function_name, resp.status_code, clip(response_json))
             return response_json
-        except requests.exceptions.JSONDecodeError:
+        except ValueError:
             # Log detailed error information for debugging
             current_app.logger.error(f"Failed to decode JSON response from {function_name}. Status: {resp.status_code}. Response text (first 1000 chars): {resp.text[:1000]}")
               # Check what type of response we got
@@ -91,29 +258,112 @@ def call_azure_function(function_name, payload, read_timeout=3):
             else:
                 return {'error': 'Invalid JSON response from Azure Function.', 'status_code': resp.status_code, 'response_text': resp.text[:500]}
 
-    except requests.exceptions.ReadTimeout:
+    except (requests.exceptions.ReadTimeout, httpx.ReadTimeout):
         current_app.logger.info(f"Read timeout occurred for {function_name} as expected for long-running task. Assuming task initiated.")
         return {'status': 'initiated', 'message': f'Request for {function_name} sent, Azure Function is processing.'}
-    except requests.exceptions.Timeout as e: # Catches ConnectTimeout or other generic Timeouts
+    except (requests.exceptions.Timeout, httpx.TimeoutException, TimeoutError) as e: # ConnectTimeout, other Timeouts, or the shared client's wait
         current_app.logger.error(f"Timeout (not ReadTimeout) occurred while calling {function_name} at {log_url}: {e}")
         return {'error': 'Request to Azure Function timed out (e.g., connection timeout).'}
-    except requests.exceptions.HTTPError as http_err:
-        error_text = http_err.response.text[:500] if http_err.response else 'No response body'
-        status_code = http_err.response.status_code if http_err.response else 'Unknown'
-        
-        if http_err.response:
-            current_app.logger.error(f"HTTP error - Response headers: {dict(http_err.response.headers)}")
-            current_app.logger.error(f"HTTP error - Response status code: {http_err.response.status_code}")
-            current_app.logger.error(f"HTTP error - Response text length: {len(http_err.response.text) if http_err.response.text else 0}")
-        
-        return {'error': f"HTTP error: {status_code}", 'details': error_text}
-    except requests.exceptions.RequestException as req_err: 
+    except (requests.exceptions.RequestException, httpx.HTTPError) as req_err: 
         current_app.logger.error(f"Request exception occurred while calling {function_name}: {req_err}")
         return {'error': f"Request failed: {str(req_err)}"}
     except Exception as e: 
         current_app.logger.error(f"An unexpected error occurred in call_azure_function for {function_name}: {e}", exc_info=True)
         return {'error': f"An unexpected error occurred: {str(e)}"}
 
+def _error_body(resp, relay, limit=500):
+    """The start of an error response's body for error dicts; streamed responses are read no further and closed"""
+    try:
+        if relay:
+            text = next(resp.iter_content(chunk_size=limit * 4), b'').decode('utf-8', errors='replace')
+        else:
+            text = resp.text
+    except Exception:
+        text = ''
+    finally:
+        if relay:
+            resp.close()
+    text = ' '.join(text.split())
+    if not text:
+        return 'No response body'
+    return text if len(text) <= limit else text[:limit] + '...'
+
+def _async_client_for(function_name):
+    """The worker's shared FunctionAppClient when it should carry this call, else None"""
+    if current_app.config.get('FUNCTION_CLIENT', 'async') != 'async':
+        return None
+    try:
+        client = get_async_client(current_app.config)
+    except AsyncClientUnavailable:
+        return None  # initialization failed recently and was logged then
+    except Exception as e:
+        current_app.logger.warning(f"Shared Function App client unavailable, falling back to requests: {e}")
+        return None
+    return client if client.serves(function_name) else None
+
+def _open_relay(function_name, resp):
+    """Read ahead into a streamed response; small bodies are parsed in full and the connection released"""
+    config = current_app.config
+    try:
+        opened = open_json_relay(
+            resp.iter_content(chunk_size=config.get('STREAMING_RELAY_CHUNK_BYTES', 64 * 1024)),
+            buffer_bytes=config.get('STREAMING_RELAY_BUFFER_BYTES', 1024 * 1024),
+            max_item_bytes=config.get('STREAMING_RELAY_MAX_ITEM_BYTES', 8 * 1024 * 1024)
+        )
+    except JsonRelayError as e:
+        resp.close()
+        current_app.logger.error(f"Failed to decode JSON response from {function_name}. Status: {resp.status_code}. {e}")
+        return {'error': 'Invalid JSON response from Azure Function.', 'status_code': resp.status_code, 'details': str(e)}
+
+    if isinstance(opened, JsonRelay):
+        current_app.logger.info(f"Streaming large {function_name} response through the JSON relay")
+        opened.on_close = resp.close
+        return opened
+
+    resp.close()
+    if opened is None:
+        current_app.logger.info(f"Azure Function {function_name} returned 200 OK with empty content - operation successful")
+        return {
+            'status': 'success',
+            'message': f'{function_name} operation completed successfully',
+            'status_code': resp.status_code
+        }
+    return opened.value
+
+def start_function_warmer(app):
+    """Start this worker's Function App warmer; its first run prefetches tenants and device groups"""
+    return start_warmer(app.config, prefetch=lambda: _prefetch_startup_data(app))
+
+def _prefetch_startup_data(app):
+    """Load the tenant list and every enabled tenant's device groups into the response cache"""
+    read_timeout = app.config.get('FUNCTION_WARM_PROBE_TIMEOUT', 120)
+    if not app.config.get('FUNCTION_WARM_PREFETCH', True):
+        return {'skipped': 'FUNCTION_WARM_PREFETCH is disabled'}
+
+    with app.app_context():
+        saved = call_azure_function('MDEAutoDB', {'Function': 'GetTenantIds'}, read_timeout=read_timeout)
+    if not isinstance(saved, dict) or 'error' in saved or not isinstance(saved.get('TenantIds'), list):
+        app.logger.warning(f"Startup prefetch could not load tenants: {saved}")
+        return {'error': 'Could not load saved tenants from MDEAutoDB'}
+    tenant_ids = [str(tenant['TenantId']).strip() for tenant in select_tenants(saved['TenantIds'], 'all')]
+
+    def load_device_groups(tenant_id):
+        with app.app_context():
+            result = call_azure_function('MDETIManager', {'Function': 'GetDeviceGroups', 'TenantId': tenant_id},
+                                         read_timeout=read_timeout)
+        return isinstance(result, dict) and 'error' not in result and result.get('status') != 'initiated'
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(4, len(tenant_ids))),
+                                               thread_name_prefix='mde-prefetch') as executor:
+        loaded = sum(executor.map(load_device_groups, tenant_ids))
+    app.logger.info(f"Startup prefetch cached {len(tenant_ids)} tenant(s), device groups for {loaded}")
+    return {'tenants': len(tenant_ids), 'device_groups_loaded': loaded}
+
+@main_bp.before_app_request
+def _ensure_function_warmer():
+    # gunicorn workers fork after create_app, so each starts its own warmer on its first request
+    start_function_warmer(current_app._get_current_object())
+
 @main_bp.route('/', methods=['GET', 'POST'])
 def index():
     result = None
@@ -128,81 +378,133 @@ def index():
         FUNCTION_KEY=current_app.config.get('FUNCTION_KEY')
     )
 
-@main_bp.route('/api/get_machines')
+@main_bp.route('/api/get_machines', methods=['GET', 'POST'])
 def get_machines():
-    # For demo: load sample data from file instead of Azure Function
-    import json
-    with open('untitled:Untitled-1', 'r', encoding='utf-8') as f:
-        machines = json.load(f)
-    if not machines:
-        return jsonify({'columns': [], 'machines': []})
-    # Use the keys of the first machine as columns, but flatten nested fields for table display
-    def flatten_machine(machine):
-        flat = machine.copy()
-        # Flatten VmMetadata
-        if 'VmMetadata' in flat and isinstance(flat['VmMetadata'], dict):
-            for k, v in flat['VmMetadata'].items():
-                flat[f'VmMetadata.{k}'] = v
-            del flat['VmMetadata']
-        # Flatten first IP address for display        if 'IpAddresses' in flat and isinstance(flat['IpAddresses'], list) and flat['IpAddresses']:
-            for k, v in flat['IpAddresses'][0].items():
-                flat[f'IpAddresses.0.{k}'] = v
-            del flat['IpAddresses']
-        return flat
-    
-    flat_machines = [flatten_machine(m) for m in machines]
-    # Ensure MachineTags is the 6th column
-    columns = list(flat_machines[0].keys())
-    if 'MachineTags' in columns:
-        columns.insert(5, columns.pop(columns.index('MachineTags')))
-    data = [[m.get(col, '') for col in columns] for m in flat_machines]
-    return jsonify({'columns': columns, 'machines': data})
+    """Projected, filtered and paged view of a tenant's machine inventory"""
+    params = dict(request.get_json(silent=True) or {})
+    params.update(request.args.to_dict())
+    tenant_id = params.get('TenantId') or params.get('tenantId')
+    if not tenant_id:
+        return jsonify({'error': 'TenantId is required'}), 400
+
+    columns = params.get('columns')
+    if isinstance(columns, str):
+        columns = [name.strip() for name in columns.split(',') if name.strip()]
+    facets = params.get('facets')
+    if isinstance(facets, str):
+        facets = [name.strip() for name in facets.split(',') if name.strip()]
+    try:
+        filters = _filter_param(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if params.get('search'):
+        filters = dict(filters, search=params['search'])
+
+    refresh = str(params.get('refresh', '')).lower() == 'true' or _cache_bypass_requested()
+    try:
+        inventory = get_inventory_store(current_app.config).get(
+            tenant_id, lambda: _iter_machines(tenant_id), refresh=refresh
+        )
+        result = inventory.query(
+            columns=columns,
+            filters=filters,
+            sort=params.get('sort'),
+            order=(params.get('order') or 'asc').lower(),
+            offset=params.get('offset') or 0,
+            limit=params.get('limit') or 100,
+            facets=facets
+        )
+    except (InventoryLoadError, JsonRelayError) as e:
+        current_app.logger.error(f"Error loading machine inventory: {e}")
+        return jsonify({'error': str(e)}), 500
+    except (InventoryQueryError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    result['inventory'] = {'size': len(inventory), 'loaded_at': inventory.loaded_at}
+    return jsonify(result)
+
+def _iter_machines(tenant_id):
+    """Yield a tenant's machines one at a time, straight from the relay when the response is large"""
+    current_app.logger.info(f"Loading machine inventory for tenant: {tenant_id}")
+    response = call_azure_function('MDEAutomator', {
+        'TenantId': tenant_id,
+        'Function': 'GetMachines'
+    }, read_timeout=60, stream=True)
+
+    if isinstance(response, JsonRelay):
+        try:
+            yield from response.items()
+        finally:
+            response.close()
+        return
+
+    if isinstance(response, dict) and 'error' in response:
+        raise InventoryLoadError(response['error'])
+    if isinstance(response, dict) and response.get('status') == 'initiated':
+        raise InventoryLoadError('The Azure Function is still loading machines. Please try again in a moment.')
+    if isinstance(response, dict):
+        response = response.get('machines') or response.get('value') or response.get('Result') or []
+    yield from response
 
 @main_bp.route('/api/send_command', methods=['POST'])
 def send_command():
     # Special handling for InvokeUploadLR (file upload)
     if request.content_type and request.content_type.startswith('multipart/form-data'):
-        # Only for file upload
-        function_name_for_url = request.form.get('function_name')
-        specific_action = request.form.get('Function') or request.form.get('command')
-        tenant_id = request.form.get('TenantId')
-        file = request.files.get('file')
-        target_filename = request.form.get('TargetFileName') or (file.filename if file else None)
-        if not function_name_for_url or not specific_action or not tenant_id or not file or not target_filename:
+        # Only for file upload: the file is staged in a capped spool, never read into memory
+        try:
+            form, upload = stage_upload(request.environ, current_app.config)
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'error': f'Invalid multipart upload: {e}'}), 400
+        function_name_for_url = form.get('function_name')
+        specific_action = form.get('Function') or form.get('command')
+        tenant_id = form.get('TenantId')
+        target_filename = form.get('TargetFileName') or (upload.filename if upload else None)
+        if not function_name_for_url or not specific_action or not tenant_id or not upload or not target_filename:
+            if upload:
+                upload.close()
             return jsonify({'error': 'Missing required fields for file upload.'}), 400
         
-        file_content = file.read()  # bytes
-        # Build payload for PowerShell backend (fileContent as base64 encoded string, TargetFileName as string)
+        current_app.logger.info(f"Staged '{target_filename}' ({upload.size} bytes) for {specific_action}")
+        # Build payload for PowerShell backend (fileContent is sent as a base64 string, TargetFileName as string)
         azure_function_payload = {
             'Function': specific_action,
             'TenantId': tenant_id,
-            'fileContent': base64.b64encode(file_content).decode('utf-8'),  # Convert bytes to base64 string for JSON serialization
+            'fileContent': upload,
             'TargetFileName': target_filename
         }
-        result = call_azure_function(function_name_for_url, azure_function_payload)
-        if result is None:
-            return jsonify({'message': 'Error calling Azure Function: Configuration error or no response received.'}), 500
-        if result.get('status') == 'initiated':
-            return jsonify({'message': f"Command '{specific_action}' sent.{result.get('message', '')}"}), 202
-        if 'error' in result:
-            az_func_error = result.get('details', result['error'])
-            return jsonify({'message': f"Error from Azure Function: {az_func_error}"}), result.get('status_code', 500)
-        if isinstance(result, dict) and result.get('status') == 'failed':
-            failure_reason = result.get('reason', 'Unknown reason from function execution')
-            return jsonify({'message': f"Command execution reported as failed: {failure_reason}", 'result': result}), 400
-        return jsonify({'message': 'File uploaded successfully!', 'result': result})
+        return submit_function_job(function_name_for_url, azure_function_payload, specific_action, tenant_id,
+                                   cleanup=upload.close)
     # Handle JSON payload
     data = request.get_json()
     if not data:
         current_app.logger.error("Received empty or non-JSON payload in /api/send_command")
         return jsonify({'error': 'Request must be JSON and not empty.'}), 400
 
-    current_app.logger.debug(f"Received data in /api/send_command: {data}")
+    current_app.logger.debug("Received data in /api/send_command: %s", clip(data))
+
+    try:
+        function_name_for_url, specific_action, azure_function_payload = _command_payload(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    current_app.logger.info(f"Calling Azure Function '{function_name_for_url}' with action '{specific_action}'.")
+    current_app.logger.debug("Payload for Azure Function '%s': %s", function_name_for_url, clip(azure_function_payload))
+    return submit_function_job(function_name_for_url, azure_function_payload, specific_action,
+                               azure_function_payload['TenantId'])
+
+def _command_payload(data):
+    """
+    Validate a /api/send_command JSON body and build its Function App payload.
 
+    Returns (function_name, action, payload); raises ValueError with the
+    message for the 400 response.
+    """
     function_name_for_url = data.get('function_name')
     if not function_name_for_url:
         current_app.logger.error("Missing 'function_name' in request to /api/send_command")
-        return jsonify({'error': "Missing 'function_name' in request."}), 400
+        raise ValueError("Missing 'function_name' in request.")
 
     specific_action = data.get('command')
     if not specific_action:
@@ -210,7 +512,7 @@ def send_command():
     
     if not specific_action:
         current_app.logger.error("Missing 'command' or 'Function' in request to /api/send_command to specify the action.")
-        return jsonify({'error': "Missing 'command' or 'Function' in request to specify the action."}), 400
+        raise ValueError("Missing 'command' or 'Function' in request to specify the action.")
 
     azure_function_payload = data.copy()
 
@@ -226,7 +528,7 @@ def send_command():
     tenant_id_from_payload = azure_function_payload.get('TenantId')
     if not tenant_id_from_payload: # Checks for None or empty string
         current_app.logger.error(f"Missing or empty 'TenantId' for action '{specific_action}'. Payload: {azure_function_payload}")
-        return jsonify({'error': f"TenantId is required and cannot be empty for action: {specific_action}."}), 400
+        raise ValueError(f"TenantId is required and cannot be empty for action: {specific_action}.")
 
     # Handle device group targeting for master tenants
     device_group = azure_function_payload.get('DeviceGroup')
@@ -244,35 +546,207 @@ def send_command():
             # Allow requests for specific exempted actions that don't need DeviceIds
             if specific_action not in ["InvokeUploadLR"]:
                 current_app.logger.error(f"Missing or invalid 'DeviceIds' for action '{specific_action}'. Payload: {azure_function_payload}")
-                return jsonify({'error': 'DeviceIds are required and must be a non-empty list for this action.'}), 400
+                raise ValueError('DeviceIds are required and must be a non-empty list for this action.')
     else:
         current_app.logger.info(f"Proceeding with 'allDevices=true' for action '{specific_action}' - DeviceIds validation bypassed.")
-    
-    current_app.logger.info(f"Calling Azure Function '{function_name_for_url}' with action '{specific_action}'.")
-    current_app.logger.debug(f"Payload for Azure Function '{function_name_for_url}': {azure_function_payload}")
-    result = call_azure_function(function_name_for_url, azure_function_payload)
-    
-    if result is None: 
-        current_app.logger.error(f"call_azure_function returned None for '{function_name_for_url}', action '{specific_action}'.")
-        return jsonify({'message': "Error calling Azure Function: Configuration error or no response received."}), 500
-
-    if result.get('status') == 'initiated':
-        current_app.logger.info(f"Azure Function '{function_name_for_url}' (action '{specific_action}') initiated. Client informed.")
-        # Return 202 Accepted
-        return jsonify({'message': f"Command '{specific_action}' sent. {result.get('message', '')}"}), 202
-
-    if 'error' in result:
-        az_func_error = result.get('details', result['error']) 
-        current_app.logger.error(f"Azure Function '{function_name_for_url}' (action '{specific_action}') returned an error: {az_func_error}. Original client payload: {data}, Sent Azure Function payload: {azure_function_payload}")
-        return jsonify({'message': f"Error from Azure Function: {az_func_error}"}), result.get('status_code', 500)
-    
-    if isinstance(result, dict) and result.get('status') == 'failed':
-        failure_reason = result.get('reason', 'Unknown reason from function execution')
-        current_app.logger.warning(f"Azure Function '{function_name_for_url}' (action '{specific_action}') reported command failure: {failure_reason}. Full result: {result}")
-        return jsonify({'message': f"Command execution reported as failed: {failure_reason}", 'result': result}), 400 
 
-    current_app.logger.info(f"Command '{specific_action}' for Azure Function '{function_name_for_url}' processed. Result: {result}")
-    return jsonify({'message': 'Command sent successfully!', 'result': result})
+    return function_name_for_url, specific_action, azure_function_payload
+
+def submit_function_job(function_name, payload, action, tenant_id, cleanup=None):
+    """Run a long Function App call on the job registry and answer 202 with its job id.
+
+    cleanup, when given, runs once the call has finished (or was never queued).
+    """
+    app = current_app._get_current_object()
+    read_timeout = app.config.get('JOB_READ_TIMEOUT', 300)
+    batch_size = app.config.get('DEVICE_BATCH_SIZE', 1000)
+    batched = needs_batching(function_name, payload, batch_size)
+
+    def call(batch_payload):
+        with app.app_context():
+            return call_azure_function(function_name, batch_payload, read_timeout=read_timeout)
+
+    def run_job():
+        try:
+            if batched:
+                # Large DeviceIds lists go out as concurrent batches; the job reports batch progress
+                return dispatch_device_batches(call, payload, batch_size=batch_size,
+                                               concurrency=app.config.get('DEVICE_BATCH_CONCURRENCY', 4),
+                                               progress=current_job().report_progress)
+            return call(payload)
+        finally:
+            if cleanup:
+                cleanup()
+
+    try:
+        job = get_job_registry(app.config).submit(
+            f"{function_name}/{action}",
+            run_job,
+            metadata={'function_name': function_name, 'action': action, 'tenant_id': tenant_id}
+        )
+    except JobQueueFull as e:
+        if cleanup:
+            cleanup()
+        current_app.logger.warning(f"Rejected '{action}' for Azure Function '{function_name}': {e}")
+        return jsonify({'message': f"Server is busy, command '{action}' was not sent. Please retry shortly.", 'error': str(e)}), 503
+
+    if batched:
+        current_app.logger.info(f"Azure Function '{function_name}' (action '{action}') queued as job {job.id} "
+                                f"for {len(payload['DeviceIds'])} devices in batches of {batch_size}.")
+    else:
+        current_app.logger.info(f"Azure Function '{function_name}' (action '{action}') queued as job {job.id}.")
+    return jsonify({
+        'message': f"Command '{action}' sent. Tracking as job {job.id}.",
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('main.get_job', job_id=job.id),
+        'events_url': url_for('main.stream_job_events', job_id=job.id)
+    }), 202
+
+def _job_not_found(job_id):
+    # Jobs live in the memory of the worker process that ran them (see gunicorn.conf.py)
+    return {
+        'error': 'Job not found or expired.',
+        'details': 'Jobs are kept by the worker that ran them for JOB_RESULT_TTL seconds; '
+                   'with WEB_CONCURRENCY > 1 the request may have reached another worker.',
+        'job_id': job_id,
+    }
+
+@main_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a background job; includes the final payload once it has finished"""
+    job = get_job_registry(current_app.config).get(job_id)
+    if job is None:
+        return jsonify(_job_not_found(job_id)), 404
+    return jsonify(job.to_dict())
+
+@main_bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-sent events for a background job: status now, progress as it runs, result when it finishes"""
+    job = get_job_registry(current_app.config).get(job_id)
+    if job is None:
+        return jsonify(_job_not_found(job_id)), 404
+
+    heartbeat = current_app.config.get('JOB_SSE_HEARTBEAT', 15)
+
+    def events():
+        yield f"event: status\ndata: {json.dumps(job.to_dict(include_result=False))}\n\n"
+        version = 0
+        while not job.done:
+            latest = job.wait_for_update(version, heartbeat)
+            if latest != version:
+                version = latest
+                yield f"event: progress\ndata: {json.dumps(job.progress)}\n\n"
+            elif not job.done:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+        yield f"event: result\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Payload shapes a fan-out can run, keyed by the endpoint that normally takes them
+FANOUT_TARGETS = ('send_command', 'ti/indicators')
+
+@main_bp.route('/api/fanout', methods=['POST'])
+def fanout():
+    """
+    Run one /api/send_command or /api/ti/indicators payload across many tenants.
+
+    Body: {"target": "send_command" | "ti/indicators", "tenants": "all" | [tenant ids],
+           "exclude_tenants": [...], "include_disabled": false, "concurrency": n,
+           "payload": {... the endpoint's usual body, TenantId is filled in per tenant}}
+
+    Streams server-sent events: "start" with the selected tenants, one
+    "tenant" event per tenant as its call finishes, then "done" with counts.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('payload'), dict):
+        return jsonify({'error': "Request must be JSON with a 'payload' object."}), 400
+
+    target = data.get('target', 'send_command')
+    if target not in FANOUT_TARGETS:
+        return jsonify({'error': f"target must be one of: {', '.join(FANOUT_TARGETS)}"}), 400
+
+    try:
+        max_concurrency = current_app.config.get('FANOUT_CONCURRENCY', 8)
+        concurrency = min(int(data.get('concurrency') or max_concurrency), max_concurrency)
+        if concurrency < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be a positive integer.'}), 400
+
+    saved = call_azure_function('MDEAutoDB', {'Function': 'GetTenantIds'}, read_timeout=60)
+    if not isinstance(saved, dict) or 'error' in saved or saved.get('Status') == 'Error' or saved.get('status') == 'initiated':
+        current_app.logger.error(f"Fan-out could not load tenants: {saved}")
+        return jsonify({'error': 'Could not load saved tenants from MDEAutoDB.', 'details': saved}), 502
+
+    try:
+        tenants = select_tenants(saved.get('TenantIds') or [], data.get('tenants'),
+                                 exclude=data.get('exclude_tenants'),
+                                 include_disabled=bool(data.get('include_disabled')))
+    except TenantSelectionError as e:
+        return jsonify({'error': str(e)}), 400
+    if not tenants:
+        return jsonify({'error': 'No tenants selected.'}), 400
+
+    template = dict(data['payload'])
+    if target == 'send_command':
+        # Validate once, as /api/send_command would for the first tenant
+        template['TenantId'] = tenants[0]['TenantId']
+        try:
+            function_name, action, template = _command_payload(template)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        function_name, action = 'MDETIManager', template.get('Function', 'GetIndicators')
+        template['Function'] = action
+
+    app = current_app._get_current_object()
+    read_timeout = app.config.get('FANOUT_READ_TIMEOUT', 120)
+
+    def run_tenant(tenant):
+        with app.app_context():
+            return call_azure_function(function_name, dict(template, TenantId=tenant['TenantId']),
+                                       read_timeout=read_timeout)
+
+    run = get_fanout_executor(app.config).run(tenants, run_tenant, concurrency=concurrency,
+                                              deadline=app.config.get('FANOUT_DEADLINE', 600))
+    current_app.logger.info(f"Fan-out {run.id}: '{action}' on '{function_name}' across {len(tenants)} tenants "
+                            f"({run.concurrency} at a time).")
+    heartbeat = app.config.get('JOB_SSE_HEARTBEAT', 15)
+
+    def events():
+        try:
+            start = {
+                'fanout_id': run.id,
+                'function_name': function_name,
+                'action': action,
+                'concurrency': run.concurrency,
+                'tenants': [{'tenant_id': t['TenantId'], 'client_name': t.get('ClientName')} for t in tenants],
+            }
+            yield f"event: start\ndata: {json.dumps(start)}\n\n"
+            for entry in run.events(heartbeat):
+                if entry is None:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: tenant\ndata: {json.dumps(entry, default=str)}\n\n"
+            summary = run.summary()
+            app.logger.info(f"Fan-out {run.id} finished: {summary['counts']} in {summary['duration']}s")
+            yield f"event: done\ndata: {json.dumps(summary)}\n\n"
+        finally:
+            # Client went away: do not start the tenants still waiting
+            run.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @main_bp.route('/timanager', methods=['GET'])
 def timanager():
@@ -317,7 +791,10 @@ def manage_actions():
     current_app.logger.info(f"Processing action management request: {function_name} for tenant {tenant_id}")
       # Use longer timeout for GetActions as it can take time to process
     timeout = 60 if function_name == 'GetActions' else 30
-    result = call_azure_function('MDEAutomator', azure_function_payload, read_timeout=timeout)
+    result = call_azure_function('MDEAutomator', azure_function_payload, read_timeout=timeout, stream=True)
+
+    if isinstance(result, JsonRelay) and not _table_requested():
+        return _relay_response(result, {'message': f'{function_name} completed successfully!'}, 'result')
     
     if isinstance(result, dict) and 'error' in result:
         current_app.logger.error(f"Action management failed: {result}")
@@ -333,6 +810,14 @@ def manage_actions():
             'note': 'The Azure Function is taking longer than expected. Please try again in a moment.'
         }), 202  # 202 Accepted - request accepted but processing not complete
     
+    if _table_requested():
+        try:
+            table = _flatten_result(result)
+        except JsonRelayError as e:
+            current_app.logger.error(f"Action management failed: {e}")
+            return jsonify({'error': str(e)}), 500
+        return jsonify({'message': f'{function_name} completed successfully!', **table})
+    
     return jsonify({'message': f'{function_name} completed successfully!', 'result': result})
 
 # Tenant Management API Endpoints
@@ -368,7 +853,7 @@ def get_tenants():
         }, read_timeout=60)  # Increased timeout for tenant operations to handle cold starts
         
         current_app.logger.info(f"Azure Function response type: {type(response)}")
-        current_app.logger.info(f"Azure Function response: {response}")
+        current_app.logger.debug("Azure Function response: %s", clip(response))
           # Handle timeout/initiated status
         if response.get('status') == 'initiated':
             current_app.logger.warning("Azure Function timed out but may still be processing")
@@ -379,7 +864,7 @@ def get_tenants():
             
             # Provide specific error messages for common issues
             error_msg = response['error']
-            if 'HTTP error: 403' in error_msg or 'HTTP error: Unknown' in error_msg:
+            if error_msg.startswith('HTTP error:'):
                 return jsonify({
                     'error': 'Azure Function access denied. This could be due to IP restrictions, incorrect function key, or the function app being stopped.',
                     'details': error_msg,
@@ -486,7 +971,7 @@ def save_tenant():
         
         # Handle Azure Function returning "Status": "Error" (e.g., table not found)
         if isinstance(response, dict) and response.get('Status') == 'Error':
-            current_app.logger.warning(f"Azure Function returned error status for save tenant: {response}")
+            current_app.logger.warning("Azure Function returned error status for save tenant: %s", clip(response))
             
             # Check if it's a "table not found" error which is expected initially
             error_msg = response.get('Result', '').lower()
@@ -550,7 +1035,7 @@ def delete_tenant(tenant_id):
         
         # Handle Azure Function returning "Status": "Error" (e.g., table not found)
         if isinstance(response, dict) and response.get('Status') == 'Error':
-            current_app.logger.warning(f"Azure Function returned error status for delete tenant: {response}")
+            current_app.logger.warning("Azure Function returned error status for delete tenant: %s", clip(response))
             
             # Check if it's a "table not found" error
             error_msg = response.get('Result', '').lower()
@@ -718,6 +1203,7 @@ def huntmanager():
 # Incident Management endpoints for IncidentManager
 
 @main_bp.route('/api/incidents', methods=['POST'])
+@conditional_json
 def get_incidents():
     """Get incidents from Microsoft Defender"""
     try:
@@ -729,33 +1215,32 @@ def get_incidents():
         if not tenant_id:
             return jsonify({'error': 'tenantId is required'}), 400
             
+        # Paged requests are answered from the tenant's server-side snapshot
+        params = dict(data)
+        params.update(request.args.to_dict())  # Grid.js appends paging/sort/search to the URL
+        if any(key in params for key in INCIDENT_QUERY_KEYS):
+            return _query_incidents(tenant_id, params)
+
         current_app.logger.info(f"Getting incidents for tenant: {tenant_id}")        # Call Azure Function for getting incidents
         response = call_azure_function('MDEIncidentManager', {
             'TenantId': tenant_id,
             'Function': 'GetIncidents'
-        }, read_timeout=60)  # Extended timeout for loading large incident datasets
+        }, read_timeout=60, stream=True)  # Extended timeout for loading large incident datasets
+
+        # Large incident lists are streamed, unwrapping the envelope on the fly
+        if isinstance(response, JsonRelay):
+            envelope = response.envelope or {}
+            if envelope.get('Status') == 'Error':
+                response.close()
+                error_msg = envelope.get('Message', 'Unknown error from Azure Function')
+                current_app.logger.error(f"Error getting incidents: {error_msg}")
+                return jsonify({'error': error_msg}), 500
+            return _relay_response(response, {'success': True}, 'incidents', unwrap=True)
         
-        # Handle errors from new MDEIncidentManager function format
-        if 'error' in response:
-            current_app.logger.error(f"Error getting incidents: {response['error']}")
-            return jsonify({'error': response['error']}), 500
-        elif isinstance(response, dict) and response.get('Status') == 'Error':
-            error_msg = response.get('Message', 'Unknown error from Azure Function')
+        incidents, error_msg = _unwrap_incidents(response)
+        if error_msg:
             current_app.logger.error(f"Error getting incidents: {error_msg}")
             return jsonify({'error': error_msg}), 500
-              # Handle response format from new MDEIncidentManager function
-        if isinstance(response, list):
-            incidents = response
-        elif isinstance(response, dict):
-            # New format: {"Status": "Success", "Result": [...]}
-            if response.get('Status') == 'Success' and 'Result' in response:
-                incidents = response.get('Result', [])
-            else:
-                # Fallback to old format
-                incidents = response.get('incidents', response.get('Incidents', []))
-        else:
-            current_app.logger.error(f"Unexpected response format: {type(response)}")
-            return jsonify({'error': 'Unexpected response format from Azure Function'}), 500
             
         return jsonify({
             'success': True,
@@ -766,6 +1251,95 @@ def get_incidents():
         current_app.logger.error(f"Exception in get_incidents: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+INCIDENT_QUERY_KEYS = ('offset', 'limit', 'cursor', 'filter', 'sort', 'order', 'search')
+
+def _unwrap_incidents(response):
+    """Extract the incident list from a GetIncidents response; returns (incidents, error message)"""
+    # Handle errors from new MDEIncidentManager function format
+    if 'error' in response:
+        return None, response['error']
+    if isinstance(response, dict) and response.get('Status') == 'Error':
+        return None, response.get('Message', 'Unknown error from Azure Function')
+    # Handle response format from new MDEIncidentManager function
+    if isinstance(response, list):
+        return response, None
+    if isinstance(response, dict):
+        # New format: {"Status": "Success", "Result": [...]}
+        if response.get('Status') == 'Success' and 'Result' in response:
+            return response.get('Result', []), None
+        # Fallback to old format
+        return response.get('incidents', response.get('Incidents', [])), None
+    current_app.logger.error(f"Unexpected response format: {type(response)}")
+    return None, 'Unexpected response format from Azure Function'
+
+def _load_incidents(tenant_id):
+    """Fetch every incident for a tenant to build a snapshot"""
+    current_app.logger.info(f"Loading incident snapshot for tenant: {tenant_id}")
+    response = call_azure_function('MDEIncidentManager', {
+        'TenantId': tenant_id,
+        'Function': 'GetIncidents'
+    }, read_timeout=60, stream=True)
+
+    if isinstance(response, JsonRelay):
+        try:
+            if (response.envelope or {}).get('Status') == 'Error':
+                raise IncidentLoadError(response.envelope.get('Message', 'Unknown error from Azure Function'))
+            return list(response.items())
+        finally:
+            response.close()
+
+    if isinstance(response, dict) and response.get('status') == 'initiated':
+        raise IncidentLoadError('The Azure Function is still loading incidents. Please try again in a moment.')
+    incidents, error_msg = _unwrap_incidents(response)
+    if error_msg:
+        raise IncidentLoadError(error_msg)
+    return incidents
+
+def _filter_param(params):
+    """The 'filter' parameter as a dict; query strings carry it as JSON"""
+    filters = params.get('filter') or {}
+    if isinstance(filters, str):
+        try:
+            filters = json.loads(filters)
+        except ValueError:
+            filters = None
+    if not isinstance(filters, dict):
+        raise ValueError('filter must be a JSON object')
+    return dict(filters)
+
+def _query_incidents(tenant_id, params):
+    """Serve one filtered, sorted page of the tenant's incident snapshot"""
+    try:
+        filters = _filter_param(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    for key in INDEXED_FIELDS + ('search', 'updatedFrom', 'updatedTo'):
+        if params.get(key) not in (None, ''):
+            filters[key] = params[key]
+
+    refresh = str(params.get('refresh', '')).lower() == 'true' or _cache_bypass_requested()
+    try:
+        snapshot = get_incident_store(current_app.config).get(
+            tenant_id, lambda: _load_incidents(tenant_id), refresh=refresh
+        )
+        page = snapshot.query(
+            filters,
+            sort=params.get('sort') or 'lastUpdateDateTime',
+            order=(params.get('order') or 'desc').lower(),
+            offset=params.get('offset') or 0,
+            limit=params.get('limit') or 25,
+            cursor=params.get('cursor')
+        )
+    except IncidentLoadError as e:
+        current_app.logger.error(f"Error getting incidents: {e}")
+        return jsonify({'error': str(e)}), 500
+    except (IncidentQueryError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    page['success'] = True
+    page['snapshot'] = {'size': len(snapshot), 'loaded_at': snapshot.loaded_at}
+    return jsonify(page)
+
 @main_bp.route('/api/incidents/update', methods=['POST'])
 def update_incident():
     """Update multiple incidents"""
@@ -806,23 +1380,7 @@ def update_incident():
             update_params['DisplayName'] = data.get('displayName')
         if data.get('description'):
             update_params['Description'] = data.get('description')
-          # Call Azure Function for updating incidents
-        response = call_azure_function('MDEIncidentManager', update_params)
-        
-        # Handle errors from new MDEIncidentManager function format
-        if 'error' in response:
-            current_app.logger.error(f"Error updating incident: {response['error']}")
-            return jsonify({'error': response['error']}), 500
-        elif isinstance(response, dict) and response.get('Status') == 'Error':
-            error_msg = response.get('Message', 'Unknown error from Azure Function')
-            current_app.logger.error(f"Error updating incident: {error_msg}")
-            return jsonify({'error': error_msg}), 500
-            
-        return jsonify({
-            'success': True,
-            'message': f'Successfully updated {len(incident_ids)} incident(s)',
-            'result': response
-        })
+        return _bulk_incident_call(tenant_id, update_params, 'updated')
         
     except Exception as e:
         current_app.logger.error(f"Exception in update_incident: {str(e)}")
@@ -850,33 +1408,56 @@ def add_incident_comment():
             return jsonify({'error': 'comment is required'}), 400
             
         current_app.logger.info(f"Adding comment to {len(incident_ids)} incidents for tenant: {tenant_id}")
-          # Call Azure Function for adding comment to multiple incidents
-        response = call_azure_function('MDEIncidentManager', {
+        return _bulk_incident_call(tenant_id, {
             'TenantId': tenant_id,
             'Function': 'UpdateIncidentComment',
             'IncidentIds': incident_ids,
             'Comment': comment
-        })
-        
-        # Handle errors from new MDEIncidentManager function format
-        if 'error' in response:
-            current_app.logger.error(f"Error adding comment: {response['error']}")
-            return jsonify({'error': response['error']}), 500
-        elif isinstance(response, dict) and response.get('Status') == 'Error':
-            error_msg = response.get('Message', 'Unknown error from Azure Function')
-            current_app.logger.error(f"Error adding comment: {error_msg}")
-            return jsonify({'error': error_msg}), 500
-            
-        return jsonify({
-            'success': True,
-            'message': f'Comment added to {len(incident_ids)} incident(s) successfully',
-            'result': response
-        })
+        }, 'commented on')
         
     except Exception as e:
         current_app.logger.error(f"Exception in add_incident_comment: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _bulk_incident_call(tenant_id, payload, verb):
+    """Send an MDEIncidentManager write as concurrent IncidentIds shards and report per-incident results"""
+    config = current_app.config
+    app = current_app._get_current_object()
+    read_timeout = config.get('INCIDENT_BULK_READ_TIMEOUT', 60)
+
+    def call(shard_payload):
+        with app.app_context():
+            return call_azure_function('MDEIncidentManager', shard_payload, read_timeout=read_timeout)
+
+    started = time.time()
+    results, summary = run_incident_shards(
+        call, payload,
+        shard_size=config.get('INCIDENT_SHARD_SIZE', 25),
+        concurrency=config.get('INCIDENT_BULK_CONCURRENCY', 8),
+        retries=config.get('INCIDENT_SHARD_RETRIES', 2),
+        retry_backoff=config.get('INCIDENT_SHARD_RETRY_BACKOFF', 1.0)
+    )
+    current_app.logger.info(f"{payload['Function']} for tenant {tenant_id}: {summary} in {time.time() - started:.2f}s")
+
+    failed_ids = failed_incident_ids(results)
+    first_error = next((str(entry.get('Result')) for entry in results
+                        if isinstance(entry, dict) and entry.get('Status') != 'Success'), None)
+    get_alert_cache(config).invalidate(tenant_id, payload['IncidentIds'])
+    if summary['succeeded']:
+        get_incident_store(config).invalidate(tenant_id)
+    else:
+        current_app.logger.error(f"Error running {payload['Function']}: {first_error}")
+        return jsonify({'error': first_error or 'No incidents were changed', 'result': results,
+                        'summary': summary, 'failed_incident_ids': failed_ids}), 500
+
+    return jsonify({
+        'success': True,
+        'message': bulk_message(verb, summary, first_error),
+        'result': results,
+        'summary': summary,
+        'failed_incident_ids': failed_ids
+    })
+
 @main_bp.route('/api/incidents/alerts', methods=['POST'])
 def get_incident_alerts():
     """Get alerts for a specific incident"""
@@ -896,39 +1477,24 @@ def get_incident_alerts():
         
         current_app.logger.info(f"Getting alerts for incident {incident_id} in tenant: {tenant_id}")
         
-        # Call Azure Function for getting incident alerts with extended timeout
-        response = call_azure_function('MDEIncidentManager', {
-            'TenantId': tenant_id,
-            'Function': 'GetIncidentAlerts',
-            'IncidentIds': [incident_id]
-        }, read_timeout=30)  # Extended timeout for alerts processing
-        
-        current_app.logger.info(f"Azure Function response: {response}")
-        
-        # Handle errors from Azure Function
-        if 'error' in response:
-            current_app.logger.error(f"Error getting incident alerts: {response['error']}")
-            return jsonify({'error': response['error']}), 500
-        elif isinstance(response, dict) and response.get('Status') == 'Error':
-            error_msg = response.get('Message', 'Unknown error from Azure Function')
+        versions = {str(incident_id): data['lastUpdateDateTime']} if data.get('lastUpdateDateTime') else None
+        alerts_by_id, errors, summary = _load_incident_alerts(tenant_id, [incident_id], versions,
+                                                             refresh=bool(data.get('refresh')))
+        if errors:
+            error_msg = next(iter(errors.values()))
             current_app.logger.error(f"Error getting incident alerts: {error_msg}")
             return jsonify({'error': error_msg}), 500
-              # Handle response format from GetIncidentAlerts function
-        alerts = []
-        if isinstance(response, list):
-            alerts = response
-        elif isinstance(response, dict):
-            # Handle the specific response format from Azure Function
-            if response.get('Status') == 'Success' and 'Result' in response:
-                result = response.get('Result', {})
-                # Extract alerts from the Result object
-                alerts = result.get('Alerts', [])
-            else:
-                # Fallback to other possible formats
-                alerts = response.get('alerts', response.get('Alerts', response.get('value', [])))
+        alerts = alerts_by_id.get(str(incident_id), [])
         
-        current_app.logger.info(f"Extracted alerts count: {len(alerts) if isinstance(alerts, list) else 'Not a list'}")
-        current_app.logger.debug(f"Alerts data: {alerts}")
+        current_app.logger.info(f"Extracted alerts count: {len(alerts)} ({'cached' if summary['cached'] else 'fetched'})")
+        current_app.logger.debug("Alerts data: %s", clip(alerts))
+        
+        if _table_requested():
+            return jsonify({
+                'success': True,
+                'incidentId': incident_id,
+                **flatten_table(alerts if isinstance(alerts, list) else [])
+            })
         
         return jsonify({
             'success': True,
@@ -940,6 +1506,104 @@ def get_incident_alerts():
         current_app.logger.error(f"Exception in get_incident_alerts: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@main_bp.route('/api/incidents/alerts/batch', methods=['POST'])
+def get_incident_alerts_batch():
+    """Get alerts for many incidents at once, from the alert cache where it is still current"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Request must be JSON and not empty.'}), 400
+        
+        tenant_id = data.get('tenantId')
+        incident_ids = data.get('incidentIds')
+        versions = data.get('lastUpdated')
+        
+        if not tenant_id:
+            return jsonify({'error': 'tenantId is required'}), 400
+            
+        if not incident_ids or not isinstance(incident_ids, list) or len(incident_ids) == 0:
+            return jsonify({'error': 'incidentIds array is required and must not be empty'}), 400
+        
+        if versions is not None and not isinstance(versions, dict):
+            return jsonify({'error': 'lastUpdated must map incident ids to lastUpdateDateTime values'}), 400
+        
+        current_app.logger.info(f"Getting alerts for {len(incident_ids)} incidents in tenant: {tenant_id}")
+        alerts_by_id, errors, summary = _load_incident_alerts(
+            tenant_id, incident_ids, {str(k): v for k, v in versions.items()} if versions else None,
+            refresh=bool(data.get('refresh'))
+        )
+        
+        if errors and not alerts_by_id:
+            current_app.logger.error(f"Error getting incident alerts: {next(iter(errors.values()))}")
+            return jsonify({'error': next(iter(errors.values())), 'errors': errors, 'summary': summary}), 500
+        
+        return jsonify({
+            'success': True,
+            'alerts': alerts_by_id,
+            'errors': errors,
+            'summary': summary
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Exception in get_incident_alerts_batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def _load_incident_alerts(tenant_id, incident_ids, versions=None, refresh=False):
+    """
+    Alerts per incident id from the alert cache, fetching the misses as concurrent shards.
+
+    versions maps incident ids to their current lastUpdateDateTime; ids it
+    does not cover are looked up in the tenant's incident snapshot.
+    Returns ({id: alerts}, {id: error}, summary).
+    """
+    config = current_app.config
+    cache = get_alert_cache(config)
+    snapshot = get_incident_store(config).peek(tenant_id)
+    ids = list(dict.fromkeys(str(incident_id) for incident_id in incident_ids))
+    versions = dict(versions or {})
+    for incident_id in ids:
+        if incident_id not in versions and snapshot is not None:
+            versions[incident_id] = snapshot.last_update(incident_id)
+
+    alerts_by_id, errors = {}, {}
+    for incident_id in ids:
+        alerts = None if refresh else cache.get(tenant_id, incident_id, versions.get(incident_id))
+        if alerts is not None:
+            alerts_by_id[incident_id] = alerts
+    misses = [incident_id for incident_id in ids if incident_id not in alerts_by_id]
+    summary = {'incidents': len(ids), 'cached': len(ids) - len(misses), 'fetched': 0, 'failed': 0}
+    if not misses:
+        return alerts_by_id, errors, summary
+
+    app = current_app._get_current_object()
+    read_timeout = config.get('INCIDENT_BULK_READ_TIMEOUT', 60)
+
+    def call(shard_payload):
+        with app.app_context():
+            return call_azure_function('MDEIncidentManager', shard_payload, read_timeout=read_timeout)
+
+    results, shard_summary = run_incident_shards(
+        call, {'TenantId': tenant_id, 'Function': 'GetIncidentAlerts', 'IncidentIds': misses},
+        shard_size=config.get('INCIDENT_ALERT_SHARD_SIZE', 10),
+        concurrency=config.get('INCIDENT_BULK_CONCURRENCY', 8),
+        retries=config.get('INCIDENT_SHARD_RETRIES', 2),
+        retry_backoff=config.get('INCIDENT_SHARD_RETRY_BACKOFF', 1.0)
+    )
+    for entry in results:
+        if not isinstance(entry, dict):
+            continue
+        incident_id = str(entry.get('IncidentId'))
+        if entry.get('Status') == 'Success':
+            alerts_by_id[incident_id] = extract_alerts(entry.get('Result'))
+            cache.put(tenant_id, incident_id, versions.get(incident_id) or incident_version(entry.get('Result')),
+                      alerts_by_id[incident_id])
+        else:
+            errors[incident_id] = str(entry.get('Result') or 'Failed to retrieve alerts')
+    summary['fetched'] = len(misses) - len(errors)
+    summary['failed'] = len(errors)
+    summary['shards'] = shard_summary['shards']
+    return alerts_by_id, errors, summary
+
 @main_bp.route('/incidentmanager', methods=['GET'])
 def incidentmanager():
     return render_template(
@@ -973,12 +1637,12 @@ def fetch_device_groups(tenant_id):
             'TenantId': tenant_id.strip()
         }
         
-        current_app.logger.info(f"Calling MDETIManager function with payload: {azure_function_payload}")
+        current_app.logger.debug("Calling MDETIManager function with payload: %s", clip(azure_function_payload))
         
         # Call the Azure Function with longer timeout for device group retrieval
         result = call_azure_function('MDETIManager', azure_function_payload, read_timeout=30)
         
-        current_app.logger.info(f"Azure Function result type: {type(result)}, content: {result}")
+        current_app.logger.debug("Azure Function result type: %s, content: %s", type(result).__name__, clip(result))
         
         if result is None:
             current_app.logger.error(f"No response from Azure Function for tenant {tenant_id}")
@@ -1005,7 +1669,7 @@ def fetch_device_groups(tenant_id):
         try:
             device_groups = []
             
-            current_app.logger.debug(f"Processing result for tenant {tenant_id}: {result}")
+            current_app.logger.debug("Processing result for tenant %s: %s", tenant_id, clip(result))
             
             # Handle different response formats from Azure Function
             if isinstance(result, list):
@@ -1044,6 +1708,7 @@ def fetch_device_groups(tenant_id):
 # Device/Machine Management endpoints for index.js
 
 @main_bp.route('/api/devices', methods=['POST'])
+@conditional_json
 def manage_devices():
     """Handle device management requests (GetMachines, etc.)"""
     try:
@@ -1063,7 +1728,10 @@ def manage_devices():
         current_app.logger.info(f"Device management request: {function_name} for tenant: {tenant_id}")
         
         # Call MDEAutomator Azure Function
-        result = call_azure_function('MDEAutomator', data, read_timeout=60)
+        result = call_azure_function('MDEAutomator', data, read_timeout=60, stream=True)
+
+        if isinstance(result, JsonRelay):
+            return _relay_response(result)
         
         if isinstance(result, dict) and 'error' in result:
             current_app.logger.error(f"Device management failed: {result}")
@@ -1089,6 +1757,7 @@ def hunt_queries_get():
     }), 400
 
 @main_bp.route('/api/hunt/queries', methods=['POST'])
+@conditional_json
 def hunt_queries():
     """Handle hunt query operations (GetQueries, AddQuery, UpdateQuery, UndoQuery)"""
     try:
@@ -1096,7 +1765,7 @@ def hunt_queries():
         current_app.logger.info(f"Hunt queries POST endpoint - Content-Type: {request.content_type}")
         
         data = request.get_json()
-        current_app.logger.info(f"Hunt queries POST endpoint - JSON data: {data}")
+        current_app.logger.debug("Hunt queries POST endpoint - JSON data: %s", clip(data))
         
         if not data:
             return jsonify({'error': 'Request must be JSON and not empty.'}), 400
@@ -1111,19 +1780,19 @@ def hunt_queries():
             return jsonify({'error': 'Function is required'}), 400
         
         current_app.logger.info(f"Hunt query operation: {function_name} for tenant: {tenant_id}")
-        current_app.logger.info(f"Full payload being sent to Azure Function: {data}")
+        current_app.logger.debug("Full payload being sent to Azure Function: %s", clip(data))
         
         # Call MDEHuntManager Azure Function
         result = call_azure_function('MDEHuntManager', data, read_timeout=60)
         
-        current_app.logger.info(f"Azure Function result: {result}")
+        current_app.logger.debug("Azure Function result: %s", clip(result))
         current_app.logger.info(f"Azure Function result type: {type(result)}")
         
         if isinstance(result, dict) and 'error' in result:
             current_app.logger.error(f"Hunt query operation failed: {result}")
             return jsonify(result), 500
         
-        current_app.logger.info(f"Returning successful result: {result}")
+        current_app.logger.debug("Returning successful result: %s", clip(result))
         return jsonify(result)
         
     except Exception as e:
@@ -1227,6 +1896,7 @@ def hunt_run():
 #         return jsonify({'error': f"An error occurred: {str(e)}"}), 500
 
 @main_bp.route('/api/ti/indicators', methods=['POST'])
+@conditional_json
 def ti_indicators():
     """Get or manage indicators for TI Manager using MDETIManager function"""
     try:
@@ -1272,6 +1942,9 @@ def ti_indicators():
             current_app.logger.error(error_msg)
             return jsonify({'error': 'Azure Function call failed', 'details': result}), 500
         
+        if _table_requested():
+            return jsonify(_flatten_result(result))
+        
         return jsonify(result)
         
     except Exception as e:
@@ -1279,6 +1952,7 @@ def ti_indicators():
         return jsonify({'error': f"An error occurred: {str(e)}"}), 500
 
 @main_bp.route('/api/ti/detections', methods=['POST'])
+@conditional_json
 def ti_detections():
     """Get or manage detection rules for TI Manager using MDETIManager function"""
     try:
@@ -1293,20 +1967,17 @@ def ti_detections():
             return jsonify({'error': 'TenantId is required'}), 400
             
         current_app.logger.info(f"TI Detections operation '{function_name}' for tenant: {tenant_id}")
-        print(f"[DEBUG] TI Detections called with tenant: {tenant_id}, function: {function_name}")
         
         # Check if Azure Function is available
         func_url_base = current_app.config.get('FUNCTION_APP_BASE_URL')
         func_key = current_app.config.get('FUNCTION_KEY')
         
         current_app.logger.info(f"Azure Function config check - FUNCTION_APP_BASE_URL: {func_url_base}, FUNCTION_KEY: {'*****' if func_key else None}")
-        print(f"[DEBUG] Azure Function config - FUNCTION_APP_BASE_URL: {func_url_base}, FUNCTION_KEY: {'SET' if func_key else 'NOT SET'}")
         
         if not func_url_base or not func_key or func_url_base == 'your-function-app.azurewebsites.net' or func_key == 'your-function-key-here':
             # Return error when Azure Function is not available instead of mock data
             error_msg = f"Azure Function not configured properly - FUNCTION_APP_BASE_URL: {func_url_base}, FUNCTION_KEY: {'SET' if func_key else 'NOT SET'}"
             current_app.logger.error(error_msg)
-            print(f"[DEBUG] Configuration error: {error_msg}")
             return jsonify({'error': 'Azure Function configuration missing or invalid', 'details': error_msg}), 500
         
         # Prepare payload for MDETIManager
@@ -1323,18 +1994,16 @@ def ti_detections():
             if key not in ['Function', 'TenantId']:
                 payload[key] = value
         
-        print(f"[DEBUG] About to call MDETIManager with payload: {payload}")
+        current_app.logger.debug("Calling MDETIManager with payload: %s", clip(payload))
         
         # Call MDETIManager Azure Function
         result = call_azure_function('MDETIManager', payload, read_timeout=120)  # Longer timeout for detections
         
-        print(f"[DEBUG] Azure Function result: {result}")
-        print(f"[DEBUG] Result type: {type(result)}")
+        current_app.logger.debug("MDETIManager result (%s): %s", type(result).__name__, clip(result))
           # Handle Azure Function errors - return actual error instead of mock data
         if isinstance(result, dict) and 'error' in result:
             error_msg = f"Azure Function failed: {result.get('error', 'Unknown error')}"
             current_app.logger.error(error_msg)
-            print(f"[DEBUG] Azure Function call failed: {result}")
             return jsonify({'error': 'Azure Function call failed', 'details': result}), 500
         
         return jsonify(result)
@@ -1350,7 +2019,7 @@ def ti_sync():
         current_app.logger.info("ti_sync endpoint called")
         
         data = request.get_json()
-        current_app.logger.info(f"Received data: {data}")
+        current_app.logger.debug("Received data: %s", clip(data))
         
         if not data:
             current_app.logger.error("No JSON data received")
@@ -1385,20 +2054,21 @@ def ti_sync():
             if key not in ['Function', 'TenantId']:
                 payload[key] = value
         
-        current_app.logger.info(f"Calling Azure Function with payload: {payload}")
+        current_app.logger.debug("Calling Azure Function with payload: %s", clip(payload))
         
         # Call MDECDManager Azure Function with extended timeout for sync operations
         result = call_azure_function('MDECDManager', payload, read_timeout=300)  # 5 minute timeout for sync
         
-        current_app.logger.info(f"Azure Function result: {result}")
+        current_app.logger.debug("Azure Function result: %s", clip(result))
         
         if isinstance(result, dict) and 'error' in result:
             current_app.logger.error(f"TI Sync operation failed: {result}")
               # Check if it's an Azure Function configuration issue
-            if result.get('error') == 'HTTP error: Unknown' and result.get('details') == 'No response body':
+            if str(result.get('error', '')).startswith('HTTP error:'):
                 return jsonify({
                     'error': 'Azure Function is not responding correctly',
-                    'details': 'The MDECDManager function may not be deployed or configured properly',
+                    'details': f"The MDECDManager function may not be deployed or configured properly "
+                               f"({result['error']}: {result.get('details')})",
                     'suggestion': 'Please check if the MDECDManager Azure Function is deployed and functioning'
                 }), 500
             
@@ -1589,21 +2259,31 @@ def mcp_capabilities():
         current_app.logger.error(f"MCP capabilities error: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _discovery_payload(tools):
+    return {
+        "tools": tools,
+        "server_info": {
+            "name": "MDEAutomator MCP Server",
+            "version": "1.0.0",
+            "description": "Microsoft Defender for Endpoint automation and AI assistance"
+        }
+    }
+
 @main_bp.route('/mcp/discover', methods=['GET', 'POST'])
+@conditional_json
 def mcp_discover():
     """MCP tool discovery endpoint."""
     try:
         mcp_client = get_mcp_client(flask_config=current_app.config)
-        tools = mcp_client.get_available_tools()
-        
-        return jsonify({
-            "tools": tools,
-            "server_info": {
-                "name": "MDEAutomator MCP Server",
-                "version": "1.0.0",
-                "description": "Microsoft Defender for Endpoint automation and AI assistance"
-            }
-        })
+        catalog = mcp_client.tool_catalog() if hasattr(mcp_client, 'tool_catalog') else None
+        if catalog is None:
+            return jsonify(_discovery_payload(mcp_client.get_available_tools()))
+
+        # Serialized once per tool catalog; its hash is the ETag
+        body = catalog.payload('flask_discover', lambda c: _discovery_payload(c.descriptors))
+        response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(catalog.hash)
+        return response
     except Exception as e:
         current_app.logger.error(f"MCP discover error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -1621,89 +2301,13 @@ def mcp_execute():
         
         current_app.logger.info(f"MCP execute request: tool={tool_name}, args={arguments}")
         
-        # Create an isolated execution function that doesn't reuse existing clients
-        def isolated_mcp_execution():
-            """Execute MCP tool in a completely isolated context."""
-            import asyncio
-            import os
-            import sys
-            import threading
-            
-            # Create a separate thread-local event loop
-            result_container = {'result': None, 'exception': None}
-            
-            def thread_worker():
-                try:
-                    # Create new event loop for this thread
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    # Import MCP components fresh in this context
-                    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
-                    
-                    from mdeautomator_mcp.config import MCPConfig
-                    from mdeautomator_mcp.server import MDEAutomatorMCPServer
-                    
-                    # Create fresh configuration
-                    config = MCPConfig.from_environment()
-                    
-                    # Create fresh MCP server instance
-                    mcp_server = MDEAutomatorMCPServer(config)
-                    
-                    # Initialize and execute
-                    async def run_tool():
-                        try:
-                            await mcp_server.function_client.initialize()
-                            
-                            # Route the tool call
-                            result = await mcp_server._route_tool_call(tool_name, arguments)
-                            return {
-                                'success': True,
-                                'result': result,
-                                'tool': tool_name,
-                                'timestamp': time.time()
-                            }
-                        finally:
-                            # Clean up MCP server resources
-                            try:
-                                if hasattr(mcp_server.function_client, 'cleanup'):
-                                    await mcp_server.function_client.cleanup()
-                            except:
-                                pass
-                    
-                    # Execute the tool
-                    result_container['result'] = loop.run_until_complete(run_tool())
-                    
-                except Exception as e:
-                    current_app.logger.error(f"Isolated MCP execution error: {e}", exc_info=True)
-                    result_container['exception'] = e
-                finally:
-                    # Let the loop clean up naturally
-                    try:
-                        loop.close()
-                    except:
-                        pass
-            
-            # Run in thread and wait for completion
-            thread = threading.Thread(target=thread_worker)
-            thread.start()
-            thread.join(timeout=120)  # 2 minute timeout
-            
-            if thread.is_alive():
-                raise TimeoutError("MCP tool execution timed out")
-            
-            if result_container['exception']:
-                raise result_container['exception']
-            
-            return result_container['result'] or {
-                'success': False,
-                'error': 'Unknown execution error',
-                'tool': tool_name,
-                'timestamp': time.time()
-            }
-        
-        # Execute the isolated MCP tool call
-        result = isolated_mcp_execution()
+        # Runs on the worker's long-lived MCP server and event loop
+        result = {
+            'success': True,
+            'result': get_mcp_engine(current_app.config).execute(tool_name, arguments),
+            'tool': tool_name,
+            'timestamp': time.time()
+        }
         
         current_app.logger.info(f"MCP execute completed: tool={tool_name}, success={result.get('success', False)}")
         return jsonify(result)
@@ -1764,6 +2368,20 @@ def diagnostic():
                 'flask': 'imported' if 'flask' in sys.modules else 'not imported',
                 'json': 'imported' if 'json' in sys.modules else 'not imported'
             },
+            'connection_pool': get_pool_stats() or 'No Function App calls made by this worker yet',
+            'function_client': get_async_client_stats() or 'No Function App calls made by this worker yet',
+            'mcp_engine': get_mcp_engine_stats() or 'No MCP tools executed by this worker yet',
+            'jobs': get_job_stats() or 'No jobs submitted by this worker yet',
+            'fanout': get_fanout_stats() or 'No fan-outs run by this worker yet',
+            'logging': get_log_pipeline_stats() or 'Synchronous logging (LOG_ASYNC=false)',
+            'warmer': get_warmer_stats() or 'Function App warmer is not running in this worker',
+            'coalescing': function_calls.stats(),
+            'response_cache': get_response_cache(current_app.config).stats(),
+            'incident_snapshots': get_incident_store(current_app.config).stats(),
+            'incident_alerts': get_alert_cache(current_app.config).stats(),
+            'machine_inventory': get_inventory_store(current_app.config).stats(),
+            'table_schemas': schema_cache_stats(),
+            'endpoints': get_endpoint_states() or 'No Function App calls made by this worker yet',
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
         }
         
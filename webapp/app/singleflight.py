@@ -0,0 +1,107 @@
+"""
+In-flight de-duplication of identical Function App calls.
+
+At shift start many analysts open the same pages at once and fire identical
+read calls (GetIncidents, GetTenantIds, ...). SingleFlight lets the first
+caller for a key perform the upstream request while every identical caller
+that arrives before it completes waits for, and shares, the same result.
+"""
+
+import copy
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+def is_coalescible(payload: Any) -> bool:
+    """Only read operations are safe to share; writes always go upstream."""
+    if not isinstance(payload, dict):
+        return False
+    operation = payload.get('Function') or ''
+    return isinstance(operation, str) and operation.startswith('Get')
+
+
+def call_key(function_name: str, payload: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """Key on (function name, Function, TenantId, canonicalised payload)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return (function_name, str(payload.get('Function', '')), str(payload.get('TenantId', '')), canonical)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'exception', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._pid = os.getpid()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key at a time.
+
+        Returns (result, shared) where shared is True when this caller waited
+        on another caller's request. Every caller gets its own copy of the
+        result, since routes post-process responses in place.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: in-flight entries belong to the parent's threads
+                self._calls.clear()
+                self._pid = os.getpid()
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                waiters = call.waiters
+            call.done.set()
+
+        # Waiters copy the stored result, so hand the leader its own copy too
+        return (copy.deepcopy(call.result) if waiters else call.result), False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+                'coalesced_ratio': round(self.coalesced / total, 3) if total else 0.0,
+            }
+
+
+# Shared by every request thread in this worker
+function_calls = SingleFlight()
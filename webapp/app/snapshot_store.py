@@ -0,0 +1,124 @@
+"""
+Per-tenant snapshot store shared by the incident queue and machine inventory.
+
+IncidentStore and InventoryStore both keep one immutable, indexed snapshot
+per tenant that is rebuilt from a Function App list. SnapshotStore holds the
+part they share:
+
+- a snapshot is reused until it is older than the TTL; concurrent loads for
+  one tenant share a single fetch through a per-tenant lock
+- the store is an LRU bounded to max_tenants, and expired snapshots are
+  dropped whenever a new one is stored, so an MSSP worker does not keep
+  every tenant it has ever served
+- invalidate() bumps the tenant's generation; a load that was already in
+  flight when the tenant was invalidated still answers its own request but
+  is not stored, so the write that invalidated the tenant is not hidden by
+  a snapshot taken before it
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+DEFAULT_MAX_TENANTS = 64
+
+SnapshotT = TypeVar('SnapshotT')
+
+
+class SnapshotStore(Generic[SnapshotT]):
+    """LRU of per-tenant snapshots (objects with a loaded_at timestamp) with a TTL."""
+
+    def __init__(self, build: Callable[[Iterable[Any]], SnapshotT], ttl: float,
+                 max_tenants: int = DEFAULT_MAX_TENANTS):
+        self.ttl = ttl
+        self.max_tenants = max(1, max_tenants)
+        self._build = build
+        self._snapshots: 'OrderedDict[str, SnapshotT]' = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        # Last invalidation per tenant, drawn from one counter so a value is never reused
+        self._generations: Dict[str, int] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.discarded = 0
+
+    def _fresh(self, snapshot: Optional[SnapshotT]) -> bool:
+        return snapshot is not None and time.time() - snapshot.loaded_at < self.ttl
+
+    def _lookup(self, tenant_id: str) -> Optional[SnapshotT]:
+        with self._lock:
+            snapshot = self._snapshots.get(tenant_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(tenant_id)
+            return snapshot
+
+    def get(self, tenant_id: str, loader: Callable[[], Iterable[Any]], refresh: bool = False) -> SnapshotT:
+        """
+        Return the tenant's snapshot, building it from loader() when missing,
+        expired or refresh is set. loader raises to report a failed load.
+        """
+        snapshot = self._lookup(tenant_id)
+        if not refresh and self._fresh(snapshot):
+            return snapshot
+        requested_at = time.time()
+        with self._lock:
+            tenant_lock = self._locks.setdefault(tenant_id, threading.Lock())
+        with tenant_lock:
+            snapshot = self._lookup(tenant_id)
+            # Another request may have reloaded while this one waited for the lock
+            if snapshot is not None and snapshot.loaded_at >= requested_at:
+                return snapshot
+            if not refresh and self._fresh(snapshot):
+                return snapshot
+            with self._lock:
+                generation = self._generations.get(tenant_id)
+            snapshot = self._build(loader())
+            self._store(tenant_id, snapshot, generation)
+            return snapshot
+
+    def _store(self, tenant_id: str, snapshot: SnapshotT, generation: Optional[int]) -> None:
+        with self._lock:
+            if self._generations.get(tenant_id) != generation:
+                # Invalidated while loading: the data predates the change
+                self.discarded += 1
+                return
+            self._snapshots[tenant_id] = snapshot
+            self._snapshots.move_to_end(tenant_id)
+            now = time.time()
+            for other in [t for t, s in self._snapshots.items() if now - s.loaded_at >= self.ttl]:
+                self._evict(other)
+            while len(self._snapshots) > self.max_tenants:
+                self._evict(next(iter(self._snapshots)))
+
+    def _evict(self, tenant_id: str) -> None:
+        del self._snapshots[tenant_id]
+        self.evicted += 1
+        lock = self._locks.get(tenant_id)
+        if lock is not None and not lock.locked():
+            del self._locks[tenant_id]
+
+    def peek(self, tenant_id: str) -> Optional[SnapshotT]:
+        """The tenant's snapshot if one is loaded and within its TTL; never loads."""
+        snapshot = self._snapshots.get(tenant_id)
+        return snapshot if self._fresh(snapshot) else None
+
+    def invalidate(self, tenant_id: str) -> None:
+        with self._lock:
+            self._generations[tenant_id] = next(self._counter)
+            self._snapshots.pop(tenant_id, None)
+
+    def describe(self, snapshot: SnapshotT) -> Dict[str, Any]:
+        return {'age': round(time.time() - snapshot.loaded_at, 1)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshots = list(self._snapshots.items())
+        return {
+            'ttl': self.ttl,
+            'max_tenants': self.max_tenants,
+            'evicted': self.evicted,
+            'discarded': self.discarded,
+            'tenants': {tenant_id: self.describe(snapshot) for tenant_id, snapshot in snapshots},
+        }
@@ -60,42 +60,75 @@ function getTenantId() {
 
 // Use centralized loading system from base.js
 
-// Main function to load incidents
-async function loadIncidents() {
-    const tenantId = getTenantId();
-    if (!tenantId) {
-        console.warn('No tenant selected for loading incidents');
-        return;
-    }
+// Incidents hidden from the queue: display names containing these terms (and
+// incidents without a display name) are filtered out server-side
+const EXCLUDED_DISPLAY_NAME_TERMS = ['email', 'dlp'];
+
+// Grid column index -> sortable field on /api/incidents
+const INCIDENT_SORT_FIELDS = {
+    1: 'id',
+    2: 'displayName',
+    3: 'severity',
+    4: 'status',
+    5: 'classification',
+    6: 'assignedTo',
+    9: 'createdDateTime',
+    10: 'lastUpdateDateTime'
+};
+
+// Append query parameters to a URL built up by Grid.js
+function appendQuery(url, params) {
+    const query = Object.entries(params)
+        .filter(([, value]) => value !== undefined && value !== null && value !== '')
+        .map(([key, value]) => `${encodeURIComponent(key)}=${encodeURIComponent(value)}`)
+        .join('&');
+    if (!query) return url;
+    return url + (url.includes('?') ? '&' : '?') + query;
+}
 
-    console.log('Loading incidents...');
-    window.showContentLoading('Loading Incidents');
+// Fetch one page of incidents from the server-side snapshot
+async function fetchIncidentPage(url, tenantId, extraBody = {}) {
+    // Create AbortController for timeout handling
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), 90000); // 90 second timeout
 
     try {
-        // Create AbortController for timeout handling
-        const controller = new AbortController();
-        const timeoutId = setTimeout(() => controller.abort(), 90000); // 90 second timeout
-
-        const response = await fetch('/api/incidents', {
+        const response = await fetch(url, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ tenantId: tenantId }),
+            body: JSON.stringify({
+                tenantId: tenantId,
+                filter: { excludeDisplayName: EXCLUDED_DISPLAY_NAME_TERMS },
+                ...extraBody
+            }),
             signal: controller.signal
         });
 
-        clearTimeout(timeoutId);
-
+        const data = await response.json();
         if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
         }
+        return data;
+    } finally {
+        clearTimeout(timeoutId);
+    }
+}
 
-        const data = await response.json();
-        const incidents = data.incidents || [];
-        renderIncidentsTable(incidents);
-        
-        console.log(`Loaded ${incidents.length} incidents`);
+// Main function to load incidents
+async function loadIncidents() {
+    const tenantId = getTenantId();
+    if (!tenantId) {
+        console.warn('No tenant selected for loading incidents');
+        return;
+    }
+
+    console.log('Loading incidents...');
+    window.showContentLoading('Loading Incidents');
+
+    try {
+        await renderIncidentsTable(tenantId);
     } catch (error) {
         console.error('Error loading incidents:', error);
         if (error.name === 'AbortError') {
@@ -108,40 +141,26 @@ async function loadIncidents() {
     }
 }
 
-// Render incidents table using Grid.js
-function renderIncidentsTable(incidents) {
+// Render incidents table using Grid.js, paging, searching and sorting on the server
+function renderIncidentsTable(tenantId) {
     const container = document.getElementById('incidentTableContainer');
     container.innerHTML = '';
     
     if (!window.gridjs) {
         console.error('Grid.js not loaded');
-        return;
+        return Promise.resolve();
     }
 
     if (window.incidentsGrid) {
         window.incidentsGrid.destroy();
     }
 
-    // Filter out incidents with Display Names containing any variation of "email" or "dlp"
-    // and also filter out incomplete incidents that only have Summary or missing essential data
-    const filteredIncidents = incidents.filter(incident => {
-        // Check if incident has essential properties
-        const hasId = incident.Id || incident.id;
-        const hasDisplayName = incident.DisplayName || incident.displayName;
-        
-        // Skip incidents without essential data
-        if (!hasId || !hasDisplayName) {
-            return false;
-        }
-        
-        const displayName = hasDisplayName.toLowerCase() || '';
-        // Case-insensitive check for "email" or "dlp" in display name
-        return !displayName.includes('email') && !displayName.includes('dlp');
+    // Resolves once the first page has rendered (or failed to load)
+    let firstPageLoaded;
+    const firstPage = new Promise((resolve, reject) => {
+        firstPageLoaded = { resolve, reject };
     });
 
-    // Store filtered incidents globally for export
-    allIncidents = filteredIncidents;
-
     const columns = [
         { 
             id: 'checkbox', 
@@ -170,6 +189,7 @@ function renderIncidentsTable(incidents) {
             id: 'incidentWebUrl', 
             name: 'Incident URL', 
             width: '11%',
+            sort: false,
             formatter: (cell) => {
                 if (cell && cell.trim()) {
                     return gridjs.html(`<a href="${cell}" target="_blank" style="color: #00ff41; text-decoration: underline;" title="Open incident in Microsoft 365 Defender">View</a>`);
@@ -191,7 +211,7 @@ function renderIncidentsTable(incidents) {
         { id: 'lastUpdateTime', name: 'Last Updated', width: '8%' }
     ];
 
-    const data = filteredIncidents.map(incident => [
+    const toRow = incident => [
         '', // Checkbox column placeholder
         incident.Id || incident.id,
         incident.DisplayName || incident.displayName || 'No Display Name',
@@ -203,16 +223,50 @@ function renderIncidentsTable(incidents) {
         '', // Related Alerts column placeholder - will be populated by formatter
         formatDateTime(incident.CreatedDateTime || incident.createdDateTime),
         formatDateTime(incident.LastUpdateDateTime || incident.lastUpdateDateTime || incident.LastUpdateTime || incident.lastUpdateTime)
-    ]);
+    ];
 
     window.incidentsGrid = new gridjs.Grid({
         columns,
-        data,
-        search: true,
-        sort: true,
+        server: {
+            url: '/api/incidents',
+            data: async (opts) => {
+                try {
+                    const page = await fetchIncidentPage(opts.url, tenantId);
+                    allIncidents = page.incidents || [];
+                    updateIncidentCounts(page);
+                    firstPageLoaded.resolve();
+                    console.log(`Loaded ${allIncidents.length} of ${page.total} incidents`);
+                    return { data: allIncidents.map(toRow), total: page.total };
+                } catch (error) {
+                    firstPageLoaded.reject(error);
+                    throw error;
+                }
+            }
+        },
+        search: {
+            server: {
+                url: (prev, keyword) => appendQuery(prev, { search: keyword })
+            }
+        },
+        sort: {
+            multiColumn: false,
+            server: {
+                url: (prev, columns) => {
+                    if (!columns.length) return prev;
+                    const column = columns[0];
+                    return appendQuery(prev, {
+                        sort: INCIDENT_SORT_FIELDS[column.index],
+                        order: column.direction === 1 ? 'asc' : 'desc'
+                    });
+                }
+            }
+        },
         pagination: {
             limit: 25,
-            summary: true
+            summary: true,
+            server: {
+                url: (prev, page, limit) => appendQuery(prev, { offset: page * limit, limit: limit })
+            }
         },
         autoWidth: true,
         width: '100%',
@@ -248,8 +302,7 @@ function renderIncidentsTable(incidents) {
         updateActionButtons(); // Ensure buttons are in correct state
     }, 500);
 
-    // Update incident counts
-    updateIncidentCounts(filteredIncidents);
+    return firstPage;
 }
 
 // Setup event listeners for table actions
@@ -640,6 +693,73 @@ async function addComment() {
     }
 }
 
+// Alerts per incident, fetched through /api/incidents/alerts/batch. Requests made
+// in the same tick share one batch call, and an entry is reused while the
+// incident's lastUpdateDateTime is unchanged.
+const incidentAlertsCache = new Map();
+let pendingAlertBatch = null;
+
+function incidentLastUpdated(incidentId) {
+    const incident = allIncidents.find(i => String(i.Id || i.id) === String(incidentId));
+    return incident ? (incident.LastUpdateDateTime || incident.lastUpdateDateTime || null) : null;
+}
+
+function loadIncidentAlerts(incidentIds, tenantId) {
+    const cached = (incidentId) => {
+        const entry = incidentAlertsCache.get(incidentId);
+        // Without a known lastUpdateDateTime the server's alert cache decides
+        return entry && entry.tenantId === tenantId && entry.version !== null && entry.version === incidentLastUpdated(incidentId);
+    };
+    const missing = incidentIds.map(String).filter(incidentId => !cached(incidentId));
+
+    if (missing.length) {
+        if (!pendingAlertBatch || pendingAlertBatch.tenantId !== tenantId) {
+            const batch = { tenantId, ids: new Set() };
+            batch.promise = new Promise(resolve => setTimeout(resolve, 0)).then(async () => {
+                pendingAlertBatch = null;
+                const ids = [...batch.ids];
+                const lastUpdated = {};
+                ids.forEach(incidentId => {
+                    const version = incidentLastUpdated(incidentId);
+                    if (version) {
+                        lastUpdated[incidentId] = version;
+                    }
+                });
+                console.log(`Fetching alerts for ${ids.length} incident(s) in one batch`);
+                const response = await fetch('/api/incidents/alerts/batch', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ tenantId, incidentIds: ids, lastUpdated })
+                });
+                const result = await response.json();
+                if (!response.ok || !result.success) {
+                    throw new Error(result.error || `HTTP error! status: ${response.status}`);
+                }
+                Object.entries(result.alerts || {}).forEach(([incidentId, alerts]) => {
+                    incidentAlertsCache.set(incidentId, { tenantId, version: lastUpdated[incidentId] || null, alerts });
+                });
+                return result.errors || {};
+            });
+            pendingAlertBatch = batch;
+        }
+        missing.forEach(incidentId => pendingAlertBatch.ids.add(incidentId));
+    }
+
+    const batch = missing.length ? pendingAlertBatch.promise : Promise.resolve({});
+    return batch.then(errors => {
+        const alertsById = {};
+        incidentIds.map(String).forEach(incidentId => {
+            const entry = incidentAlertsCache.get(incidentId);
+            if (entry && entry.tenantId === tenantId) {
+                alertsById[incidentId] = entry.alerts;
+            } else {
+                alertsById[incidentId] = new Error(errors[incidentId] || 'Failed to retrieve alerts');
+            }
+        });
+        return alertsById;
+    });
+}
+
 // Function to view incident alerts
 async function viewIncidentAlerts(incidentId, button) {
     console.log('=== viewIncidentAlerts called ===');
@@ -665,38 +785,17 @@ async function viewIncidentAlerts(incidentId, button) {
         console.log('Showing alerts modal...');
         showAlertsModal(incidentId);
         
-        // Make API call to get alerts
-        console.log('Making API call to /api/incidents/alerts');
-        const response = await fetch('/api/incidents/alerts', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                tenantId: tenantId,
-                incidentId: incidentId
-            })
-        });
-
-        console.log('API response status:', response.status);
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        const result = await response.json();
-        console.log('API response data:', result);
-        console.log('result.success:', result.success);
-        console.log('result.alerts:', result.alerts);
-        console.log('result.alerts type:', typeof result.alerts);
-        console.log('result.alerts isArray:', Array.isArray(result.alerts));
-        
-        if (result.success) {
-            const alertsData = result.alerts || [];
-            console.log('Calling displayAlertsData with:', alertsData);
-            displayAlertsData(alertsData, incidentId);
-        } else {
-            throw new Error(result.error || 'Failed to retrieve alerts');
+        // Expanding one of several selected incidents fetches all of them in one batch
+        const expanded = selectedIncidentIds.includes(String(incidentId))
+            ? [String(incidentId), ...selectedIncidentIds.filter(id => id !== String(incidentId))]
+            : [String(incidentId)];
+        const alertsById = await loadIncidentAlerts(expanded, tenantId);
+        const alertsData = alertsById[String(incidentId)];
+        if (alertsData instanceof Error) {
+            throw alertsData;
         }
+        console.log('Calling displayAlertsData with:', alertsData);
+        displayAlertsData(alertsData || [], incidentId);
         
     } catch (error) {
         console.error('Error fetching incident alerts:', error);
@@ -993,29 +1092,15 @@ function escapeHtml(text) {
 }
 
 // Function to update incident counts by severity
-function updateIncidentCounts(incidents) {
+function updateIncidentCounts(page) {
+    // Severity counts cover every matching incident, not just the current page
     const counts = {
-        total: incidents.length,
-        high: 0,
-        medium: 0,
-        low: 0
+        total: page.total || 0,
+        high: (page.counts && page.counts.high) || 0,
+        medium: (page.counts && page.counts.medium) || 0,
+        low: (page.counts && page.counts.low) || 0
     };
 
-    incidents.forEach(incident => {
-        const severity = (incident.Severity || incident.severity || '').toLowerCase();
-        switch (severity) {
-            case 'high':
-                counts.high++;
-                break;
-            case 'medium':
-                counts.medium++;
-                break;
-            case 'low':
-                counts.low++;
-                break;
-        }
-    });
-
     // Update the display elements
     const totalElement = document.getElementById('totalIncidentCount');
     const highElement = document.getElementById('highSeverityCount');
@@ -1098,7 +1183,7 @@ function setupEventListeners() {
     // Export CSV button
     const exportIncidentsBtn = document.getElementById('exportIncidentsBtn');
     if (exportIncidentsBtn) {
-        exportIncidentsBtn.addEventListener('click', () => exportIncidentsCSV(allIncidents));
+        exportIncidentsBtn.addEventListener('click', exportAllIncidents);
     }
 
     // Modal close buttons
@@ -1316,6 +1401,32 @@ function populateTenantDropdown(tenants) {
 }
 
 // Function to export incidents data to CSV
+// Page through every matching incident with the snapshot cursor, then export
+async function exportAllIncidents() {
+    const tenantId = getTenantId();
+    if (!tenantId) {
+        alert('Please select a tenant first.');
+        return;
+    }
+
+    window.showContentLoading('Exporting Incidents');
+    try {
+        const incidents = [];
+        let cursor = null;
+        do {
+            const page = await fetchIncidentPage('/api/incidents', tenantId, { limit: 1000, cursor: cursor });
+            incidents.push(...(page.incidents || []));
+            cursor = page.next_cursor;
+        } while (cursor);
+        exportIncidentsCSV(incidents);
+    } catch (error) {
+        console.error('Error exporting incidents:', error);
+        alert(`Error exporting incidents: ${error.message}`);
+    } finally {
+        window.hideContentLoading();
+    }
+}
+
 function exportIncidentsCSV(incidentsData) {
     if (!Array.isArray(incidentsData) || incidentsData.length === 0) {
         alert('No incident data available to export.');
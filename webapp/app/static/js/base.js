@@ -202,4 +202,63 @@ function hideContentLoading() {
 
 // Make content loading functions globally available
 window.showContentLoading = showContentLoading;
-window.hideContentLoading = hideContentLoading;
\ No newline at end of file
+window.hideContentLoading = hideContentLoading;
+// Conditional JSON requests for the large list endpoints. The server tags these
+// responses with an ETag; remembering the last body per request lets a refresh
+// send If-None-Match and reuse it when the server answers 304 Not Modified.
+// Only reads (no Function, or a Get* Function) are conditional: the same
+// endpoints also take writes, which must always reach the server.
+(function () {
+    const conditionalEndpoints = ['/api/incidents', '/api/ti/indicators', '/api/ti/detections', '/api/devices', '/api/hunt/queries'];
+    const maxEntries = 20;
+    const responseCache = new Map();
+    const nativeFetch = window.fetch.bind(window);
+
+    function isReadRequest(body) {
+        if (!body) {
+            return true;
+        }
+        try {
+            const functionName = JSON.parse(body).Function;
+            return !functionName || String(functionName).startsWith('Get');
+        } catch (e) {
+            return false;
+        }
+    }
+
+    window.fetch = async function (input, init = {}) {
+        if (typeof input !== 'string' || (init.body && typeof init.body !== 'string')) {
+            return nativeFetch(input, init);
+        }
+        const path = new URL(input, window.location.origin).pathname;
+        if (!conditionalEndpoints.includes(path) || !isReadRequest(init.body)) {
+            return nativeFetch(input, init);
+        }
+
+        const key = `${(init.method || 'GET').toUpperCase()} ${input} ${init.body || ''}`;
+        const cached = responseCache.get(key);
+        const headers = new Headers(init.headers || {});
+        if (cached) {
+            headers.set('If-None-Match', cached.etag);
+        }
+
+        const response = await nativeFetch(input, { ...init, headers });
+        if (response.status === 304 && cached) {
+            return new Response(cached.body, {
+                status: 200,
+                headers: { 'Content-Type': 'application/json', 'ETag': cached.etag }
+            });
+        }
+
+        const etag = response.headers.get('ETag');
+        if (response.ok && etag) {
+            const body = await response.clone().text();
+            responseCache.delete(key);
+            responseCache.set(key, { etag, body });
+            if (responseCache.size > maxEntries) {
+                responseCache.delete(responseCache.keys().next().value);
+            }
+        }
+        return response;
+    };
+})();
@@ -0,0 +1,159 @@
+"""
+Staged, streamed Live Response library uploads.
+
+InvokeUploadLR used to read the whole multipart file into memory,
+base64-encode it and have requests JSON-encode that string again, about
+three copies of the file per upload. Instead:
+
+- the multipart body is parsed straight into a spooled temporary file that
+  stands in for a blob (in memory up to LR_UPLOAD_SPOOL_BYTES, on disk
+  beyond) and is owned by the upload job, with LR_UPLOAD_MAX_BYTES enforced
+  as the bytes arrive
+- the Function App request body is generated from that file as urllib3
+  sends it: the JSON envelope around "fileContent" is serialised once and
+  the file is base64-encoded one chunk at a time, with an exact
+  Content-Length so no chunked encoding is needed
+
+Peak memory per upload is the spool threshold plus one raw and one encoded
+chunk, whatever the size of the file.
+"""
+
+import base64
+import json
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from werkzeug.formparser import parse_form_data
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024    # largest file accepted for the Live Response library
+DEFAULT_SPOOL_BYTES = 1024 * 1024        # staged files spill to disk beyond this
+DEFAULT_CHUNK_BYTES = 3 * 64 * 1024      # a multiple of 3, so chunks base64-encode independently
+MAX_FORM_FIELD_BYTES = 512 * 1024        # non-file fields; also bounds the multipart read buffer
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds LR_UPLOAD_MAX_BYTES."""
+
+
+class _CappedSpool(tempfile.SpooledTemporaryFile):
+    """Spooled temporary file that refuses to grow past max_bytes."""
+
+    def __init__(self, max_bytes: int, spool_bytes: int):
+        super().__init__(max_size=spool_bytes)
+        self.max_bytes = max_bytes
+        self.written = 0
+
+    def write(self, data) -> int:
+        self.written += len(data)
+        if self.written > self.max_bytes:
+            raise UploadTooLarge(f'File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit')
+        return super().write(data)
+
+
+class StagedUpload:
+    """An uploaded file held in a spool until the Function App call has sent it."""
+
+    def __init__(self, spool, filename: Optional[str], size: int, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        self._spool = spool
+        self.filename = filename
+        self.size = size
+        # base64 works on 3-byte groups; any other chunk size would pad mid-stream
+        self.chunk_bytes = max(3, chunk_bytes - chunk_bytes % 3)
+
+    def __repr__(self) -> str:
+        # Payloads are logged at debug level; never dump the file itself
+        return f'<StagedUpload {self.filename!r} {self.size} bytes>'
+
+    @property
+    def base64_length(self) -> int:
+        return 4 * ((self.size + 2) // 3)
+
+    def iter_base64(self) -> Iterator[bytes]:
+        self._spool.seek(0)
+        while True:
+            chunk = self._spool.read(self.chunk_bytes)
+            if not chunk:
+                return
+            yield base64.b64encode(chunk)
+
+    def close(self) -> None:
+        self._spool.close()
+
+
+class StreamedJsonBody:
+    """
+    A JSON payload whose StagedUpload values are written as base64 strings on the fly.
+
+    requests sends any iterable with a length as a streamed body with that
+    Content-Length; each iteration starts again from the top of the spool.
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        self._parts: List[Union[bytes, StagedUpload]] = []
+        pending = '{'
+        for position, (key, value) in enumerate(payload.items()):
+            pending += (',' if position else '') + json.dumps(key) + ':'
+            if isinstance(value, StagedUpload):
+                self._parts.append((pending + '"').encode('utf-8'))
+                self._parts.append(value)
+                pending = '"'
+            else:
+                pending += json.dumps(value)
+        self._parts.append((pending + '}').encode('utf-8'))
+
+    def __len__(self) -> int:
+        return sum(part.base64_length if isinstance(part, StagedUpload) else len(part) for part in self._parts)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, StagedUpload):
+                yield from part.iter_base64()
+            else:
+                yield part
+
+
+def streamed_json_body(payload: Any) -> Optional[StreamedJsonBody]:
+    """A streamed body for payloads carrying a StagedUpload, None for plain JSON payloads."""
+    if isinstance(payload, dict) and any(isinstance(value, StagedUpload) for value in payload.values()):
+        return StreamedJsonBody(payload)
+    return None
+
+
+def stage_upload(environ: Dict[str, Any], config: Dict[str, Any],
+                 field: str = 'file') -> Tuple[Dict[str, str], Optional[StagedUpload]]:
+    """
+    Parse a multipart request, staging the file field in a capped spool.
+
+    Returns the form fields and the staged file (None when the field is
+    missing). The caller owns the upload and must close() it.
+    """
+    max_bytes = int(config.get('LR_UPLOAD_MAX_BYTES', DEFAULT_MAX_BYTES))
+    spool_bytes = int(config.get('LR_UPLOAD_SPOOL_BYTES', DEFAULT_SPOOL_BYTES))
+    content_length = environ.get('CONTENT_LENGTH')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MAX_FORM_FIELD_BYTES:
+        raise UploadTooLarge(f'File exceeds the {max_bytes // (1024 * 1024)} MB upload limit')
+
+    spools: List[_CappedSpool] = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        spool = _CappedSpool(max_bytes, spool_bytes)
+        spools.append(spool)
+        return spool
+
+    try:
+        _, form, files = parse_form_data(environ, stream_factory=stream_factory,
+                                         max_form_memory_size=MAX_FORM_FIELD_BYTES, silent=False)
+    except BaseException:
+        for spool in spools:
+            spool.close()
+        raise
+
+    storage = files.get(field)
+    for spool in spools:
+        if storage is None or spool is not storage.stream:
+            spool.close()
+    if storage is None:
+        return form.to_dict(), None
+    spool = storage.stream
+    return form.to_dict(), StagedUpload(spool, storage.filename, spool.written,
+                                        int(config.get('LR_UPLOAD_CHUNK_BYTES', DEFAULT_CHUNK_BYTES)))
@@ -0,0 +1,245 @@
+"""
+Function App pre-warmer and startup prefetch.
+
+A Function App that has been idle answers its first call after a cold start
+of tens of seconds, which is why so many routes carry 60 s read timeouts.
+The warmer keeps the endpoints responsive from a background thread:
+
+- every FUNCTION_WARM_INTERVAL seconds each probe endpoint gets an
+  authenticated POST with a read-only body, and the probe only counts if the
+  function answers with the status that body is known to produce. A GET is
+  not enough: the triggers are POST-only, so the host rejects it without
+  ever starting the PowerShell worker. All functions share one app and one
+  worker, so two cheap calls that reach run.ps1 without connecting to Graph
+  warm every endpoint; real traffic to any function skips the round.
+- each probe is classed as a warm hit or a cold start (slower than
+  FUNCTION_WARM_COLD_THRESHOLD); latencies are kept separately for both,
+  along with how long the endpoint had been idle before each cold start, so
+  the interval can be tuned to the plan's idle timeout
+- once at startup, a prefetch callable loads the tenant list and every
+  tenant's device groups into the response cache before the first page asks
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .http_pool import get_function_session
+
+# Probe body and the status it must produce, per endpoint. The other functions
+# connect to Graph before validating their input, so no call to them is cheap.
+WARM_PROBES: Dict[str, Tuple[Dict[str, Any], int]] = {
+    # Reads the tenant table from storage
+    'MDEAutoDB': ({'Function': 'GetTenantIds'}, 200),
+    # Rejected by run.ps1's own parameter check, before any Graph or storage call
+    'MDEProfiles': ({}, 400),
+}
+WARM_FUNCTIONS = tuple(WARM_PROBES)
+
+# Defaults used when the Flask config does not override them
+DEFAULT_INTERVAL = 240.0            # seconds between probe rounds
+DEFAULT_COLD_THRESHOLD = 5.0        # probes slower than this count as cold starts
+DEFAULT_PROBE_TIMEOUT = 120.0       # long enough to measure a full cold start
+LATENCY_WINDOW = 100                # latencies kept per endpoint and kind
+
+
+def _summary(latencies: Iterable[float]) -> Optional[Dict[str, float]]:
+    ordered = sorted(latencies)
+    if not ordered:
+        return None
+    return {
+        'count': len(ordered),
+        'avg': round(sum(ordered) / len(ordered), 3),
+        'p50': round(ordered[len(ordered) // 2], 3),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'max': round(ordered[-1], 3),
+    }
+
+
+class EndpointWarmth:
+    """Probe outcomes for one Function App endpoint."""
+
+    def __init__(self):
+        self.probes = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_contact: Optional[float] = None
+        self.last_probe: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.warm: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.cold: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.idle_before_cold: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'probes': self.probes,
+            'skipped': self.skipped,
+            'failures': self.failures,
+            'warm_hits': len(self.warm),
+            'cold_starts': len(self.cold),
+            'warm_latency': _summary(self.warm),
+            'cold_latency': _summary(self.cold),
+            'idle_before_cold': _summary(self.idle_before_cold),
+            'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None,
+            'last_probe_age': round(now - self.last_probe, 1) if self.last_probe else None,
+            'last_error': self.last_error,
+        }
+
+
+class FunctionWarmer:
+    """Background thread that probes Function App endpoints and runs a one-off prefetch."""
+
+    def __init__(self, base_url: str, function_key: str, functions: Iterable[str] = WARM_FUNCTIONS,
+                 interval: float = DEFAULT_INTERVAL, cold_threshold: float = DEFAULT_COLD_THRESHOLD,
+                 probe_timeout: float = DEFAULT_PROBE_TIMEOUT, config: Optional[Dict[str, Any]] = None,
+                 prefetch: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.base_url = base_url.rstrip('/')
+        self.function_key = function_key
+        # Endpoints without a known probe body cannot be warmed safely
+        self.functions: List[str] = [name for name in functions if name in WARM_PROBES]
+        self.interval = interval
+        self.cold_threshold = cold_threshold
+        self.probe_timeout = probe_timeout
+        self.prefetch_result: Optional[Dict[str, Any]] = None
+        self._config = config or {}
+        self._prefetch = prefetch
+        self._endpoints = {name: EndpointWarmth() for name in self.functions}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'FunctionWarmer':
+        self._thread = threading.Thread(target=self._run, name='mde-warmer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def note_call(self, function_name: str) -> None:
+        """Record real traffic; it ran on the shared worker, so no endpoint needs a probe this round."""
+        now = time.time()
+        for endpoint in self._endpoints.values():
+            endpoint.last_contact = now
+
+    def _run(self) -> None:
+        if self._prefetch:
+            started = time.time()
+            try:
+                result = self._prefetch()
+            except Exception as e:
+                result = {'error': str(e)}
+            self.prefetch_result = dict(result or {}, duration=round(time.time() - started, 3))
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.interval)
+
+    def probe_all(self) -> None:
+        now = time.time()
+        for name in self.functions:
+            if self._stop.is_set():
+                return
+            endpoint = self._endpoints[name]
+            if endpoint.last_contact and now - endpoint.last_contact < self.interval:
+                endpoint.skipped += 1
+                continue
+            self.probe(name)
+
+    def probe(self, function_name: str) -> None:
+        endpoint = self._endpoints[function_name]
+        idle = time.time() - endpoint.last_contact if endpoint.last_contact else None
+        url = f"{self.base_url}/api/{function_name}?code={self.function_key}"
+        payload, expected_status = WARM_PROBES[function_name]
+        started = time.time()
+        try:
+            # Going through the pooled session also keeps a connection open for real calls
+            response = get_function_session(self._config).post(url, json=payload, timeout=(10, self.probe_timeout))
+            response.close()
+            # 401 (bad key), 404 (no such function) or 5xx mean the worker did not run the probe
+            error = None if response.status_code == expected_status else (
+                f'HTTP {response.status_code}, expected {expected_status}')
+        except Exception as e:
+            error = str(e).replace(self.function_key, 'REDACTED_KEY')
+        latency = time.time() - started
+
+        with self._lock:
+            endpoint.probes += 1
+            endpoint.last_probe = started
+            endpoint.last_latency = latency
+            endpoint.last_error = error
+            if error:
+                endpoint.failures += 1
+                return
+            endpoint.last_contact = time.time()
+            if latency >= self.cold_threshold:
+                endpoint.cold.append(latency)
+                if idle is not None:
+                    endpoint.idle_before_cold.append(idle)
+            else:
+                endpoint.warm.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'interval': self.interval,
+                'cold_threshold': self.cold_threshold,
+                'prefetch': self.prefetch_result or 'pending',
+                'endpoints': {name: endpoint.snapshot() for name, endpoint in self._endpoints.items()},
+            }
+
+
+# One warmer per worker process (see http_pool for why this is keyed by pid)
+_warmers: Dict[int, FunctionWarmer] = {}
+_warmers_lock = threading.Lock()
+
+
+def start_warmer(config: Dict[str, Any], prefetch: Optional[Callable[[], Dict[str, Any]]] = None) -> Optional[FunctionWarmer]:
+    """Start this worker's warmer once; None when warming is disabled or the Function App is not configured."""
+    base_url = config.get('FUNCTION_APP_BASE_URL') or ''
+    function_key = config.get('FUNCTION_KEY')
+    if not config.get('FUNCTION_WARMER_ENABLED', True) or not function_key or not base_url.startswith(('https://', 'http://')):
+        return None
+
+    pid = os.getpid()
+    warmer = _warmers.get(pid)
+    if warmer is not None:
+        return warmer
+    with _warmers_lock:
+        warmer = _warmers.get(pid)
+        if warmer is None:
+            functions = config.get('FUNCTION_WARM_ENDPOINTS') or WARM_FUNCTIONS
+            warmer = FunctionWarmer(
+                base_url, function_key, functions=functions,
+                interval=float(config.get('FUNCTION_WARM_INTERVAL', DEFAULT_INTERVAL)),
+                cold_threshold=float(config.get('FUNCTION_WARM_COLD_THRESHOLD', DEFAULT_COLD_THRESHOLD)),
+                probe_timeout=float(config.get('FUNCTION_WARM_PROBE_TIMEOUT', DEFAULT_PROBE_TIMEOUT)),
+                config=config, prefetch=prefetch,
+            )
+            _warmers.clear()
+            # Registered before starting so the prefetch's own calls count as contact
+            _warmers[pid] = warmer
+            warmer.start()
+        return warmer
+
+
+def note_function_call(function_name: str) -> None:
+    warmer = _warmers.get(os.getpid())
+    if warmer is not None:
+        warmer.note_call(function_name)
+
+
+def stop_warmer() -> None:
+    warmer = _warmers.get(os.getpid())
+    if warmer is not None:
+        warmer.stop()
+
+
+def get_warmer_stats() -> Optional[Dict[str, Any]]:
+    """Return warmer counters for this worker, or None if it is not running."""
+    warmer = _warmers.get(os.getpid())
+    return warmer.stats() if warmer else None
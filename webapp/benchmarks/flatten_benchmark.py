@@ -0,0 +1,122 @@
+"""
+Benchmark the table flattener on a synthetic GetMachines-shaped dataset.
+
+Compares the old copy-and-patch device flattening (dict.copy() per row,
+hardcoded VmMetadata/IpAddresses handling, then a second pass to build row
+lists) with TableFlattener and the columnar MachineInventory build.
+
+    cd webapp
+    python benchmarks/flatten_benchmark.py --rows 100000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.flattener import MACHINE_COLUMN_PINS, TableFlattener  # noqa: E402
+from app.machine_inventory import MachineInventory  # noqa: E402
+
+PLATFORMS = ('Windows11', 'Windows10', 'WindowsServer2022', 'Linux', 'macOS')
+HEALTH = ('Active', 'Inactive', 'ImpairedCommunication', 'NoSensorData')
+RISK = ('None', 'Informational', 'Low', 'Medium', 'High')
+TAGS = ('prod', 'dev', 'finance', 'vip', 'kiosk', 'lab')
+
+
+def synthetic_machines(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        vm = None if i % 3 else {'vmId': f'vm-{i}', 'cloudProvider': 'Azure', 'resourceId': f'/subscriptions/s/vm-{i}'}
+        ips = [{'ipAddress': f'10.{i % 250}.{i % 200}.{n}', 'macAddress': f'00-15-5D-{i % 99:02d}-{n:02d}',
+                'type': 'Ethernet', 'operationalStatus': 'Up'} for n in range(rng.randint(0, 3))]
+        yield {
+            'Id': f'{i:040x}',
+            'ComputerDnsName': f'host-{i}.contoso.local',
+            'FirstSeen': '2024-01-01T00:00:00Z',
+            'LastSeen': '2024-06-01T12:00:00Z',
+            'OsPlatform': rng.choice(PLATFORMS),
+            'OsVersion': '10.0',
+            'OsProcessor': 'x64',
+            'Version': '22H2',
+            'LastIpAddress': f'10.{i % 250}.{i % 200}.1',
+            'LastExternalIpAddress': f'20.{i % 250}.1.1',
+            'AgentVersion': '10.8760',
+            'OsBuild': 22621,
+            'HealthStatus': rng.choice(HEALTH),
+            'DeviceValue': 'Normal',
+            'RbacGroupId': i % 40,
+            'RbacGroupName': f'Group {i % 40}',
+            'RiskScore': rng.choice(RISK),
+            'ExposureLevel': rng.choice(RISK),
+            'IsAadJoined': bool(i % 2),
+            'AadDeviceId': None,
+            'MachineTags': rng.sample(TAGS, rng.randint(0, 3)),
+            'OnboardingStatus': 'Onboarded',
+            'VmMetadata': vm,
+            'IpAddresses': ips,
+        }
+
+
+def legacy_flatten(machines):
+    """The device table flattening this replaces"""
+    def flatten_machine(machine):
+        flat = machine.copy()
+        if 'VmMetadata' in flat and isinstance(flat['VmMetadata'], dict):
+            for k, v in flat['VmMetadata'].items():
+                flat[f'VmMetadata.{k}'] = v
+            del flat['VmMetadata']
+        if 'IpAddresses' in flat and isinstance(flat['IpAddresses'], list) and flat['IpAddresses']:
+            for k, v in flat['IpAddresses'][0].items():
+                flat[f'IpAddresses.0.{k}'] = v
+            del flat['IpAddresses']
+        return flat
+
+    flat_machines = [flatten_machine(m) for m in machines]
+    columns = list(flat_machines[0].keys())
+    if 'MachineTags' in columns:
+        columns.insert(5, columns.pop(columns.index('MachineTags')))
+    return columns, [[m.get(col, '') for col in columns] for m in flat_machines]
+
+
+def table_flatten(machines):
+    return TableFlattener(MACHINE_COLUMN_PINS).table(machines)
+
+
+def measure(label, fn, machines, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn(machines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = fn(machines)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    columns = result.columns if isinstance(result, MachineInventory) else result[0]
+    print(f'{label:<28} {best * 1000:9.1f} ms   peak {peak / 1024 / 1024:7.1f} MB   {len(columns)} columns')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    machines = list(synthetic_machines(args.rows))
+    print(f'{args.rows} synthetic machines, best of {args.repeat}')
+    measure('dict.copy() flattening', legacy_flatten, machines, args.repeat)
+    measure('TableFlattener', table_flatten, machines, args.repeat)
+    measure('MachineInventory build', MachineInventory, machines, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
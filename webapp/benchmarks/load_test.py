@@ -0,0 +1,218 @@
+"""
+Load-test the web app against a local stand-in Function App.
+
+Starts a stand-in for the Function App (canned answers for the operations
+the profile uses, after --function-latency-ms), starts the web app in front
+of it, drives a weighted mix of the UI's API calls from --concurrency
+client threads for --duration seconds, and reports requests/s and latency
+percentiles per endpoint.
+
+--server gunicorn runs the production entrypoint (gunicorn.conf.py);
+--server werkzeug runs the threaded Flask development server that
+`python run.py` used to serve production with, for comparison. --target
+skips starting a server and loads an already running one instead.
+
+After the run the server is sent SIGTERM and the time it takes to drain
+and exit is reported.
+
+    cd webapp
+    python benchmarks/load_test.py --server gunicorn --concurrency 32 --duration 20
+    python benchmarks/load_test.py --server werkzeug --concurrency 32 --duration 20
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+WEBAPP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# (name, method, path, JSON body, weight)
+PROFILE = (
+    ('tenants', 'GET', '/api/tenants', None, 4),
+    ('device_groups', 'GET', '/api/device-groups/t1', None, 2),
+    ('incidents_page', 'POST', '/api/incidents', {'tenantId': 't1', 'offset': 0, 'limit': 50}, 3),
+    ('incident_alerts', 'POST', '/api/incidents/alerts', {'tenantId': 't1', 'incidentId': '7'}, 2),
+    ('send_command', 'POST', '/api/send_command',
+     {'function_name': 'MDEDispatcher', 'command': 'InvokeTagDevices', 'TenantId': 't1',
+      'DeviceIds': ['d1', 'd2'], 'Tag': 'loadtest'}, 1),
+    ('diagnostic', 'GET', '/api/diagnostic', None, 1),
+)
+
+
+def canned_answer(body):
+    operation = body.get('Function')
+    if operation == 'GetTenantIds':
+        return {'Status': 'Success', 'TenantIds': [{'TenantId': f't{i}', 'ClientName': f'Client {i}', 'Enabled': True}
+                                                   for i in range(1, 11)], 'Count': 10}
+    if operation == 'GetDeviceGroups':
+        return {'Status': 'Success', 'DeviceGroups': [f'Group {i}' for i in range(40)]}
+    if operation == 'GetIncidents':
+        return {'Status': 'Success', 'Result': [
+            {'id': str(i), 'displayName': f'Incident {i}', 'status': 'active', 'severity': 'medium',
+             'lastUpdateDateTime': f'2024-06-{1 + i % 28:02d}T00:00:00Z'} for i in range(2000)]}
+    if operation == 'GetIncidentAlerts':
+        return {'Status': 'Success', 'Result': {'LastUpdateDateTime': '2024-06-01T00:00:00Z', 'Alerts': [
+            {'id': f'da{i}', 'title': f'Alert {i}', 'severity': 'high'} for i in range(20)]}}
+    if body.get('DeviceIds'):
+        return [{'DeviceId': device_id, 'Status': 'Success', 'Result': None} for device_id in body['DeviceIds']]
+    return {'Status': 'Success'}
+
+
+def start_stand_in(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            time.sleep(latency)
+            data = json.dumps(canned_answer(body)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            # HTTP triggers are POST-only; warmer probes get the same 404 Azure answers with
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, function_url, port):
+    env = dict(os.environ, FUNCTION_APP_BASE_URL=function_url, FUNCTION_KEY='load-test', PORT=str(port),
+               FLASK_CONFIG='production', GUNICORN_LOG_LEVEL='warning', PYTHONUNBUFFERED='1')
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'run:app']
+    else:
+        command = [sys.executable, '-c', f"from run import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    log = open(os.path.join(tempfile.gettempdir(), f'mde_load_test_{kind}.log'), 'w')
+    process = subprocess.Popen(command, cwd=WEBAPP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    target = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        if process.poll() is not None:
+            raise SystemExit(f'{kind} exited during startup; see {log.name}')
+        try:
+            if requests.get(f'{target}/api/diagnostic', timeout=1).status_code == 200:
+                return process, target
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise SystemExit(f'{kind} did not answer within 30s; see {log.name}')
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+
+def run_load(target, concurrency, duration, warmup):
+    weighted = [entry for entry in PROFILE for _ in range(entry[4])]
+    latencies = {entry[0]: [] for entry in PROFILE}
+    errors = {entry[0]: 0 for entry in PROFILE}
+    lock = threading.Lock()
+    started = time.time()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while True:
+            now = time.time()
+            if now >= stop_at:
+                return
+            name, method, path, body, _ = rng.choice(weighted)
+            begin = time.perf_counter()
+            try:
+                ok = session.request(method, target + path, json=body, timeout=60).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - begin
+            if now >= measure_from:
+                with lock:
+                    latencies[name].append(elapsed)
+                    errors[name] += 0 if ok else 1
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def report(latencies, errors, duration):
+    print(f"{'endpoint':<18}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    everything = []
+    for name, samples in latencies.items():
+        ordered = sorted(samples)
+        everything.extend(ordered)
+        print(f'{name:<18}{len(ordered):>9}{errors[name]:>8}{percentile(ordered, 0.5):>9.1f}'
+              f'{percentile(ordered, 0.95):>9.1f}{percentile(ordered, 0.99):>9.1f}')
+    everything.sort()
+    print(f"{'all':<18}{len(everything):>9}{sum(errors.values()):>8}{percentile(everything, 0.5):>9.1f}"
+          f'{percentile(everything, 0.95):>9.1f}{percentile(everything, 0.99):>9.1f}')
+    print(f'throughput: {len(everything) / duration:.1f} requests/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), default='gunicorn')
+    parser.add_argument('--target', help='load an already running server instead of starting one')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--function-latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    process = None
+    target = args.target
+    if not target:
+        stand_in = start_stand_in(args.function_latency_ms / 1000)
+        process, target = start_server(args.server, f'http://127.0.0.1:{stand_in.server_port}', free_port())
+    label = args.target or args.server
+    print(f'{label}: {args.concurrency} clients for {args.duration:g}s after {args.warmup:g}s warm-up, '
+          f'stand-in latency {args.function_latency_ms:g} ms')
+    latencies, errors = run_load(target, args.concurrency, args.duration, args.warmup)
+    report(latencies, errors, args.duration)
+
+    if process is not None:
+        begin = time.time()
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=180)
+            print(f'shutdown: exited {process.returncode} {time.time() - begin:.1f}s after SIGTERM')
+        except subprocess.TimeoutExpired:
+            process.kill()
+            print('shutdown: still running 180s after SIGTERM, killed')
+
+
+if __name__ == '__main__':
+    main()
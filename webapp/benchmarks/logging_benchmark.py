@@ -0,0 +1,131 @@
+"""
+Benchmark per-request logging overhead before and after the log pipeline.
+
+A "request" logs what get_tenants/get_incident_alerts used to: the payload
+at DEBUG (disabled) and the whole Function App response at INFO, here a
+synthetic GetIncidentAlerts-shaped response. Compares:
+
+- f-strings through a synchronous FileHandler (the old routes.py logging)
+- clip() with %-style arguments through the same synchronous handler
+- clip() through the queue handler, with the file written on the listener
+  thread, with and without per-call-site sampling
+
+Times are measured on the calling thread, which is what a request pays;
+the time the listener then needs to drain the queue is shown separately.
+--sink-latency-ms adds a blocking delay to every write, standing in for a
+log stream or disk that stalls (App Service's stdout capture can).
+
+    cd webapp
+    python benchmarks/logging_benchmark.py --requests 2000 --alerts 50
+    python benchmarks/logging_benchmark.py --sink-latency-ms 0.5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'mdeautomator_mcp'))
+
+from log_pipeline import LogPipeline, clip  # noqa: E402
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, filename, latency):
+        super().__init__(filename)
+        self.latency = latency
+
+    def emit(self, record):
+        super().emit(record)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def synthetic_response(alerts):
+    return {
+        'Status': 'Success',
+        'Result': {
+            'IncidentId': '1234',
+            'LastUpdateDateTime': '2024-06-01T12:00:00Z',
+            'Alerts': [{
+                'id': f'da{i:032x}',
+                'title': f'Suspicious PowerShell command line {i}',
+                'severity': 'high',
+                'description': 'A process ran an encoded PowerShell command. ' * 8,
+                'evidence': [{'@odata.type': '#microsoft.graph.security.processEvidence',
+                              'processCommandLine': 'powershell.exe -enc ' + 'QQBCAEMA' * 40,
+                              'imageFile': {'fileName': 'powershell.exe', 'sha256': f'{i:064x}'}}
+                             for _ in range(3)],
+            } for i in range(alerts)],
+        },
+    }
+
+
+def legacy_request(logger, payload, response):
+    logger.debug(f"Payload for MDEIncidentManager: {payload}")
+    logger.info(f"Azure Function response: {response}")
+
+
+def clipped_request(logger, payload, response):
+    logger.debug("Payload for MDEIncidentManager: %s", clip(payload))
+    logger.info("Azure Function response: %s", clip(response))
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def measure(label, logger, request, payload, response, count, pipeline=None):
+    start = time.perf_counter()
+    for _ in range(count):
+        request(logger, payload, response)
+    elapsed = time.perf_counter() - start
+    drain = ''
+    if pipeline is not None:
+        drain_start = time.perf_counter()
+        pipeline.stop()
+        drain = f'   drain {(time.perf_counter() - drain_start) * 1000:8.1f} ms   dropped {pipeline.handler.dropped}'
+    print(f'{label:<34} {elapsed / count * 1e6:9.1f} us/request{drain}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--alerts', type=int, default=50)
+    parser.add_argument('--sink-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    payload = {'Function': 'GetIncidentAlerts', 'TenantId': 'contoso', 'IncidentIds': ['1234']}
+    response = synthetic_response(args.alerts)
+    print(f'{args.requests} requests, {args.alerts} alerts per response ({len(str(response)) / 1024:.0f} KB repr)')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def file_handler(name):
+            handler = SlowFileHandler(os.path.join(tmp, f'{name}.log'), args.sink_latency_ms / 1000)
+            handler.setFormatter(logging.Formatter(FORMAT))
+            return handler
+
+        logger = make_logger('bench.legacy', file_handler('legacy'))
+        measure('f-strings, sync handler', logger, legacy_request, payload, response, args.requests)
+
+        logger = make_logger('bench.clip', file_handler('clip'))
+        measure('clip(), sync handler', logger, clipped_request, payload, response, args.requests)
+
+        for label, rate in (('clip(), queue handler', 0), ('clip(), queue handler, sampled', 50.0)):
+            pipeline = LogPipeline([file_handler(label.replace(' ', ''))], queue_size=10000,
+                                   max_chars=8000, rate=rate, burst=200)
+            pipeline.start()
+            logger = make_logger(f'bench.{label}', pipeline.handler)
+            measure(label, logger, clipped_request, payload, response, args.requests, pipeline)
+
+
+if __name__ == '__main__':
+    main()
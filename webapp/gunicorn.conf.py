@@ -0,0 +1,59 @@
+"""
+gunicorn settings for serving the web app in production.
+
+    gunicorn --config gunicorn.conf.py run:app
+
+Worker model: gthread. Routes spend their time waiting on the Function App,
+not on the CPU, and the app already relies on real threads (job registry,
+fan-out and batch executors, the warmer, the log listener), so one process
+with a pool of request threads serves the load without monkey-patching.
+SSE streams (/api/jobs/<id>/events, /api/fanout) each hold a thread for
+their lifetime, so GUNICORN_THREADS bounds the number of concurrent
+streams plus ordinary requests.
+
+Jobs, fan-outs, caches and incident snapshots live in the worker process,
+and /api/jobs/<id> must be answered by the worker that ran the job. Keep
+WEB_CONCURRENCY at 1 unless the front end pins clients to a worker.
+
+Shutdown: on SIGTERM the worker stops accepting connections and gives
+in-flight requests up to graceful_timeout to finish. worker_exit then stops
+the job registry from taking new jobs and waits up to JOB_DRAIN_TIMEOUT for
+queued and running jobs before the process exits.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT') or os.environ.get('WEBSITES_PORT') or '5000'}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+backlog = int(os.environ.get('GUNICORN_BACKLOG', '2048'))
+
+# gthread workers heartbeat from their main loop, so this only catches a hung worker
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '30'))
+job_drain_timeout = float(os.environ.get('JOB_DRAIN_TIMEOUT', '90'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', str(int(job_drain_timeout) + 30)))
+
+# Off by default: a recycled worker takes its jobs and caches with it
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '*')
+proxy_allow_ips = forwarded_allow_ips
+
+
+def worker_exit(server, worker):
+    from app.jobs import drain_jobs
+    from app.warmer import stop_warmer
+
+    stop_warmer()
+    unfinished = drain_jobs(job_drain_timeout)
+    if unfinished:
+        server.log.warning("Worker %s exiting with %s unfinished job(s) after %ss drain",
+                           worker.pid, unfinished, job_drain_timeout)
+    else:
+        server.log.info("Worker %s drained its jobs", worker.pid)
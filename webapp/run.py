@@ -14,6 +14,7 @@ config_name = os.getenv('FLASK_CONFIG', 'default')
 app = create_app(config[config_name])
 
 if __name__ == '__main__':
+    # Development server only; production runs `gunicorn --config gunicorn.conf.py run:app`
     app.run(
         host=config[config_name].HOST, 
         port=config[config_name].PORT, 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the web app as "app" when pytest is run from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from app import async_client
+from app.mdeautomator_mcp.function_client import FunctionAppClient
+
+CONFIG = {'FUNCTION_APP_BASE_URL': 'http://127.0.0.1:9', 'FUNCTION_KEY': 'key', 'FUNCTION_CLIENT_INIT_BACKOFF': 60}
+
+
+@pytest.fixture
+def failing_init(monkeypatch):
+    attempts = []
+
+    async def initialize(self):
+        attempts.append(1)
+        raise RuntimeError('credential unavailable')
+
+    monkeypatch.setattr(FunctionAppClient, 'initialize', initialize)
+    monkeypatch.setattr(async_client, '_clients', {})
+    monkeypatch.setattr(async_client, '_init_failures', {})
+    return attempts
+
+
+def client_threads():
+    return [t for t in threading.enumerate() if t.name == 'mde-async-client']
+
+
+def test_failed_init_stops_the_loop_thread(failing_init):
+    before = len(client_threads())
+    with pytest.raises(RuntimeError):
+        async_client.get_async_client(CONFIG)
+    assert len(client_threads()) == before
+
+
+def test_failed_init_is_not_retried_during_backoff(failing_init):
+    with pytest.raises(RuntimeError):
+        async_client.get_async_client(CONFIG)
+    for _ in range(3):
+        with pytest.raises(async_client.AsyncClientUnavailable):
+            async_client.get_async_client(CONFIG)
+    assert len(failing_init) == 1
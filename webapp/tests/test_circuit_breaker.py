@@ -0,0 +1,30 @@
+from app.circuit_breaker import AIMDLimiter, CircuitBreaker, EndpointGuard
+
+
+def make_guard():
+    return EndpointGuard('MDEAutoDB', CircuitBreaker(failure_threshold=3, open_seconds=60), AIMDLimiter())
+
+
+def test_repeated_403s_open_the_breaker():
+    guard = make_guard()
+    for _ in range(3):
+        guard.call(lambda: {'error': 'HTTP error: 403', 'status_code': 403})
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    result = guard.call(lambda: {'Status': 'Success'})
+    assert result['circuit_open'] is True
+
+
+def test_repeated_429s_open_the_breaker():
+    guard = make_guard()
+    for _ in range(3):
+        guard.call(lambda: {'error': 'HTTP error: 429', 'status_code': 429})
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+
+def test_repeated_404s_leave_the_breaker_closed():
+    guard = make_guard()
+    for _ in range(10):
+        guard.call(lambda: {'error': 'HTTP error: 404', 'status_code': 404})
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+    assert guard.breaker.consecutive_failures == 0
+    assert guard.call(lambda: {'Status': 'Success'}) == {'Status': 'Success'}
@@ -0,0 +1,40 @@
+from flask import Flask, jsonify, request
+
+from app.conditional import conditional_json
+
+writes = []
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/api/hunt/queries', methods=['POST'])
+    @conditional_json
+    def hunt_queries():
+        data = request.get_json()
+        if not data['Function'].startswith('Get'):
+            writes.append(data['Function'])
+        return jsonify({'queries': ['q' * 50] * 50})
+
+    return app
+
+
+def test_reads_are_answered_with_304():
+    client = make_app().test_client()
+    first = client.post('/api/hunt/queries', json={'Function': 'GetQueries'})
+    assert first.status_code == 200 and first.headers.get('ETag')
+    again = client.post('/api/hunt/queries', json={'Function': 'GetQueries'},
+                        headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_writes_are_never_not_modified():
+    client = make_app().test_client()
+    etag = client.post('/api/hunt/queries', json={'Function': 'GetQueries'}).headers['ETag']
+    writes.clear()
+    response = client.post('/api/hunt/queries', json={'Function': 'AddQuery'},
+                           headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert writes == ['AddQuery']
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert response.headers['Content-Encoding'] == 'gzip'
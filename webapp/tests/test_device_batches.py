@@ -0,0 +1,20 @@
+from app.mdeautomator_mcp.device_batches import merge_device_results, split_device_ids
+
+
+def test_split_dedupes_in_order():
+    assert split_device_ids(['a', 'b', 'a', 'c', 'd'], 2) == [['a', 'b'], ['c', 'd']]
+
+
+def test_failed_batch_becomes_per_device_errors():
+    batches = [['a', 'b'], ['c']]
+    merged = merge_device_results(batches, [[{'DeviceId': 'a'}, {'DeviceId': 'b'}], {'error': 'boom'}])
+    assert merged == [{'DeviceId': 'a'}, {'DeviceId': 'b'}, {'DeviceId': 'c', 'Status': 'Error', 'Result': 'boom'}]
+
+
+def test_single_object_result_is_kept():
+    assert merge_device_results([['a']], [{'DeviceId': 'a'}]) == [{'DeviceId': 'a'}]
+
+
+def test_all_batches_failed():
+    merged = merge_device_results([['a'], ['b']], [{'error': 'down'}, 'Error executing function: x'])
+    assert merged == {'error': 'All 2 device batches failed: down'}
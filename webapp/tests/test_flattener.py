@@ -0,0 +1,45 @@
+"""
+Shape tests for the table flattener.
+
+Schemas are cached per key tuple across tables, so the result of a table
+must not depend on which rows came first, in this table or an earlier one.
+"""
+
+from app.flattener import MACHINE_COLUMN_PINS, flatten_table
+
+
+def as_records(table):
+    return [dict(zip(table['columns'], row)) for row in table['rows']]
+
+
+def test_scalar_then_object():
+    assert flatten_table([{'a': 'x'}, {'a': {'c': 1}}]) == {'columns': ['a', 'a.c'], 'rows': [['x', None], [None, 1]]}
+
+
+def test_object_gains_nested_member():
+    table = flatten_table([{'a': {'c': 1}}, {'a': {'c': {'d': 2}}}])
+    assert table == {'columns': ['a.c', 'a.c.d'], 'rows': [[1, None], [None, 2]]}
+
+
+def test_row_order_does_not_change_cells():
+    rows = [{'k': 1, 'a': 'x'}, {'k': 2, 'a': {'c': 1, 'e': [{'f': 2}]}}, {'k': 3, 'a': None}]
+    forward = as_records(flatten_table(rows))
+    backward = as_records(flatten_table(rows[::-1]))[::-1]
+    assert forward == backward
+    assert forward[1] == {'k': 2, 'a': None, 'a.c': 1, 'a.e.0.f': 2}
+
+
+def test_null_member_column_is_dropped_when_flattened_elsewhere():
+    rows = [{'Id': 1, 'VmMetadata': None}, {'Id': 2, 'VmMetadata': {'vmId': 'v'}}, {'Id': 3, 'VmMetadata': {}}]
+    for ordered in (rows, rows[::-1]):
+        assert flatten_table(ordered)['columns'] == ['Id', 'VmMetadata.vmId']
+
+
+def test_device_columns():
+    machine = {'Id': 'm', 'ComputerDnsName': 'pc', 'OsPlatform': 'Windows11', 'HealthStatus': 'Active',
+               'RiskScore': 'Low', 'ExposureLevel': 'Low', 'MachineTags': ['vip'],
+               'IpAddresses': [{'ipAddress': '10.0.0.1', 'type': 'Ethernet'}], 'VmMetadata': None}
+    table = flatten_table([machine], MACHINE_COLUMN_PINS)
+    assert table['columns'][5] == 'MachineTags'
+    assert as_records(table)[0]['IpAddresses.0.ipAddress'] == '10.0.0.1'
+    assert 'VmMetadata' in table['columns']
@@ -0,0 +1,66 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.http_pool import FunctionAppSession
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(float(self.path.strip('/') or 0))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+def post_concurrently(session, url, count):
+    threads = [threading.Thread(target=session.post, args=(f'{url}/0.2',), kwargs={'json': {}}) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_idle_connection_under_steady_traffic_is_dropped(server):
+    session = FunctionAppSession(keepalive_expiry=0.5)
+    post_concurrently(session, server, 2)          # two pooled connections
+    assert session.stats.new_connections == 2
+
+    # Steady traffic keeps reusing the most recently returned connection...
+    for _ in range(8):
+        session.post(f'{server}/0', json={})
+        time.sleep(0.1)
+    assert session.stats.idle_resets == 0
+
+    # ...so the other one has been idle past the expiry and is reconnected, not reused
+    post_concurrently(session, server, 2)
+    assert session.stats.idle_resets == 1
+    assert session.stats.new_connections == 3
+    session.close()
+
+
+def test_recently_used_connections_are_reused(server):
+    session = FunctionAppSession(keepalive_expiry=30)
+    for _ in range(5):
+        session.post(f'{server}/0', json={})
+    assert session.stats.new_connections == 1
+    assert session.stats.idle_resets == 0
+    session.close()
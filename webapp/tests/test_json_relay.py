@@ -0,0 +1,96 @@
+"""
+Chunk-boundary tests for the streaming JSON relay.
+
+Upstream bodies arrive in arbitrary chunks, so every test that matters
+splits the same document at every byte offset.
+"""
+
+import json
+
+import pytest
+
+from app.json_relay import CompleteDocument, JsonRelay, JsonRelayError, iter_json_chunks, open_json_relay
+
+
+def split_at(data: bytes, *offsets):
+    """data cut into chunks at the given byte offsets."""
+    bounds = [0, *offsets, len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def read_all(chunks, buffer_bytes=1024 * 1024):
+    """The parsed document, whether it came back complete or as a relay."""
+    opened = open_json_relay(chunks, buffer_bytes=buffer_bytes)
+    if isinstance(opened, CompleteDocument):
+        return opened.value
+    assert isinstance(opened, JsonRelay)
+    return json.loads(''.join(iter_json_chunks(opened)))
+
+
+def test_numbers_split_after_dot_and_exponent():
+    assert read_all([b'[1.', b'5, 2e', b'3, 4]']) == [1.5, 2e3, 4]
+
+
+@pytest.mark.parametrize('document', [
+    [1.5, -2e3, 4, 12345678901234567890, 0.25e-7, 10],
+    {'Status': 'Success', 'Result': [{'Id': 'a', 'Score': 12.75}, {'Id': 'b', 'Score': -3e2}], 'Count': 2},
+    {'Status': 'Success', 'Result': [{'Name': 'café ✓ \U0001f600', 'Flag': True, 'Tags': None}]},
+    12.5,
+])
+def test_every_single_split_point(document):
+    data = json.dumps(document).encode('utf-8')
+    for offset in range(1, len(data)):
+        assert read_all(split_at(data, offset)) == document, offset
+
+
+def test_byte_at_a_time_while_streaming():
+    document = {'Status': 'Success', 'Result': [{'Id': i, 'Risk': i * 1.5, 'Exp': 1e-3 * i} for i in range(50)]}
+    data = json.dumps(document).encode('utf-8')
+    chunks = [data[i:i + 1] for i in range(len(data))]
+    opened = open_json_relay(chunks, buffer_bytes=64)
+    assert isinstance(opened, JsonRelay)
+    assert json.loads(''.join(iter_json_chunks(opened))) == document
+
+
+def test_number_at_end_of_body():
+    assert read_all([b'4', b'2']) == 42
+    assert read_all([b'[1, 2', b']']) == [1, 2]
+
+
+def test_invalid_json_is_reported():
+    with pytest.raises(JsonRelayError):
+        read_all([b'[1, ', b'2 3]'])
+    with pytest.raises(JsonRelayError):
+        read_all([b'[1.', b'x]'])
+
+
+def test_empty_body():
+    assert open_json_relay([b'', b'  ']) is None
+
+
+def broken_body(document, cut):
+    """A streamed body that fails with an OSError after cut bytes."""
+    data = json.dumps(document).encode('utf-8')
+    yield data[:cut]
+    raise OSError('connection reset')
+
+
+def test_bare_array_error_aborts_the_stream():
+    document = [{'Id': i} for i in range(50)]
+    opened = open_json_relay(broken_body(document, 300), buffer_bytes=64)
+    assert isinstance(opened, JsonRelay)
+    sent = []
+    with pytest.raises(JsonRelayError):
+        for chunk in iter_json_chunks(opened):
+            sent.append(chunk)
+    assert opened.error == 'connection reset'
+    assert not ''.join(sent).endswith(']')
+    with pytest.raises(ValueError):
+        json.loads(''.join(sent))
+
+
+def test_wrapped_error_is_reported_as_stream_error():
+    document = {'Status': 'Success', 'Result': [{'Id': i} for i in range(50)]}
+    opened = open_json_relay(broken_body(document, 300), buffer_bytes=64)
+    body = json.loads(''.join(iter_json_chunks(opened, {'success': True}, 'result')))
+    assert body['stream_error'] == 'connection reset'
@@ -0,0 +1,21 @@
+from app.machine_inventory import MachineInventory, _Column
+
+
+def test_encoded_column_keeps_bools_ints_and_floats_apart():
+    values = [1, True, 1.0, 0, False, 0.0, None] * 10
+    column = _Column('Flag', list(values))
+    column.encode()
+    assert column.codes is not None
+    decoded = [column.get(row) for row in range(len(values))]
+    assert decoded == values
+    assert [type(value) for value in decoded] == [type(value) for value in values]
+
+
+def test_inventory_round_trip_and_filters_with_mixed_bools():
+    values = [1, True, 1.0, 0, False] * 8
+    inventory = MachineInventory({'Id': str(row), 'IsAadJoined': value} for row, value in enumerate(values))
+    assert inventory.column('IsAadJoined').codes is not None
+    page = inventory.query(columns=['IsAadJoined'], limit=len(values))
+    assert [row[0] for row in page['machines']] == values
+    assert inventory.select({'IsAadJoined': True}) == [row for row, value in enumerate(values) if value is True]
+    assert inventory.facet('IsAadJoined', None) == {'1': 8, 'True': 8, '1.0': 8, '0': 8, 'False': 8}
@@ -0,0 +1,37 @@
+from app.mdeautomator_mcp.secret_cache import KDF_ITERATIONS, SecretCache, _Secret
+
+VAULT = 'https://vault.example'
+
+
+def write_cache(path, key='passphrase'):
+    cache = SecretCache(VAULT, disk_path=str(path), disk_key=key)
+    cache._entries['function-key'] = _Secret('secret-value', 0, 0)
+    cache._save_disk()
+    return cache
+
+
+def test_disk_cache_round_trip_uses_a_salted_kdf(tmp_path):
+    path = tmp_path / 'secrets.bin'
+    write_cache(path)
+    header = path.read_bytes().split(b'\n')[0].split(b'$')
+    assert header[0] == b'pbkdf2-sha256' and int(header[1]) == KDF_ITERATIONS and len(header[2]) >= 16
+
+    loaded = SecretCache(VAULT, disk_path=str(path), disk_key='passphrase')
+    assert loaded.loaded_from_disk == 1
+    assert loaded._entries['function-key'].value == 'secret-value'
+
+
+def test_each_file_gets_its_own_salt(tmp_path):
+    write_cache(tmp_path / 'a.bin')
+    write_cache(tmp_path / 'b.bin')
+    assert (tmp_path / 'a.bin').read_bytes().split(b'\n')[0] != (tmp_path / 'b.bin').read_bytes().split(b'\n')[0]
+
+
+def test_wrong_key_and_unsalted_files_are_ignored(tmp_path):
+    path = tmp_path / 'secrets.bin'
+    write_cache(path)
+    assert SecretCache(VAULT, disk_path=str(path), disk_key='other').loaded_from_disk == 0
+
+    legacy = tmp_path / 'legacy.bin'
+    legacy.write_bytes(b'gAAAAABfakefernettoken')
+    assert SecretCache(VAULT, disk_path=str(legacy), disk_key='passphrase').loaded_from_disk == 0
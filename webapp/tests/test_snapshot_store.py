@@ -0,0 +1,62 @@
+import threading
+import time
+
+from app.incident_store import IncidentStore
+from app.machine_inventory import InventoryStore
+
+
+def test_invalidate_during_load_is_not_overwritten():
+    store = IncidentStore(ttl=60)
+    loading = threading.Event()
+    release = threading.Event()
+
+    def stale_loader():
+        loading.set()
+        release.wait(5)
+        return [{'id': '1', 'status': 'active'}]
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(store.get('tenant', stale_loader)))
+    worker.start()
+    assert loading.wait(5)
+    store.invalidate('tenant')      # an update lands while the old list is still downloading
+    release.set()
+    worker.join(5)
+
+    # The in-flight request still gets its answer, but it is not kept
+    assert len(results[0]) == 1
+    assert store.peek('tenant') is None
+    fresh = store.get('tenant', lambda: [{'id': '1', 'status': 'resolved'}])
+    assert fresh.incidents[0]['status'] == 'resolved'
+    assert store.stats()['discarded'] == 1
+
+
+def test_lru_bound_and_expired_tenants_are_evicted():
+    store = InventoryStore(ttl=60, max_tenants=2)
+    for tenant in ('a', 'b'):
+        store.get(tenant, lambda: [{'Id': tenant}])
+    store.get('a', lambda: [])         # touch a so b is least recently used
+    store.get('c', lambda: [{'Id': 'c'}])
+    assert set(store.stats()['tenants']) == {'a', 'c'}
+
+    store.ttl = 0.01
+    time.sleep(0.02)
+    store.get('d', lambda: [{'Id': 'd'}])
+    assert set(store.stats()['tenants']) == {'d'}
+
+
+def test_concurrent_loads_share_one_fetch():
+    store = IncidentStore(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return [{'id': '1'}]
+
+    threads = [threading.Thread(target=store.get, args=('tenant', loader)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.warmer import FunctionWarmer
+
+
+class Handler(BaseHTTPRequestHandler):
+    """A Function App host: POST-only triggers that answer like run.ps1 does."""
+
+    protocol_version = 'HTTP/1.1'
+    status_by_function = {}
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self._reply(404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        function_name = self.path.split('?')[0].rsplit('/', 1)[-1]
+        if function_name == 'MDEAutoDB':
+            self._reply(200 if body.get('Function') == 'GetTenantIds' else 500)
+        else:
+            self._reply(self.status_by_function.get(function_name, 400))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.status_by_function = {}
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+def test_probes_post_and_expect_their_status(server):
+    warmer = FunctionWarmer(server, 'key')
+    warmer.probe_all()
+    endpoints = warmer.stats()['endpoints']
+    assert set(endpoints) == {'MDEAutoDB', 'MDEProfiles'}
+    for endpoint in endpoints.values():
+        assert endpoint['failures'] == 0 and endpoint['warm_hits'] == 1
+
+
+def test_unexpected_status_is_a_failure(server):
+    Handler.status_by_function = {'MDEProfiles': 404}
+    warmer = FunctionWarmer(server, 'key', functions=['MDEProfiles'])
+    warmer.probe_all()
+    endpoint = warmer.stats()['endpoints']['MDEProfiles']
+    assert endpoint['failures'] == 1 and endpoint['warm_hits'] == 0
+    assert endpoint['last_error'] == 'HTTP 404, expected 400'
+
+
+def test_endpoints_without_a_probe_are_not_warmed(server):
+    warmer = FunctionWarmer(server, 'key', functions=['MDEAutoChat', 'MDEAutoDB'])
+    assert warmer.functions == ['MDEAutoDB']
+
+
+def test_real_traffic_skips_the_round(server):
+    warmer = FunctionWarmer(server, 'key')
+    warmer.note_call('MDEIncidentManager')
+    warmer.probe_all()
+    endpoints = warmer.stats()['endpoints']
+    assert all(endpoint['probes'] == 0 and endpoint['skipped'] == 1 for endpoint in endpoints.values())